@@ -1,146 +1,87 @@
 from database_utils import DatabaseConnector
-from sqlalchemy import create_engine, text
-from urllib.parse import quote_plus
+from schema_finaliser import SchemaFinaliser
+from sqlalchemy import Connection, text
 from sqlalchemy.exc import SQLAlchemyError
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import time
 
 class AlterDatabase:
     """
     This class is to alter the sales_data database tables according to predefined alterations.
     Further, this method also adds foreign keys to the fact table, orders_table.
     This class should only be run after the database creation and poopulation with DatabaseConnector, DatabaseExtractor and DatabaseCleaning class.
+    The tables loaded with SchemaFinaliser already have their final column types, only the columns whose values did not fit them are altered.
+
+    Attributes:
+        CATALOG_TYPES (dict[str, str]): final type to the name of the type in the postgres catalog
+        FOREIGN_KEYS (list[tuple[str, str, str]]): (referenced table, constraint name, column name) of the foreign keys of orders_table
     """
+    CATALOG_TYPES = {'UUID': 'uuid', 'SMALLINT': 'smallint', 'DATE': 'date', 'FLOAT': 'double precision'}
+    FOREIGN_KEYS = [
+        ('dim_card_details', 'fk_orders_table_dim_card_details', 'card_number'),
+        ('dim_date_times', 'fk_orders_table_dim_date_times', 'date_uuid'),
+        ('dim_products', 'fk_orders_table_dim_products', 'product_code'),
+        ('dim_store_details', 'fk_orders_table_dim_store_details', 'store_code'),
+        ('dim_users', 'fk_orders_table_dim_users', 'user_uuid'),
+    ]
+
     def __init__(self):
-        self.local_db_creds = DatabaseConnector.read_db_creds("config/local_db_creds.yaml")
-        self.engine = create_engine(f"{self.local_db_creds['DATABASE_TYPE']}+{self.local_db_creds['DB_API']}://{self.local_db_creds['USER']}:{quote_plus(self.local_db_creds['PASSWORD'])}@{self.local_db_creds['HOST']}:{self.local_db_creds['PORT']}/{self.local_db_creds['DATABASE']}") 
+        # the local engine and its connection pool are shared with DatabaseConnector.upload_to_db
+        self.engine = DatabaseConnector.init_local_db_engine()
 
-    def alter_orders_table(self):
+    @staticmethod
+    def has_final_type(catalog_type: str, final_type: str) -> bool:
         """
-        This method is to alter the orders_table table in the sales_data database.
-        This method alters the following column to its corresponding postgresSQL types.
+        This method checks whether a column already has its final type.
 
-        Columns:
-            date_uuid: UUID 
-            user_uuid: UUID
-            card_number: VARCHAR(?)
-            store_code: VARCHAR(?)
-            product_code: VARCHAR(?)
-            product_quantity: SMALLINT
+        Args:
+            catalog_type (str): type of the column in the postgres catalog, e.g. 'character varying(12)'
+            final_type (str): final type of the column in SchemaFinaliser.FINAL_TYPES, e.g. 'VARCHAR'
 
-            ? is integer representing maximum length of the values in that column
+        Returns:
+            bool: whether the column has its final type
         """
-        # querying max_length for card_number, store_code and product_code
-        with self.engine.connect() as connection:
-            results = connection.execute(text(f"""
-                                    select max(char_length(card_number::text)),
-                                    max(char_length(store_code)),
-                                    max(char_length(product_code))
-                                        from orders_table
-                                    """))
-            card_num_max_length, store_code_max_length, product_code_max_length = results.fetchone()
+        if final_type == 'VARCHAR':
+            return catalog_type.startswith('character varying')
+        if SchemaFinaliser.varchar_length(final_type) is not None:
+            return catalog_type == f'character varying({SchemaFinaliser.varchar_length(final_type)})'
+        return catalog_type == AlterDatabase.CATALOG_TYPES[final_type]
 
-        # altering the table
-        try:
-            with self.engine.begin() as connection:
-                connection.execute(text(f"""
-                            ALTER TABLE orders_table
-                            ALTER COLUMN date_uuid TYPE UUID USING date_uuid::uuid,
-                            ALTER COLUMN user_uuid TYPE UUID USING user_uuid::uuid,
-                            ALTER COLUMN card_number TYPE VARCHAR({card_num_max_length}),
-                            ALTER COLUMN store_code TYPE VARCHAR({store_code_max_length}),
-                            ALTER COLUMN product_code TYPE VARCHAR({product_code_max_length}),
-                            ALTER COLUMN product_quantity TYPE SMALLINT USING product_quantity::smallint
-                            """))
-        except SQLAlchemyError as e:
-            error = str(e.__dict__['orig'])
-            print(error)
-            
-    def alter_users_table(self):
+    def alter_table(self, conn: Connection, table_name: str):
         """
-        This method is to alter the dim_users_table table in the sales_data database.
-        This method alters the following column to its corresponding postgresSQL types.
-
-        Columns:
-            first_name: VARCHAR(225) 
-            last_name: VARCHAR(225)
-            date_of_birth: DATE
-            country_code: VARCHAR(?)
-            user_uuid: UUID
-            join_date: DATE
+        This method alters the columns of a table that do not have their final types in SchemaFinaliser.FINAL_TYPES, in a single ALTER TABLE statement.
+        VARCHAR columns without a length are altered to VARCHAR as long as their longest value. Nothing is executed if every column has its final type.
 
-            ? is integer representing maximum length of the values in that column
-        """
-        # get country code max length
-        with self.engine.connect() as conn:
-            results = conn.execute(text(f"""
-                                        select max(char_length(country_code))
-                                        from dim_users
-                                        """))
-            country_code_max_length = results.fetchone()[0]
-
-        # alter table
-        try:
-            with self.engine.begin() as conn:
-                conn.execute(text(f"""
-                                ALTER TABLE dim_users
-                                ALTER COLUMN first_name TYPE VARCHAR(255),
-                                ALTER COLUMN last_name TYPE VARCHAR(255),
-                                ALTER COLUMN date_of_birth TYPE DATE,
-                                ALTER COLUMN country_code TYPE VARCHAR({country_code_max_length}),
-                                ALTER COLUMN user_uuid TYPE UUID using user_uuid::uuid,
-                                ALTER COLUMN join_date TYPE DATE
-                                """))
-        except SQLAlchemyError as e:
-            error = str(e.__dict__['orig'])
-            print(error)
-
-    def alter_stores_table(self):
+        Args:
+            conn (Connection): connection the statements are executed in, inside its transaction
+            table_name (str): name of the table
         """
-        This method is to alter the dim_stores_details table in the sales_data database.
-        This method alters the following column to its corresponding postgresSQL types.
+        # the current types of the columns
+        results = conn.execute(text("""
+            select a.attname, format_type(a.atttypid, a.atttypmod)
+            from pg_attribute a
+            where a.attrelid = cast(:table_name as regclass) and a.attnum > 0 and not a.attisdropped
+        """), {'table_name': table_name})
+        catalog_types = dict(results.fetchall())
+
+        final_types = {name: final_type for name, final_type in SchemaFinaliser.FINAL_TYPES[table_name].items()
+                       if name in catalog_types and not AlterDatabase.has_final_type(catalog_types[name], final_type)}
+        if not final_types:
+            return
+
+        # querying max_length of the VARCHAR columns in a single scan
+        measured_columns = [name for name, final_type in final_types.items() if final_type == 'VARCHAR']
+        if measured_columns:
+            max_lengths = ', '.join(f'max(char_length("{name}"::text))' for name in measured_columns)
+            lengths = conn.execute(text(f"select {max_lengths} from {table_name}")).fetchone()
+            for name, length in zip(measured_columns, lengths):
+                final_types[name] = f'VARCHAR({length})' if length else 'VARCHAR'
 
-        Columns:
-            longitude: FLOAT
-            locality: VARCHAR(255)
-            store_code: VARCHAR(?)
-            staff_numbers: SMALLINT
-            opening_date: DATE
-            store_type: VARCHAR(255) NULLABLE
-            latitude: FLOAT
-            country_code: VARCHAR(?)
-            continent: VARCHAR(255)
+        # altering the table
+        alterations = ', '.join(f'ALTER COLUMN "{name}" TYPE {final_type} USING "{name}"::{final_type}' for name, final_type in final_types.items())
+        conn.execute(text(f"ALTER TABLE {table_name} {alterations}"))
 
-            ? is integer representing maximum length of the values in that column
-        """
-        # get length for store_code and country_code
-        with self.engine.connect() as conn:
-            results = conn.execute(text(f"""
-                                        select max(char_length(store_code)),
-                                        max(char_length(country_code))
-                                        from dim_store_details
-                                        """))
-            store_code_max_length, country_code_max_length = results.fetchone()
-
-        # alter table
-        try:
-            with self.engine.begin() as conn:
-                conn.execute(text(f"""
-                                ALTER TABLE dim_store_details
-                                ALTER COLUMN longitude TYPE FLOAT,
-                                ALTER COLUMN locality TYPE VARCHAR(255),
-                                ALTER COLUMN store_code TYPE VARCHAR({store_code_max_length}),
-                                ALTER COLUMN staff_numbers TYPE SMALLINT USING staff_numbers::smallint,
-                                ALTER COLUMN opening_date TYPE DATE,
-                                ALTER COLUMN store_type TYPE VARCHAR(255),
-                                ALTER COLUMN store_type DROP NOT NULL,
-                                ALTER COLUMN latitude TYPE FLOAT,
-                                ALTER COLUMN country_code TYPE VARCHAR({country_code_max_length}),
-                                ALTER COLUMN continent TYPE VARCHAR(255) 
-                                """))
-        except SQLAlchemyError as e:
-            print(e)
-
-    def alter_products_table(self):
+    def alter_products_table(self, conn: Connection):
         """
         This method is to alter the dim_products table in the sales_data database.
         This method alters the following column to its corresponding postgresSQL types.
@@ -156,149 +97,48 @@ class AlterDatabase:
             weight_class: VARCHAR(?)
 
             ? is integer representing maximum length of the values in that column
-        """
-        # read the product table using pandas
-        product_df = pd.read_sql_table('dim_products', self.engine)
-
-        # add a new weight_class column
-        def custom_weight_class_parser(weight: str) -> str:
-            """
-            custome parser that returns weight class according to the weight values
-
-            Args:
-                weight (str): str value for weight
-
-            Returns:
-                str: the weight class according to the weight value
-            """
-            if weight < 2:
-                return "Light"
-            elif weight >= 2 and weight < 40:
-                return "Mid_Sized"
-            elif weight >= 40 and weight < 140:
-                return "Heavy"
-            else:
-                return "Truck_Required"
-            
-        product_df['weight_class'] = product_df['weight(in kg)'].apply(custom_weight_class_parser)
-
-        # change the removed column to still_available and add boolean values to it
-        product_df['still_available'] = product_df['removed'].apply(lambda x: True if x == 'Still_avaliable' else False)
-
-        # remove the removed column
-        product_df.drop(columns=['removed'], inplace=True)
-
-        # rename the product_price(in £s) and weight(in kg) to product_price and weight
-        product_df['product_price'] = product_df['product_price(in £s)']
-        product_df['weight'] = product_df['weight(in kg)']
-        product_df.drop(columns=['product_price(in £s)', 'weight(in kg)'], inplace=True)
-
-        # save to local database
-        DatabaseConnector.upload_to_db(product_df, 'dim_products')
-
-        # get max lengths for EAN, product_code and weight_class
-        with self.engine.connect() as conn:
-            results = conn.execute(text("""
-                select max(char_length("EAN"::text)),
-                max(char_length(product_code)),
-                max(char_length(weight_class))
-                from dim_products
-            """))
-            EAN_max_length, product_code_max_length, weight_class_max_length = results.fetchone()
 
-        # alter tables
-        try:
-            with self.engine.begin() as conn:
-                conn.execute(text(f"""
-                                    ALTER TABLE dim_products
-                                    ALTER COLUMN product_price TYPE FLOAT,
-                                    ALTER COLUMN weight TYPE FLOAT,
-                                    ALTER COLUMN "EAN" TYPE VARCHAR({EAN_max_length}),
-                                    ALTER COLUMN product_code TYPE VARCHAR({product_code_max_length}),
-                                    ALTER COLUMN date_added TYPE DATE,
-                                    ALTER COLUMN uuid TYPE UUID USING uuid::uuid, 
-                                    ALTER COLUMN still_available TYPE BOOLEAN USING
-                                    CASE
-                                    WHEN still_available='True' THEN TRUE
-                                    WHEN still_available='False' THEN FALSE
-                                    END,
-                                    ALTER COLUMN weight_class TYPE VARCHAR({weight_class_max_length})
-                                    """))
-        except SQLAlchemyError as e:
-            print(e)
-
-    def alter_date_table(self):
-        """
-        This method is to alter the dim_date_times table in the sales_data database.
-        This method alters the following column to its corresponding postgresSQL types.
-
-        Columns:
-            month: VARCHAR(?)
-            year: VARCHAR(?)
-            day: VARCHAR(?)
-            time_period: VARCHAR(?)
-            date_uuid: UUID
-
-            ? is integer representing maximum length of the values in that column
-        """
-        # get max lengths
-        with self.engine.connect() as conn:
-            results = conn.execute(text("""
-                select max(char_length(month)),
-                max(char_length(year)),
-                max(char_length(day)),
-                max(char_length(time_period))
-                from dim_date_times
-            """))
-            month_max_length, year_max_length, day_max_length, time_period_max_length = results.fetchone()
-
-        # alter table
-        try:
-            with self.engine.begin() as conn:
-                conn.execute(text(f"""
-                                ALTER TABLE dim_date_times
-                                ALTER COLUMN month TYPE VARCHAR({month_max_length}),
-                                ALTER COLUMN year TYPE VARCHAR({year_max_length}),
-                                ALTER COLUMN day TYPE VARCHAR({day_max_length}),
-                                ALTER COLUMN time_period TYPE VARCHAR ({time_period_max_length}),
-                                ALTER COLUMN date_uuid TYPE UUID USING date_uuid::uuid,
-                                ALTER COLUMN datetime TYPE DATE
-                                """))
-        except SQLAlchemyError as e:
-            print(e)
-
-    def alter_card_table(self):
-        """
-        This method is to alter the dim_card_details table in the sales_data database.
-        This method alters the following column to its corresponding postgresSQL types.
-
-        Columns:
-            card_number: VARCHAR(?)
-            expiry_date: VARCHAR(?)
-            date_payment_confirmed: DATE
-
-            ? is integer representing maximum length of the values in that column
+        Args:
+            conn (Connection): connection the statements are executed in, inside its transaction
         """
-        # get max_lengths
-        with self.engine.connect() as conn:
-            results = conn.execute(text("""
-                select max(char_length(card_number)),
-                max(char_length(expiry_date::text))
-                from dim_card_details
-            """))
-            card_num_max_length, expiry_date_max_length = results.fetchone()
+        # weight class according to the weight values, missing weights are Truck_Required
+        weight_class = """
+                        CASE
+                        WHEN weight::float < 2 THEN 'Light'
+                        WHEN weight::float < 40 THEN 'Mid_Sized'
+                        WHEN weight::float < 140 THEN 'Heavy'
+                        ELSE 'Truck_Required'
+                        END
+                        """
+
+        # the table never leaves the database, the new columns are computed while the column types are altered so every row is rewritten once.
+        # rename the product_price(in £s) and weight(in kg) to product_price and weight, and the removed column to still_available
+        conn.execute(text('ALTER TABLE dim_products RENAME COLUMN "product_price(in £s)" TO product_price'))
+        conn.execute(text('ALTER TABLE dim_products RENAME COLUMN "weight(in kg)" TO weight'))
+        conn.execute(text('ALTER TABLE dim_products RENAME COLUMN removed TO still_available'))
+        conn.execute(text('ALTER TABLE dim_products ADD COLUMN weight_class TEXT'))
 
-        # alter tables
-        try:
-            with self.engine.begin() as conn:
-                conn.execute(text(f"""
-                                ALTER TABLE dim_card_details
-                                ALTER COLUMN card_number TYPE VARCHAR({card_num_max_length}),
-                                ALTER COLUMN expiry_date TYPE VARCHAR({expiry_date_max_length}),
-                                ALTER COLUMN date_payment_confirmed TYPE DATE
-                                """))
-        except SQLAlchemyError as e:
-            print(e)
+        # get max lengths for EAN, product_code and weight_class
+        results = conn.execute(text(f"""
+            select max(char_length("EAN"::text)),
+            max(char_length(product_code)),
+            max(char_length({weight_class}))
+            from dim_products
+        """))
+        EAN_max_length, product_code_max_length, weight_class_max_length = results.fetchone()
+
+        # alter tables, the USING expressions read the values of the other columns before they are altered
+        conn.execute(text(f"""
+                            ALTER TABLE dim_products
+                            ALTER COLUMN product_price TYPE FLOAT,
+                            ALTER COLUMN weight TYPE FLOAT USING weight::float,
+                            ALTER COLUMN "EAN" TYPE VARCHAR({EAN_max_length}),
+                            ALTER COLUMN product_code TYPE VARCHAR({product_code_max_length}),
+                            ALTER COLUMN date_added TYPE DATE,
+                            ALTER COLUMN uuid TYPE UUID USING uuid::uuid,
+                            ALTER COLUMN still_available TYPE BOOLEAN USING COALESCE(still_available = 'Still_avaliable', FALSE),
+                            ALTER COLUMN weight_class TYPE VARCHAR({weight_class_max_length}) USING {weight_class}
+                            """))
 
     def add_foreign_key(self, table_name: str, fk_table_name: str,  constraint_name: str, column_name: str):
         """
@@ -318,23 +158,111 @@ class AlterDatabase:
                 REFERENCES {fk_table_name}({column_name})
             """))
 
-    def add_foreign_keys(self):
+    def existing_foreign_keys(self, conn: Connection) -> set[str]:
+        """
+        This method returns the names of the foreign keys orders_table has in the postgres catalog.
+
+        Args:
+            conn (Connection): connection the query is executed in
+
+        Returns:
+            set[str]: the constraint names of the foreign keys, empty if orders_table does not exist
+        """
+        results = conn.execute(text("""
+            select conname
+            from pg_constraint
+            where conrelid = to_regclass('orders_table') and contype = 'f'
+        """))
+        return {constraint_name for constraint_name, in results}
+
+    def drop_foreign_keys(self):
+        """
+        This method drops the foreign keys of orders_table, so the tables they reference can be replaced by the next load.
+        Postgres does not drop a table referenced by a foreign key, and DataFrame.to_sql replaces a table without CASCADE.
+        Nothing is dropped if orders_table does not exist yet. add_foreign_keys adds them back once every table is loaded.
+        """
+        constraints = ', '.join(f"DROP CONSTRAINT IF EXISTS {constraint_name}" for _, constraint_name, _ in AlterDatabase.FOREIGN_KEYS)
+        with self.engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE IF EXISTS orders_table {constraints}"))
+
+    def create_foreign_key_index(self, table_name: str, column_name: str):
+        """
+        This method creates an index on a foreign key column, unless the column already has one.
+
+        Args:
+            table_name (str): the table the foreign key is assigned to
+            column_name (str): the foreign key column
+        """
+        with self.engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{column_name} ON {table_name} ({column_name})"))
+
+    def add_foreign_keys(self, deferred_validation: bool = False) -> dict[str, float]:
         """
         This method applies foreign key to the columns of orders_table with the primary key from the other tables starting with 'dim'
+        With deferred_validation, the foreign key columns are indexed first, the indexes are created at the same time on separate connections.
+        The foreign keys are then added NOT VALID in a single statement, which does not scan orders_table, and validated one after another.
+        Validating a foreign key only takes a lock that lets orders_table be read and written while it is scanned. Postgres validates the
+        foreign keys of a table one at a time, so they are not validated at the same time.
+        The foreign keys orders_table already has are not added again, so the tables loaded by an earlier run can be altered again.
+
+        Args:
+            deferred_validation (bool): whether the foreign key columns are indexed and the foreign keys added NOT VALID and validated afterwards
+
+        Returns:
+            dict[str, float]: phase to wall time in seconds, 'add' without deferred_validation, 'index', 'add' and 'validate' with it
         """
-        self.add_foreign_key('orders_table','dim_card_details', 'fk_orders_table_dim_card_details', 'card_number')
-        self.add_foreign_key('orders_table','dim_date_times', 'fk_orders_table_dim_date_times', 'date_uuid')
-        self.add_foreign_key('orders_table','dim_products', 'fk_orders_table_dim_products', 'product_code')
-        self.add_foreign_key('orders_table','dim_store_details', 'fk_orders_table_dim_store_details', 'store_code')
-        self.add_foreign_key('orders_table','dim_users', 'fk_orders_table_dim_users', 'user_uuid')
+        with self.engine.connect() as conn:
+            existing_foreign_keys = self.existing_foreign_keys(conn)
+        missing_foreign_keys = [foreign_key for foreign_key in AlterDatabase.FOREIGN_KEYS if foreign_key[1] not in existing_foreign_keys]
+
+        timings = {}
+        if not deferred_validation:
+            start = time.perf_counter()
+            for fk_table_name, constraint_name, column_name in missing_foreign_keys:
+                self.add_foreign_key('orders_table', fk_table_name, constraint_name, column_name)
+            timings['add'] = time.perf_counter() - start
+            print(f"foreign keys added in {timings['add']:.2f}s")
+            return timings
+
+        # index the foreign key columns, each index is built on its own connection
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(AlterDatabase.FOREIGN_KEYS)) as executor:
+            futures = [executor.submit(self.create_foreign_key_index, 'orders_table', column_name) for _, _, column_name in AlterDatabase.FOREIGN_KEYS]
+            for future in futures:
+                future.result()
+        timings['index'] = time.perf_counter() - start
+
+        # add the foreign keys without checking the existing rows
+        start = time.perf_counter()
+        if missing_foreign_keys:
+            constraints = ', '.join(f"ADD CONSTRAINT {constraint_name} FOREIGN KEY ({column_name}) REFERENCES {fk_table_name}({column_name}) NOT VALID"
+                                    for fk_table_name, constraint_name, column_name in missing_foreign_keys)
+            with self.engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE orders_table {constraints}"))
+        timings['add'] = time.perf_counter() - start
+
+        # check the existing rows, each foreign key in its own transaction. validating a foreign key that is already valid does nothing
+        start = time.perf_counter()
+        for _, constraint_name, _ in AlterDatabase.FOREIGN_KEYS:
+            with self.engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE orders_table VALIDATE CONSTRAINT {constraint_name}"))
+        timings['validate'] = time.perf_counter() - start
+
+        print("foreign keys " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items()))
+        return timings
 
     def alter_all(self):
         """
-        This method alters all the tables according to the hardcoded criteria
+        This method alters all the tables according to the hardcoded criteria, in a single transaction.
+        Each table is altered in its own savepoint, so a table that can not be altered is printed and left as it is without undoing the other tables.
         """
-        self.alter_orders_table()
-        self.alter_date_table()
-        self.alter_card_table()
-        self.alter_products_table()
-        self.alter_stores_table()
-        self.alter_users_table()
\ No newline at end of file
+        with self.engine.begin() as conn:
+            for table_name in ('orders_table', 'dim_date_times', 'dim_card_details', 'dim_products', 'dim_store_details', 'dim_users'):
+                try:
+                    with conn.begin_nested():
+                        if table_name == 'dim_products':
+                            self.alter_products_table(conn)
+                        else:
+                            self.alter_table(conn, table_name)
+                except SQLAlchemyError as e:
+                    print(e)
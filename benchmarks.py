@@ -0,0 +1,742 @@
+from database_utils import DatabaseConnector
+from data_cleaning import DataCleaning
+from schema_finaliser import SchemaFinaliser
+from string_transforms import StringTransforms
+from tests.reference_parsers import continent_by_row, email_by_row, price_by_row, staff_num_by_row, weight_to_kg_by_row, zero_pad_by_row
+import numpy as np
+import pandas as pd
+from typing import Callable
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+def make_orders_data(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    This method creates a synthetic cleaned orders dataframe with the same columns and dtypes as the orders_table table.
+
+    Args:
+        rows (int): number of rows to create
+        seed (int): seed of the random generator, the same seed creates the same data
+
+    Returns:
+        pd.DataFrame: synthetic orders data
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'index': np.arange(rows),
+        'date_uuid': [f'{value:032x}' for value in rng.integers(0, 2**63, rows)],
+        'user_uuid': [f'{value:032x}' for value in rng.integers(0, 2**63, rows)],
+        'card_number': rng.integers(10**11, 10**16, rows),
+        'store_code': [f'ST-{value:05d}' for value in rng.integers(0, 500, rows)],
+        'product_code': [f'p{value}-{value % 10}' for value in rng.integers(0, 2000, rows)],
+        'product_quantity': rng.integers(1, 13, rows),
+    })
+
+def make_uuids(rows: int, rng: np.random.Generator, block_rows: int = 1000000) -> list[str]:
+    """
+    This method creates random uuid strings. The hex digits are drawn and joined by numpy, a block of rows at a time to bound the memory of the arrays.
+
+    Args:
+        rows (int): number of uuids to create
+        rng (np.random.Generator): random generator
+        block_rows (int): number of uuids created at a time
+
+    Returns:
+        list[str]: uuid strings
+    """
+    hex_digits = np.frombuffer(b'0123456789abcdef', dtype='S1')
+    digit_positions = [position for position in range(36) if position not in (8, 13, 18, 23)]
+    uuids = []
+    for start in range(0, rows, block_rows):
+        block_size = min(block_rows, rows - start)
+        characters = np.full((block_size, 36), b'-', dtype='S1')
+        characters[:, digit_positions] = hex_digits[rng.integers(0, 16, (block_size, 32))]
+        uuids.extend(characters.view('S36').ravel().astype('U36').tolist())
+    return uuids
+
+def make_raw_orders_data(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    This method creates a synthetic raw orders dataframe with the same columns as the orders_table RDS table.
+    The level_0, index, first_name, last_name and 1 columns dropped by clean_orders_data are mostly empty, as in the RDS table.
+
+    Args:
+        rows (int): number of rows to create
+        seed (int): seed of the random generator, the same seed creates the same data
+
+    Returns:
+        pd.DataFrame: synthetic raw orders data
+    """
+    rng = np.random.default_rng(seed)
+    names = np.full(rows, None, dtype=object)
+    has_names = rng.random(rows) < 0.01
+    names[has_names] = [f'name{value}' for value in rng.integers(0, 1000, int(has_names.sum()))]
+    ones = np.full(rows, None, dtype=object)
+    has_ones = rng.random(rows) < 0.001
+    ones[has_ones] = rng.random(int(has_ones.sum()))
+
+    # the store and product codes are repeated, so every order shares the same string objects as in a dataframe read from the database
+    store_codes = np.array([f'ST-{value:05d}' for value in range(500)], dtype=object)
+    product_codes = np.array([f'p{value}-{value % 10}' for value in range(2000)], dtype=object)
+    return pd.DataFrame({
+        'level_0': np.arange(rows),
+        'index': np.arange(rows),
+        'date_uuid': make_uuids(rows, rng),
+        'first_name': names,
+        'last_name': names.copy(),
+        'user_uuid': make_uuids(rows, rng),
+        'card_number': rng.integers(10**11, 10**16, rows),
+        'store_code': store_codes[rng.integers(0, 500, rows)],
+        'product_code': product_codes[rng.integers(0, 2000, rows)],
+        '1': ones,
+        'product_quantity': rng.integers(1, 13, rows),
+    })
+
+def make_users_data(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    This method creates a synthetic raw users dataframe with the same columns and dirty patterns as the legacy_users RDS table.
+    Some emails have a double '@@', some country codes are 'GGB', some users are duplicated, some rows are 'NULL' in every column
+    and some are gibberish, with dates that can not be parsed and emails without '@'.
+
+    Args:
+        rows (int): number of rows to create
+        seed (int): seed of the random generator, the same seed creates the same data
+
+    Returns:
+        pd.DataFrame: synthetic users data
+    """
+    rng = np.random.default_rng(seed)
+    names = pd.Series([f'user{value}' for value in rng.integers(0, 10**6, rows)])
+    is_double_at = rng.random(rows) < 0.05
+    user_uuids = pd.Series(make_uuids(rows, rng))
+    is_duplicate = rng.random(rows) < 0.005
+    user_uuids[is_duplicate] = user_uuids.sample(int(is_duplicate.sum()), replace=True, random_state=seed).to_numpy()
+    dates = pd.Series(pd.Timestamp('1940-01-01') + pd.to_timedelta(rng.integers(0, 60 * 365, (2, rows)).ravel(), 'D')).dt.strftime('%Y-%m-%d')
+
+    data = pd.DataFrame({
+        'index': np.arange(rows),
+        'first_name': names.str.title(),
+        'last_name': 'Surname' + names.str[4:],
+        'date_of_birth': dates[:rows].to_numpy(),
+        'company': rng.choice(['Acme Ltd', 'Globex plc', 'Initech and Sons', 'Umbrella GmbH'], rows),
+        'email_address': names.where(~is_double_at, names + '@') + '@mail.com',
+        'address': pd.Series(rng.integers(1, 200, rows)).astype(str) + ' High Street',
+        'country': rng.choice(['United Kingdom', 'Germany', 'United States'], rows, p=[0.6, 0.25, 0.15]),
+        'country_code': rng.choice(['GB', 'DE', 'US', 'GGB'], rows, p=[0.59, 0.25, 0.15, 0.01]),
+        'phone_number': '+44 ' + pd.Series(rng.integers(10**9, 10**10, rows)).astype(str),
+        'join_date': dates[rows:].to_numpy(),
+        'user_uuid': user_uuids,
+    })
+
+    is_null_row = rng.random(rows) < 0.001
+    data.loc[is_null_row, data.columns[1:]] = 'NULL'
+    is_gibberish_row = rng.random(rows) < 0.001
+    gibberish = pd.Series(rng.integers(36**9, 36**10, rows)).map(lambda value: np.base_repr(value, 36))
+    for column in data.columns[1:-1]:
+        data.loc[is_gibberish_row, column] = gibberish[is_gibberish_row]
+
+    return data
+
+def make_stores_data(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    This method creates a synthetic raw stores dataframe with the same columns and dirty patterns as the store details API.
+    The first store is the web portal without coordinates or locality, some continents have an 'ee' prefix, some staff numbers contain letters,
+    the lat column is almost always empty and some rows are 'NULL' in every column or gibberish.
+
+    Args:
+        rows (int): number of rows to create
+        seed (int): seed of the random generator, the same seed creates the same data
+
+    Returns:
+        pd.DataFrame: synthetic stores data
+    """
+    rng = np.random.default_rng(seed)
+    staff_numbers = pd.Series(rng.integers(1, 100, rows)).astype(str)
+    has_letters = rng.random(rows) < 0.01
+    country_codes = rng.choice(['GB', 'DE', 'US'], rows, p=[0.6, 0.25, 0.15])
+
+    data = pd.DataFrame({
+        'index': np.arange(rows),
+        'address': pd.Series(rng.integers(1, 200, rows)).astype(str) + ' Market Street, Town',
+        'longitude': pd.Series(rng.uniform(-120, 20, rows).round(5)).astype(str),
+        'lat': None,
+        'locality': rng.choice(['High Wycombe', 'Berlin', 'Chapel Hill', 'Exeter', 'Munich'], rows),
+        'store_code': [f'ST-{value:08X}' for value in range(rows)],
+        'staff_numbers': staff_numbers.where(~has_letters, 'J' + staff_numbers + 'e'),
+        'opening_date': make_date_strings(rows, seed),
+        'store_type': rng.choice(['Local', 'Super Store', 'Mall Kiosk', 'Outlet'], rows),
+        'latitude': pd.Series(rng.uniform(30, 60, rows).round(5)).astype(str),
+        'country_code': country_codes,
+        'continent': np.where(country_codes == 'US', 'America', 'Europe'),
+    })
+    is_ee = rng.random(rows) < 0.03
+    data.loc[is_ee, 'continent'] = 'ee' + data.loc[is_ee, 'continent']
+    data.loc[0, ['longitude', 'locality', 'latitude', 'store_type']] = [None, None, None, 'Web Portal']
+
+    is_null_row = rng.random(rows) < 0.002
+    is_null_row[0] = False
+    data.loc[is_null_row, data.columns[1:]] = 'NULL'
+    is_gibberish_row = (rng.random(rows) < 0.002) & ~is_null_row
+    is_gibberish_row[0] = False
+    gibberish = pd.Series(rng.integers(36**9, 36**10, rows)).map(lambda value: np.base_repr(value, 36))
+    for column in ['address', 'longitude', 'locality', 'staff_numbers', 'store_type', 'latitude', 'country_code', 'continent']:
+        data.loc[is_gibberish_row, column] = gibberish[is_gibberish_row]
+
+    return data
+
+def make_date_events_data(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    This method creates a synthetic raw date events dataframe with the same columns and dirty patterns as date_details.json.
+    Months and days are not zero padded, and some rows are 'NULL' in every column or gibberish, with timestamps that can not be parsed.
+
+    Args:
+        rows (int): number of rows to create
+        seed (int): seed of the random generator, the same seed creates the same data
+
+    Returns:
+        pd.DataFrame: synthetic date events data
+    """
+    rng = np.random.default_rng(seed)
+    seconds = pd.Series(rng.integers(0, 24 * 3600, rows))
+    data = pd.DataFrame({
+        'timestamp': (seconds // 3600).astype(str).str.zfill(2) + ':' + (seconds // 60 % 60).astype(str).str.zfill(2) + ':' + (seconds % 60).astype(str).str.zfill(2),
+        'month': pd.Series(rng.integers(1, 13, rows)).astype(str),
+        'year': pd.Series(rng.integers(1992, 2023, rows)).astype(str),
+        'day': pd.Series(rng.integers(1, 29, rows)).astype(str),
+        'time_period': rng.choice(['Morning', 'Midday', 'Evening', 'Late_Hours'], rows),
+        'date_uuid': make_uuids(rows, rng),
+    })
+
+    is_null_row = rng.random(rows) < 0.001
+    data.loc[is_null_row, :] = 'NULL'
+    is_gibberish_row = (rng.random(rows) < 0.001) & ~is_null_row
+    gibberish = pd.Series(rng.integers(36**9, 36**10, rows)).map(lambda value: np.base_repr(value, 36))
+    for column in data.columns:
+        data.loc[is_gibberish_row, column] = gibberish[is_gibberish_row]
+
+    return data
+
+def make_date_strings(rows: int, seed: int = 0) -> pd.Series:
+    """
+    This method creates synthetic date strings in all the formats found in the card, store and product data.
+    Most dates are "YYYY-MM-DD", the rest are "YYYY/MM/DD", month name permutations such as "July 2005 21" and "2005 July 21", and invalid dates.
+
+    Args:
+        rows (int): number of dates to create
+        seed (int): seed of the random generator, the same seed creates the same data
+
+    Returns:
+        pd.Series: synthetic date strings
+    """
+    rng = np.random.default_rng(seed)
+    years = pd.Series(rng.integers(1990, 2023, rows)).astype(str)
+    months = pd.Series(rng.integers(1, 13, rows)).astype(str).str.zfill(2)
+    days = pd.Series(rng.integers(1, 29, rows)).astype(str).str.zfill(2)
+    month_names = pd.Series(np.array(list(DataCleaning.MONTHS_MAP))[rng.integers(0, 12, rows)])
+
+    formats = {
+        'dash': years + '-' + months + '-' + days,
+        'slash': years + '/' + months + '/' + days,
+        'month_year_day': month_names + ' ' + years + ' ' + days,
+        'year_month_day': years + ' ' + month_names + ' ' + days,
+        'short_dash': years + '-' + months.str[-1] + '-' + days,
+        'invalid': pd.Series(rng.integers(0, 10**10, rows)).astype(str),
+    }
+    choice = rng.choice(list(formats), size=rows, p=[0.97, 0.006, 0.006, 0.006, 0.006, 0.006])
+    dates = formats['dash'].copy()
+    for name, values in formats.items():
+        dates[choice == name] = values[choice == name]
+    return dates
+
+def benchmark_date_parser(rows: int = 1000000) -> dict[str, float]:
+    """
+    This method compares the time of parsing a column of dates row by row with custom_date_parser and over the whole column with normalise_dates.
+    Their results are compared on fixed edge cases by tests/test_normalise_dates.py.
+
+    Args:
+        rows (int): number of dates to parse
+
+    Returns:
+        dict[str, float]: parser to seconds taken
+    """
+    dates = make_date_strings(rows)
+
+    start = time.perf_counter()
+    dates.apply(DataCleaning.custom_date_parser)
+    row_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    DataCleaning.normalise_dates(dates)
+    column_seconds = time.perf_counter() - start
+
+    results = {'custom_date_parser': row_seconds, 'normalise_dates': column_seconds}
+    for name, seconds in results.items():
+        print(f"{name}: {seconds:.3f}s for {rows:,} dates")
+    return results
+
+def make_products_data(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    This method creates a synthetic raw products dataframe with the same columns and dirty patterns as products.csv.
+    The weights mix kg, g, ml and oz, multipacks such as "12 x 100g", trailing junk such as "77g .", unknown units, missing weights and invalid uppercase codes.
+
+    Args:
+        rows (int): number of rows to create
+        seed (int): seed of the random generator, the same seed creates the same data
+
+    Returns:
+        pd.DataFrame: synthetic products data
+    """
+    rng = np.random.default_rng(seed)
+    amounts = pd.Series(rng.integers(1, 1000, rows)).astype(str)
+    decimals = pd.Series(rng.integers(1, 100, rows) / 10).astype(str)
+    pack_sizes = pd.Series(rng.integers(2, 20, rows)).astype(str)
+
+    weight_formats = {
+        'kg': decimals + 'kg',
+        'g': amounts + 'g',
+        'ml': amounts + 'ml',
+        'oz': amounts + 'oz',
+        'multipack': pack_sizes + ' x ' + amounts + 'g',
+        'junk': amounts + 'g .',
+        'unknown_unit': amounts + 'lb',
+        'invalid': pd.Series(rng.integers(10**6, 10**7, rows)).astype(str) + 'XQ',
+    }
+    choice = rng.choice(list(weight_formats), size=rows, p=[0.4, 0.3, 0.1, 0.05, 0.05, 0.05, 0.025, 0.025])
+    weights = weight_formats['kg'].astype(object)
+    for name, values in weight_formats.items():
+        weights[choice == name] = values[choice == name]
+    weights[rng.random(rows) < 0.001] = np.nan
+
+    return pd.DataFrame({
+        'Unnamed: 0': np.arange(rows),
+        'product_name': [f'product {value}' for value in range(rows)],
+        'product_price': '£' + pd.Series(rng.integers(100, 100000, rows) / 100).astype(str),
+        'weight': weights,
+        'category': rng.choice(['toys-and-games', 'sports-and-leisure', 'pets', 'homeware', 'health-and-beauty', 'food-and-drink', 'diy'], rows),
+        'EAN': rng.integers(10**12, 10**13, rows).astype(str),
+        'date_added': make_date_strings(rows, seed),
+        'uuid': [f'{value:032x}' for value in rng.integers(0, 2**63, rows)],
+        'removed': rng.choice(['Still_avaliable', 'Removed'], rows),
+        # product codes are unique, as in products.csv
+        'product_code': [f'p{value}-{value % 10}' for value in rng.permutation(rows)],
+    })
+
+def benchmark_weights(rows: int = 1000000) -> dict[str, float]:
+    """
+    This method compares the time of converting product weights to kg row by row with weight_to_kg_by_row, as convert_product_weights used to, and over the whole column with convert_product_weights.
+    Their results are compared on fixed cases by tests/test_convert_product_weights.py.
+
+    Args:
+        rows (int): number of products
+
+    Returns:
+        dict[str, float]: converter to seconds taken
+    """
+    products = make_products_data(rows)
+
+    start = time.perf_counter()
+    converted_by_row = products.copy()
+    converted_by_row = converted_by_row[~converted_by_row['weight'].isna()]
+    converted_by_row = converted_by_row[~converted_by_row['weight'].str.contains('^[A-Z0-9]+$')]
+    converted_by_row['weight(in kg)'] = converted_by_row['weight'].apply(weight_to_kg_by_row)
+    converted_by_row.drop(columns=['weight'], inplace=True)
+    row_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    DataCleaning.convert_product_weights(products)
+    column_seconds = time.perf_counter() - start
+
+    results = {'weight_to_kg_by_row': row_seconds, 'convert_product_weights': column_seconds}
+    for name, seconds in results.items():
+        print(f"{name}: {seconds:.3f}s for {rows:,} products")
+    return results
+
+def make_string_columns(rows: int, seed: int = 0) -> dict[str, pd.Series]:
+    """
+    This method creates synthetic raw columns with the dirty patterns of the staff numbers, continents, emails, prices, months and days.
+
+    Args:
+        rows (int): number of values in each column
+        seed (int): seed of the random generator, the same seed creates the same data
+
+    Returns:
+        dict[str, pd.Series]: column name to synthetic column
+    """
+    rng = np.random.default_rng(seed)
+    numbers = pd.Series(rng.integers(1, 100, rows)).astype(str)
+    is_dirty = rng.random(rows) < 0.05
+    names = pd.Series([f'user{value}' for value in rng.integers(0, 10**6, rows)])
+
+    return {
+        'staff_numbers': numbers.where(~is_dirty, 'J' + numbers + 'e'),
+        'continent': pd.Series(rng.choice(['Europe', 'America', 'eeEurope', 'eeAmerica', 'asia'], rows, p=[0.6, 0.36, 0.015, 0.015, 0.01])),
+        'email_address': names.where(~is_dirty, names + '@') + '@mail.com',
+        'product_price': '£' + pd.Series(rng.integers(100, 100000, rows) / 100).astype(str),
+        'month': pd.Series(rng.integers(1, 13, rows)).astype(str),
+        'day': pd.Series(rng.integers(1, 32, rows)).astype(str),
+    }
+
+def benchmark_string_transforms(rows: int = 1000000) -> dict[str, float]:
+    """
+    This method compares the time of each string transform of StringTransforms with the row by row parser it replaced.
+    Their results are compared on fixed edge cases by tests/test_string_transforms.py.
+
+    Args:
+        rows (int): number of values in each column
+
+    Returns:
+        dict[str, float]: parser to seconds taken
+    """
+    columns = make_string_columns(rows)
+    cases = [
+        ('staff_numbers', staff_num_by_row, StringTransforms.keep_digits),
+        ('continent', continent_by_row, StringTransforms.strip_before_uppercase),
+        ('email_address', email_by_row, StringTransforms.fix_double_at),
+        ('product_price', price_by_row, StringTransforms.extract_price),
+        ('month', zero_pad_by_row, StringTransforms.zero_pad),
+        ('day', zero_pad_by_row, StringTransforms.zero_pad),
+    ]
+
+    results = {}
+    for column_name, row_parser, transform in cases:
+        start = time.perf_counter()
+        columns[column_name].apply(row_parser)
+        results[f'{row_parser.__name__}({column_name})'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        transform(columns[column_name])
+        results[f'{transform.__name__}({column_name})'] = time.perf_counter() - start
+
+    for name, seconds in results.items():
+        print(f"{name}: {seconds:.3f}s for {rows:,} values")
+    return results
+
+def make_card_data(rows: int, seed: int = 0, extra_columns: int = 0) -> pd.DataFrame:
+    """
+    This method creates a synthetic raw card dataframe with the same columns and dirty patterns as the card details pdf.
+    Card numbers are a mix of integers and strings, some start with '?', some rows are 'NULL' in every column and some dates are 'NaN' or non-standard.
+
+    Args:
+        rows (int): number of rows to create
+        seed (int): seed of the random generator, the same seed creates the same data
+        extra_columns (int): number of extra string columns added to make the table wider
+
+    Returns:
+        pd.DataFrame: synthetic card data
+    """
+    rng = np.random.default_rng(seed)
+    card_numbers = pd.Series(rng.integers(10**11, 10**16, rows)).astype(object)
+    is_string_number = rng.random(rows) < 0.5
+    card_numbers[is_string_number] = card_numbers[is_string_number].astype(str)
+    has_question_marks = rng.random(rows) < 0.01
+    card_numbers[has_question_marks] = '???' + card_numbers[has_question_marks].astype(str)
+
+    data = pd.DataFrame({
+        'card_number': card_numbers,
+        'expiry_date': pd.Series(rng.integers(1, 13, rows)).astype(str).str.zfill(2) + '/' + pd.Series(rng.integers(22, 33, rows)).astype(str),
+        'card_provider': rng.choice(['VISA 16 digit', 'JCB 16 digit', 'Diners Club / Carte Blanche', 'American Express', 'Maestro', 'Discover', 'Mastercard'], rows),
+        'date_payment_confirmed': make_date_strings(rows, seed),
+    })
+    for column in range(extra_columns):
+        data[f'extra_{column}'] = rng.choice(['alpha', 'beta', 'gamma', 'delta'], rows)
+
+    is_null_row = rng.random(rows) < 0.001
+    data.loc[is_null_row, :] = 'NULL'
+    is_nan_date = rng.random(rows) < 0.001
+    data.loc[is_nan_date, 'date_payment_confirmed'] = 'NaN'
+
+    return data
+
+def benchmark_sentinel_nulls(rows: int = 1000000, extra_columns: int = 20) -> dict[str, float]:
+    """
+    This method compares the time of finding the rows with 'NULL' or 'NaN' strings with two applymap passes, as clean_card_data used to,
+    and with a single find_sentinel_nulls pass, on a wide card table. Their results are compared on fixed cases by tests/test_sentinel_nulls.py.
+
+    Args:
+        rows (int): number of cards
+        extra_columns (int): number of extra string columns of the card table
+
+    Returns:
+        dict[str, float]: detector to seconds taken
+    """
+    cards = make_card_data(rows, extra_columns=extra_columns)
+
+    start = time.perf_counter()
+    null_string_values = cards.applymap(lambda x:x == 'NULL')
+    nan_string_values = cards.applymap(lambda x:x == 'NaN')
+    (null_string_values.any(axis=1) | nan_string_values.any(axis=1)).to_numpy()
+    applymap_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    DataCleaning.find_sentinel_nulls(cards)
+    isin_seconds = time.perf_counter() - start
+
+    results = {'applymap': applymap_seconds, 'find_sentinel_nulls': isin_seconds}
+    for name, seconds in results.items():
+        print(f"{name}: {seconds:.3f}s for {rows:,} cards with {len(cards.columns)} columns")
+    return results
+
+def benchmark_upload(rows: int = 100000, table_name: str = 'benchmark_upload') -> dict[str, float]:
+    """
+    This method compares the rows per second uploaded to the local database with COPY and with the INSERT statements of DataFrame.to_sql.
+    The local database credentials are read from 'config/local_db_creds.yaml', the benchmark table is dropped afterwards.
+
+    Args:
+        rows (int): number of rows to upload
+        table_name (str): name of the table created for the benchmark
+
+    Returns:
+        dict[str, float]: upload method to rows per second
+    """
+    data = make_orders_data(rows)
+    results = {}
+    for name, method in [('to_sql', None), ('copy', 'copy')]:
+        start = time.perf_counter()
+        DatabaseConnector.upload_to_db(data, table_name, method=method)
+        results[name] = rows / (time.perf_counter() - start)
+        print(f"{name}: {results[name]:,.0f} rows/sec")
+
+    with DatabaseConnector.init_local_db_engine().begin() as conn:
+        conn.exec_driver_sql(f"drop table if exists {table_name}")
+
+    return results
+
+
+# source table, generator of its raw data and clean method of every table benchmarked by the suite
+SUITE_TABLES = {
+    'dim_card_details': (make_card_data, DataCleaning.clean_card_data),
+    'dim_products': (make_products_data, DataCleaning.clean_products_data),
+    'dim_users': (make_users_data, DataCleaning.clean_user_data),
+    'dim_store_details': (make_stores_data, DataCleaning.clean_store_data),
+    'orders_table': (make_raw_orders_data, DataCleaning.clean_orders_data),
+    'dim_date_times': (make_date_events_data, DataCleaning.clean_date_data),
+}
+
+def best_time(func: Callable, repeat: int) -> tuple:
+    """
+    This method runs a function several times and returns its fastest time.
+
+    Args:
+        func (Callable): function to time, called without arguments
+        repeat (int): number of runs
+
+    Returns:
+        tuple: the fastest time in seconds, and the return value of the last run
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def git_commit() -> str:
+    """
+    This method returns the short hash of the commit checked out in the repository of this file, with '-dirty' if the working tree has uncommitted changes.
+
+    Returns:
+        str: the commit, 'unknown' if git is not available
+    """
+    repository = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repository, capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repository, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if status else '')
+
+def benchmark_suite(sizes: list[int], tables: list[str] = None, repeat: int = 1, load: bool = True, seed: int = 0) -> dict:
+    """
+    This method times the clean method of every table and the load of the cleaned data on synthetic raw data of every size.
+    The cleaned data is loaded the same way as by the pipeline, with the column types of SchemaFinaliser, into a 'benchmark_' table dropped afterwards.
+    The local database credentials are read from 'config/local_db_creds.yaml'.
+
+    Args:
+        sizes (list[int]): numbers of raw rows of every table
+        tables (list[str]): tables to benchmark, keys of SUITE_TABLES. None for every table
+        repeat (int): number of runs of every clean method and load, the fastest is kept
+        load (bool): whether to time the load into the local database
+        seed (int): seed of the generators
+
+    Returns:
+        dict: 'results', a list of the table, rows, stage, seconds and rows out of every run, with the 'commit' and the versions of python and pandas
+    """
+    results = []
+    for rows in sizes:
+        for table_name in tables or SUITE_TABLES:
+            make_data, cleaner = SUITE_TABLES[table_name]
+            raw_data = make_data(rows, seed)
+
+            seconds, clean_data = best_time(lambda: cleaner(raw_data), repeat)
+            results.append({'table': table_name, 'rows': rows, 'stage': 'clean', 'call': cleaner.__qualname__, 'seconds': seconds, 'rows_out': len(clean_data)})
+            print(f"{table_name} clean: {seconds:.3f}s for {rows:,} rows, {rows / seconds:,.0f} rows/sec")
+            del raw_data
+
+            if load:
+                benchmark_table_name = f'benchmark_{table_name}'
+
+                def load_data():
+                    data, column_types = SchemaFinaliser.finalise(clean_data, table_name)
+                    DatabaseConnector.upload_to_db(data, benchmark_table_name, dtype=column_types)
+
+                seconds, _ = best_time(load_data, repeat)
+                results.append({'table': table_name, 'rows': rows, 'stage': 'load', 'call': 'SchemaFinaliser.upload_to_db', 'seconds': seconds, 'rows_out': len(clean_data)})
+                print(f"{table_name} load: {seconds:.3f}s for {len(clean_data):,} rows, {len(clean_data) / seconds:,.0f} rows/sec")
+
+                with DatabaseConnector.init_local_db_engine().begin() as conn:
+                    conn.exec_driver_sql(f"drop table if exists {benchmark_table_name}")
+            del clean_data
+
+    return {'commit': git_commit(), 'created': time.time(), 'python': platform.python_version(), 'pandas': pd.__version__,
+            'seed': seed, 'repeat': repeat, 'results': results}
+
+def benchmark_cleaning_memory(rows: int, tables: list[str] = None, seed: int = 0) -> dict:
+    """
+    This method compares the peak memory allocated while cleaning the synthetic raw data of every table, copying the raw data first as by default
+    and with the raw data handed over to the clean method with inplace=True, as the pipeline does. The allocations are traced with tracemalloc
+    from the generation of the raw data, so the peak includes the raw data the caller still holds, and the memory it frees when cleaned in place.
+
+    Args:
+        rows (int): number of raw rows of every table
+        tables (list[str]): tables to benchmark, keys of SUITE_TABLES. None for every table
+        seed (int): seed of the generators
+
+    Returns:
+        dict: table name to the size of the raw data and the peak of both modes in bytes
+    """
+    results = {}
+    for table_name in tables or SUITE_TABLES:
+        make_data, cleaner = SUITE_TABLES[table_name]
+        results[table_name] = {}
+        for mode, inplace in (('copy', False), ('inplace', True)):
+            tracemalloc.start()
+            raw_data = make_data(rows, seed)
+            # the garbage left by the generator is collected so that it is not counted as raw data
+            gc.collect()
+            raw_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+            clean_data = cleaner(raw_data, inplace=inplace)
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            del raw_data, clean_data
+            gc.collect()
+
+            results[table_name]['raw_bytes'] = raw_bytes
+            results[table_name][f'{mode}_peak_bytes'] = peak_bytes
+
+        # most of the raw data are strings shared by the raw and the cleaned data in both modes, the allocations above the raw data are the ones the copies add to
+        result = results[table_name]
+        copy_extra_bytes = result['copy_peak_bytes'] - result['raw_bytes']
+        inplace_extra_bytes = result['inplace_peak_bytes'] - result['raw_bytes']
+        print(f"{table_name}: raw data {result['raw_bytes'] / 2**20:,.1f} MiB, peak {result['copy_peak_bytes'] / 2**20:,.1f} MiB copied -> {result['inplace_peak_bytes'] / 2**20:,.1f} MiB in place, "
+              f"{copy_extra_bytes / 2**20:,.1f} MiB -> {inplace_extra_bytes / 2**20:,.1f} MiB above the raw data ({1 - inplace_extra_bytes / copy_extra_bytes:.0%} less)")
+
+    return results
+
+def save_results(suite_results: dict, directory: str = "benchmark_results") -> str:
+    """
+    This method saves the results of a benchmark suite run to a json file named after the time and the commit it was run on.
+
+    Args:
+        suite_results (dict): results returned by benchmark_suite
+        directory (str): directory of the results files
+
+    Returns:
+        str: path to the results file
+    """
+    os.makedirs(directory, exist_ok=True)
+    filepath = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{suite_results['commit']}.json")
+    with open(filepath, "w") as file:
+        json.dump(suite_results, file, indent=4)
+    print(f"results saved to {filepath}")
+    return filepath
+
+def compare_results(baseline_filepath: str, filepath: str) -> list[dict]:
+    """
+    This method compares the times of two benchmark suite runs, e.g. on two commits, for the table, rows and stage run by both.
+
+    Args:
+        baseline_filepath (str): path to the results file of the baseline run
+        filepath (str): path to the results file of the run compared to the baseline
+
+    Returns:
+        list[dict]: the table, rows, stage, both times and the speedup of every comparable result
+    """
+    with open(baseline_filepath, "r") as file:
+        baseline = json.load(file)
+    with open(filepath, "r") as file:
+        compared = json.load(file)
+
+    baseline_seconds = {(result['table'], result['rows'], result['stage']): result['seconds'] for result in baseline['results']}
+    comparison = []
+    print(f"{baseline['commit']} -> {compared['commit']}")
+    for result in compared['results']:
+        key = (result['table'], result['rows'], result['stage'])
+        if key not in baseline_seconds:
+            continue
+        speedup = baseline_seconds[key] / result['seconds']
+        comparison.append({'table': key[0], 'rows': key[1], 'stage': key[2], 'baseline_seconds': baseline_seconds[key], 'seconds': result['seconds'], 'speedup': speedup})
+        print(f"{key[0]} {key[2]} {key[1]:,} rows: {baseline_seconds[key]:.3f}s -> {result['seconds']:.3f}s, {speedup:.2f}x")
+
+    return comparison
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the retail data pipeline.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    upload_parser = subparsers.add_parser("upload", help="rows/sec of COPY against to_sql INSERTs, needs the local database")
+    upload_parser.add_argument("--rows", type=int, default=100000)
+
+    dates_parser = subparsers.add_parser("dates", help="row by row against vectorized date parsing")
+    dates_parser.add_argument("--rows", type=int, default=1000000)
+
+    weights_parser = subparsers.add_parser("weights", help="row by row against vectorized product weight conversion")
+    weights_parser.add_argument("--rows", type=int, default=1000000)
+
+    strings_parser = subparsers.add_parser("strings", help="row by row parsers against vectorized string transforms")
+    strings_parser.add_argument("--rows", type=int, default=1000000)
+
+    nulls_parser = subparsers.add_parser("nulls", help="applymap against isin detection of 'NULL' and 'NaN' strings in a wide card table")
+    nulls_parser.add_argument("--rows", type=int, default=1000000)
+    nulls_parser.add_argument("--columns", type=int, default=20, help="number of extra string columns")
+
+    suite_parser = subparsers.add_parser("suite", help="every clean method and the load of every table on synthetic data of every size, saving the results to compare commits")
+    suite_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000, 10000000], help="numbers of raw rows of every table")
+    suite_parser.add_argument("--tables", nargs="+", choices=list(SUITE_TABLES), help="tables to benchmark, every table by default")
+    suite_parser.add_argument("--repeat", type=int, default=1, help="number of runs of every benchmark, the fastest is kept")
+    suite_parser.add_argument("--seed", type=int, default=0)
+    suite_parser.add_argument("--no-load", action="store_true", help="only time the clean methods, without the local database")
+    suite_parser.add_argument("--output-dir", default="benchmark_results", help="directory of the results files")
+
+    memory_parser = subparsers.add_parser("memory", help="peak memory of every clean method, copying the raw data against cleaning it in place")
+    memory_parser.add_argument("--rows", type=int, default=1000000)
+    memory_parser.add_argument("--tables", nargs="+", choices=list(SUITE_TABLES), help="tables to benchmark, every table by default")
+    memory_parser.add_argument("--seed", type=int, default=0)
+
+    compare_parser = subparsers.add_parser("compare", help="compare the results files of two suite runs")
+    compare_parser.add_argument("baseline", help="results file of the baseline run")
+    compare_parser.add_argument("results", help="results file of the run compared to the baseline")
+
+    args = parser.parse_args()
+
+    if args.benchmark == "upload":
+        benchmark_upload(args.rows)
+    elif args.benchmark == "dates":
+        benchmark_date_parser(args.rows)
+    elif args.benchmark == "weights":
+        benchmark_weights(args.rows)
+    elif args.benchmark == "strings":
+        benchmark_string_transforms(args.rows)
+    elif args.benchmark == "nulls":
+        benchmark_sentinel_nulls(args.rows, args.columns)
+    elif args.benchmark == "suite":
+        save_results(benchmark_suite(args.sizes, args.tables, args.repeat, load=not args.no_load, seed=args.seed), args.output_dir)
+    elif args.benchmark == "memory":
+        benchmark_cleaning_memory(args.rows, args.tables, args.seed)
+    elif args.benchmark == "compare":
+        compare_results(args.baseline, args.results)
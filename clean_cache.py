@@ -0,0 +1,276 @@
+from parquet_frames import ParquetFrames
+from typing import Callable, Iterable
+import pandas as pd
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+class CleanedFrameCache:
+    """
+    This class memoizes the clean methods of DataCleaning on disk. A cleaned dataframe is stored as Parquet under a fingerprint of the raw dataframe
+    and of the cleaning code, so cleaning an unchanged source with unchanged code reads the stored result instead of cleaning again.
+    The least recently used results are evicted when the cache grows over its size limit.
+
+    Attributes:
+        CODE_MODULES (tuple[str]): modules whose source code is part of the fingerprint, changing any of them invalidates the cache
+        directory (str): directory holding the Parquet files and the index
+        max_bytes (int): maximum total size of the Parquet files in bytes
+        index_filepath (str): path to the json index of the cache, fingerprint to the cleaner, rows, size and last use of its stored result
+    """
+    CODE_MODULES = ('data_cleaning', 'string_transforms')
+
+    def __init__(self, directory: str = "cache/cleaned", max_bytes: int = 2**30) -> None:
+        """
+        Args:
+            directory (str): directory holding the Parquet files and the index
+            max_bytes (int): maximum total size of the Parquet files in bytes
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_filepath = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        """
+        This method returns the state the cache is pickled with, e.g. to send it to a process pool. The lock is not picklable and is left out.
+
+        Returns:
+            dict: attribute name to value key value pairs without the lock
+        """
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        This method restores a pickled cache with a new lock. The index is on disk, so every process shares it, but only the threads of a process share the lock.
+
+        Args:
+            state (dict): attribute name to value key value pairs without the lock
+        """
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def code_version(cleaner: Callable[[pd.DataFrame], pd.DataFrame]) -> str:
+        """
+        This method returns a hash of the cleaner's name and of the source code of the cleaning modules.
+
+        Args:
+            cleaner (Callable[[pd.DataFrame], pd.DataFrame]): clean method, e.g. DataCleaning.clean_card_data
+
+        Returns:
+            str: sha256 hex digest of the cleaning code
+        """
+        sha256 = hashlib.sha256(cleaner.__qualname__.encode())
+        for module_name in CleanedFrameCache.CODE_MODULES:
+            sha256.update(inspect.getsource(sys.modules.get(module_name) or __import__(module_name)).encode())
+        return sha256.hexdigest()
+
+    @staticmethod
+    def fingerprint(data: pd.DataFrame, cleaner: Callable[[pd.DataFrame], pd.DataFrame]) -> str:
+        """
+        This method returns the fingerprint of cleaning a dataframe with a cleaner: a hash of the rows, index, column names and dtypes of the dataframe and of the cleaning code.
+
+        Args:
+            data (pd.DataFrame): raw dataframe
+            cleaner (Callable[[pd.DataFrame], pd.DataFrame]): clean method, e.g. DataCleaning.clean_card_data
+
+        Returns:
+            str: sha256 hex digest of the raw dataframe and the cleaning code
+        """
+        sha256 = hashlib.sha256(CleanedFrameCache.code_version(cleaner).encode())
+        sha256.update(json.dumps(ParquetFrames.dtype_names(data)).encode())
+        sha256.update(pd.util.hash_pandas_object(data.index).to_numpy().tobytes())
+
+        for _, column in data.items():
+            # hash_pandas_object converts pyarrow strings to python objects first, so their arrow buffers are hashed instead.
+            # the same buffers, offset and length always hold the same strings, so this never mistakes two different columns for one.
+            if isinstance(column.dtype, pd.StringDtype) and column.dtype.storage == 'pyarrow':
+                for chunk in column.array.__arrow_array__().chunks:
+                    sha256.update(f"{chunk.offset}:{len(chunk)}".encode())
+                    for buffer in chunk.buffers():
+                        sha256.update(b'' if buffer is None else buffer)
+            else:
+                sha256.update(pd.util.hash_pandas_object(column, index=False).to_numpy().tobytes())
+
+        return sha256.hexdigest()
+
+    def read_index(self) -> dict:
+        """
+        This method reads the index of the cache.
+
+        Returns:
+            dict: fingerprint to cache entry key value pairs. empty if nothing has been cached yet.
+        """
+        if not os.path.exists(self.index_filepath):
+            return {}
+
+        with open(self.index_filepath, "r") as file:
+            return json.load(file)
+
+    def write_index(self, index: dict) -> None:
+        """
+        This method replaces the index of the cache. The file is replaced atomically, so a failed run never leaves a partially written index.
+
+        Args:
+            index (dict): fingerprint to cache entry key value pairs
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        temp_filepath = self.index_filepath + f".{uuid.uuid4().hex}.tmp"
+        with open(temp_filepath, "w") as file:
+            json.dump(index, file, indent=4)
+        os.replace(temp_filepath, self.index_filepath)
+
+    def get(self, key: str) -> pd.DataFrame:
+        """
+        This method reads a cleaned dataframe from the cache and marks it as used now.
+
+        Args:
+            key (str): fingerprint of the cleaned dataframe
+
+        Returns:
+            pd.DataFrame: the cleaned dataframe with its original dtypes, None if it is not in the cache
+        """
+        with self._lock:
+            index = self.read_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            entry['last_used'] = time.time()
+            self.write_index(index)
+
+        filepath = os.path.join(self.directory, f"{key}.parquet")
+        if not os.path.exists(filepath):
+            return None
+        return ParquetFrames.read(filepath, entry['schema'])
+
+    def put(self, key: str, data: pd.DataFrame, cleaner_name: str) -> bool:
+        """
+        This method stores a cleaned dataframe in the cache and evicts the least recently used results over the size limit.
+
+        Args:
+            key (str): fingerprint of the cleaned dataframe
+            data (pd.DataFrame): cleaned dataframe
+            cleaner_name (str): name of the clean method, shown by the CLI
+
+        Returns:
+            bool: whether the dataframe was stored. dataframes with columns Parquet can not store, e.g. mixing strings and numbers, are not stored.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        filepath = os.path.join(self.directory, f"{key}.parquet")
+        schema = ParquetFrames.write(data, filepath)
+        if schema is None:
+            print(f"{cleaner_name} result not cached: its columns can not be stored as Parquet")
+            return False
+
+        with self._lock:
+            index = self.read_index()
+            index[key] = {'cleaner': cleaner_name,
+                          'rows': len(data),
+                          'schema': schema,
+                          'size': os.path.getsize(filepath),
+                          'created': time.time(),
+                          'last_used': time.time()}
+            self.evict(index, keep=key)
+            self.write_index(index)
+
+        return True
+
+    def evict(self, index: dict, keep: str = None) -> None:
+        """
+        This method removes the least recently used entries from the index and deletes their files until the stored results fit in max_bytes.
+
+        Args:
+            index (dict): fingerprint to cache entry key value pairs, updated in place
+            keep (str): fingerprint that is never evicted, e.g. the result that has just been stored
+        """
+        total_size = sum(entry['size'] for entry in index.values())
+        for key in sorted(index, key=lambda key: index[key]['last_used']):
+            if total_size <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total_size -= index.pop(key)['size']
+            self.remove_file(key)
+
+    def remove_file(self, key: str) -> None:
+        """
+        This method deletes the Parquet file of a stored result.
+
+        Args:
+            key (str): fingerprint of the stored result
+        """
+        filepath = os.path.join(self.directory, f"{key}.parquet")
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+    def invalidate(self, keys: Iterable[str] = None, cleaner_name: str = None) -> int:
+        """
+        This method removes stored results from the cache, all of them if neither keys nor cleaner_name are given.
+
+        Args:
+            keys (Iterable[str]): fingerprints of the results to remove
+            cleaner_name (str): name of the clean method whose results are removed
+
+        Returns:
+            int: number of results removed
+        """
+        keys = set(keys or [])
+        with self._lock:
+            index = self.read_index()
+            removed = [key for key, entry in index.items()
+                       if (not keys and cleaner_name is None) or key in keys or entry['cleaner'] == cleaner_name]
+            for key in removed:
+                del index[key]
+                self.remove_file(key)
+            self.write_index(index)
+
+        return len(removed)
+
+    def clean(self, data: pd.DataFrame, cleaner: Callable[[pd.DataFrame], pd.DataFrame]) -> pd.DataFrame:
+        """
+        This method cleans a dataframe with a cleaner, reading the result from the cache if the same dataframe has been cleaned by the same code before.
+
+        Args:
+            data (pd.DataFrame): raw dataframe
+            cleaner (Callable[[pd.DataFrame], pd.DataFrame]): clean method, e.g. DataCleaning.clean_card_data
+
+        Returns:
+            pd.DataFrame: the cleaned dataframe
+        """
+        key = CleanedFrameCache.fingerprint(data, cleaner)
+        cleaned = self.get(key)
+        if cleaned is not None:
+            return cleaned
+
+        cleaned = cleaner(data)
+        self.put(key, cleaned, cleaner.__qualname__)
+        return cleaned
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the cache of cleaned dataframes.")
+    parser.add_argument("--cache-dir", default="cache/cleaned", help="directory of the cache")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="list the stored results, least recently used first")
+    invalidate_parser = subparsers.add_parser("invalidate", help="remove stored results, all of them if no option is given")
+    invalidate_parser.add_argument("--key", action="append", help="fingerprint of a result to remove, can be repeated")
+    invalidate_parser.add_argument("--cleaner", help="remove the results of a clean method, e.g. DataCleaning.clean_card_data")
+    args = parser.parse_args()
+
+    cache = CleanedFrameCache(args.cache_dir)
+    if args.command == "list":
+        index = cache.read_index()
+        for key, entry in sorted(index.items(), key=lambda item: item[1]['last_used']):
+            last_used = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['last_used']))
+            print(f"{key[:16]}  {entry['cleaner']:<35} {entry['rows']:>10,} rows {entry['size'] / 2**20:>9.1f} MiB  last used {last_used}")
+        print(f"{len(index)} results, {sum(entry['size'] for entry in index.values()) / 2**20:.1f} MiB")
+    elif args.command == "invalidate":
+        print(f"{cache.invalidate(args.key, args.cleaner)} results removed")
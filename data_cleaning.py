@@ -1,15 +1,47 @@
+import functools
+import numpy as np
 import pandas as pd
-from typing import Union
+from typing import Callable, Iterable, Iterator, Union
 import re
+from string_transforms import STRING_DTYPE, NON_LETTER_PATTERN, StringTransforms
+
 
 class DataCleaning:
     """
     This class is for datacleaning data from various sources
+
+    Attributes:
+        MONTHS_MAP (dict[str, str]): month name to two digit month number
+        NULL_SENTINELS (tuple[str]): strings the sources use in place of missing values
+        ORDERS_DROPPED_COLUMNS (list[str]): columns of the orders table dropped by clean_orders_data, they can be left out of the extraction
+        SOURCE_SPECS (dict[str, dict]): clean method name to the columns and rows of its RDS table it discards, so they can be left out of the extraction.
+                                        'exclude_columns' are dropped, only the first row in watermark order of every 'distinct_on' value is kept,
+                                        and with 'not_null' the rows with a missing value in any column are dropped after the duplicates.
     """
+    MONTHS_MAP = {"January":"01", 
+                  "February":"02", 
+                  "March":"03", 
+                  "April":"04", 
+                  "May":"05", 
+                  "June":"06", 
+                  "July":"07", 
+                  "August":"08", 
+                  "September":"09", 
+                  "October":"10", 
+                  "November":"11", 
+                  "December":"12"}
+    NULL_SENTINELS = ('NULL', 'NaN')
+    ORDERS_DROPPED_COLUMNS = ['level_0', 'index', 'first_name', 'last_name', '1']
+    SOURCE_SPECS = {
+        'clean_user_data': {'exclude_columns': ['index'], 'distinct_on': 'user_uuid', 'not_null': True},
+        'clean_orders_data': {'exclude_columns': ORDERS_DROPPED_COLUMNS},
+    }
+
     @staticmethod
     def custom_date_parser(date_str: str) -> Union[str, pd.NaT]:
             """
             This nested function is a custom parser to parse dates in card data to proper format.
+            It parses a single date, normalise_dates parses a whole column of dates the same way.
 
             Args:
                 date_str (str): a date string.
@@ -29,24 +61,11 @@ class DataCleaning:
                     return date_str
             
             else:
-                months_map = {"January":"01", 
-                        "February":"02", 
-                        "March":"03", 
-                        "April":"04", 
-                        "May":"05", 
-                        "June":"06", 
-                        "July":"07", 
-                        "August":"08", 
-                        "September":"09", 
-                        "October":"10", 
-                        "November":"11", 
-                        "December":"12"}
-                
                 year = month = day = None
                 split_date = date_str.split()
                 for elem in split_date:
-                    if elem in months_map.keys():
-                        month = months_map[elem]
+                    if elem in DataCleaning.MONTHS_MAP.keys():
+                        month = DataCleaning.MONTHS_MAP[elem]
                     elif len(elem) == 4:
                         year = elem
                     elif len(elem) == 2:
@@ -58,19 +77,149 @@ class DataCleaning:
                 return pd.NaT
 
     @staticmethod
-    def clean_user_data(data: pd.DataFrame) -> pd.DataFrame:
+    def normalise_dates(dates: pd.Series) -> pd.Series:
+        """
+        This method normalises a column of date strings to the format YYYY-MM-DD with vectorized string operations over the whole column.
+        It parses the dates the same way as custom_date_parser: "YYYY/MM/DD" has its "/" replaced with "-", "YYYY-MM-DD" is kept
+        and dates written with a month name, e.g. "July 2005 21" or "2005 July 21", are rearranged.
+
+        Args:
+            dates (pd.Series): column of date strings
+
+        Returns:
+            pd.Series: dates in the format YYYY-MM-DD, pd.NaT for missing or non-standard formatted dates
+        """
+        # the masks are computed with vectorized string operations, which run in pyarrow compute kernels when pyarrow is installed.
+        # the dates are then copied into the result by position, so only the few non-standard dates are converted
+        raw_dates = dates.to_numpy(dtype=object)
+        values = dates.reset_index(drop=True) if dates.dtype == STRING_DTYPE else pd.Series(pd.array(raw_dates, dtype=STRING_DTYPE))
+        normalised = np.full(len(raw_dates), pd.NaT, dtype=object)
+
+        # for all the normal dates, the first three parts must be 4, 2 and 2 characters long. this single pass matches most of the dates
+        is_valid_dash = values.str.fullmatch(r'[^/-]{4}-[^/-]{2}-[^/-]{2}(?:-[^/]*)?').fillna(False).to_numpy(dtype=bool)
+        normalised[is_valid_dash] = raw_dates[is_valid_dash]
+
+        # the remaining dates either have a "/", are invalid dates with a "-", or have month names
+        is_remaining = ~is_valid_dash & values.notna().to_numpy()
+        remaining = values[is_remaining]
+        has_slash = np.zeros(len(raw_dates), dtype=bool)
+        has_slash[is_remaining] = remaining.str.contains('/', regex=False).to_numpy(dtype=bool)
+        has_dash = np.zeros(len(raw_dates), dtype=bool)
+        has_dash[is_remaining] = remaining.str.contains('-', regex=False).to_numpy(dtype=bool)
+        is_other = is_remaining & ~has_slash & ~has_dash
+
+        # for the special date anomaly with "/"
+        normalised[has_slash] = values[has_slash].str.replace('/', '-', regex=False).to_numpy(dtype=object)
+
+        # for dates with month names, the last month name, 4 character and 2 character parts are the month, year and day
+        other_dates = pd.Series(raw_dates[is_other], index=np.flatnonzero(is_other), dtype=object)
+        tokens = other_dates.str.split().explode()
+        token_lengths = tokens.str.len()
+        months = tokens.map(DataCleaning.MONTHS_MAP)
+        is_month = months.notna()
+        month = months.groupby(level=0).last()
+        year = tokens.where(~is_month & (token_lengths == 4)).groupby(level=0).last()
+        day = tokens.where(~is_month & (token_lengths == 2)).groupby(level=0).last()
+        month_name_dates = (year + '-' + month + '-' + day).dropna()
+        normalised[month_name_dates.index.to_numpy(dtype=int)] = month_name_dates.to_numpy(dtype=object)
+
+        return pd.Series(normalised, index=dates.index, name=dates.name)
+
+    @staticmethod
+    def find_sentinel_nulls(data: pd.DataFrame, sentinels: Iterable[str] = NULL_SENTINELS) -> np.ndarray:
+        """
+        This method finds the rows that have a sentinel string such as 'NULL' in place of a missing value in any of their string columns.
+        Each string column is checked with vectorized comparisons, so the whole frame is scanned once.
+
+        Args:
+            data (pd.DataFrame): dataframe to be checked
+            sentinels (Iterable[str]): strings that stand for a missing value
+
+        Returns:
+            np.ndarray: boolean mask of the rows that have a sentinel string
+        """
+        sentinels = list(sentinels)
+        has_sentinel = np.zeros(len(data), dtype=bool)
+        for _, column in data.items():
+            if column.dtype == object:
+                # comparing the values with each of the few sentinels is faster than hashing every value for isin
+                values = column.to_numpy()
+                for sentinel in sentinels:
+                    has_sentinel |= values == sentinel
+            elif isinstance(column.dtype, (pd.StringDtype, pd.CategoricalDtype)) or (isinstance(column.dtype, pd.ArrowDtype) and column.dtype.type is str):
+                # string columns read with the pyarrow dtype backend have an ArrowDtype instead of a StringDtype
+                has_sentinel |= column.isin(sentinels).to_numpy(dtype=bool)
+
+        return has_sentinel
+
+    @staticmethod
+    def keep_rows(data: pd.DataFrame, keep: np.ndarray) -> pd.DataFrame:
+        """
+        This method keeps the rows of a dataframe selected by a boolean mask, changing the dataframe in place.
+        The columns of the dataframe are replaced by the kept rows, so the memory of the old columns is freed even while a caller still holds the dataframe.
+        A dataframe with duplicate index labels cannot be changed in place and its kept rows are returned as a new dataframe.
+
+        Args:
+            data (pd.DataFrame): dataframe owned by the cleaner
+            keep (np.ndarray): boolean mask of the rows to keep
+
+        Returns:
+            pd.DataFrame: the dataframe with the kept rows
+        """
+        positions = np.flatnonzero(keep)
+        if len(positions) == len(data):
+            return data
+
+        if not data.index.is_unique:
+            return data.take(positions)
+
+        # drop the labels of the other rows, by position so that the index is not searched for them
+        data.drop(index=data.index.delete(positions), inplace=True)
+        return data
+
+    @staticmethod
+    def clean_chunks(chunks: Iterable[pd.DataFrame], cleaner: Callable[[pd.DataFrame], pd.DataFrame], unique_column: str = None) -> Iterator[pd.DataFrame]:
+        """
+        This method cleans an iterable of dataframe chunks with one of the clean methods of this class and yields the cleaned chunks.
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): dataframe chunks to be cleaned
+            cleaner (Callable[[pd.DataFrame], pd.DataFrame]): clean method applied to every chunk, e.g. DataCleaning.clean_user_data
+            unique_column (str): column the cleaner drops duplicates on. rows whose value was already seen in an earlier chunk are dropped before cleaning, the same as dropping duplicates over the whole data.
+
+        Yields:
+            pd.DataFrame: the next cleaned chunk
+        """
+        seen_values = set()
+        for chunk in chunks:
+            if unique_column is not None:
+                # take returns a new dataframe rather than a view of the chunk, so it can be handed over to the cleaner
+                is_seen = chunk[unique_column].isin(seen_values).to_numpy(dtype=bool)
+                if is_seen.any():
+                    chunk = chunk.take(np.flatnonzero(~is_seen))
+                seen_values.update(chunk[unique_column])
+
+            # the cleaners expect at least one row to infer the column types
+            if chunk.empty:
+                continue
+
+            yield cleaner(chunk)
+
+    @staticmethod
+    def clean_user_data(data: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """
         This method cleans the user data.
         Note: most of the columns for user data has been cleaned. however, the phone number and address has been ignored.
         Args:
             data (pd.DataFrame): user data to be cleaned
+            inplace (bool): whether the data is handed over to the cleaner, which then cleans it in place instead of copying it first. The data must not be used after the call.
 
         Returns:
             df (pd.DataFrame): cleaned data
         """
 
-        # make a copy
-        clean_df = data.copy()
+        # make a copy, unless the data was handed over
+        clean_df = data if inplace else data.copy()
 
         # drop users with duplicate uuid
         clean_df.drop_duplicates(subset=['user_uuid'], inplace=True)
@@ -86,36 +235,19 @@ class DataCleaning:
         clean_df['join_date'] = pd.to_datetime(clean_df['join_date'], errors='coerce')
         clean_df.dropna(subset=['join_date'])
 
-        # drop the index column
-        clean_df.drop(columns=['index'], inplace=True)
+        # drop the index column, unless it was left out of the extraction
+        clean_df.drop(columns=['index'], inplace=True, errors='ignore')
 
-        # reorder the columns, make user_uuid the first column
-        cols = list(clean_df.columns)
-        cols = [cols[-1]] + cols[:-1]
-        clean_df = clean_df[cols]
+        # reorder the columns, make user_uuid the first column. moving the one column does not copy the others
+        last_column = clean_df.columns[-1]
+        clean_df.insert(0, last_column, clean_df.pop(last_column))
 
         # clean double '@' in emails
-        def custom_email_parser(email: str) -> str:
-            """
-            custom parser to replace '@@' with '@'
-
-            Args:
-                email (str): email string
-
-            Returns:
-                str: email string with '@@' replaced by '@'
-            """
-            if '@@' not in email:
-                return email
-            
-            email_char_list = list(email)
-            email_char_list.remove('@')
-            return ''.join(email_char_list)
-
-        clean_df['email_address'] = clean_df['email_address'].apply(custom_email_parser)
+        clean_df['email_address'] = StringTransforms.fix_double_at(clean_df['email_address'])
             
         # remove rows with invalid email
-        clean_df = clean_df[clean_df['email_address'].str.contains('^[\w_.+-]+@[\w-]+\.[a-zA-Z0-9-.]+$', flags=re.UNICODE, regex=True)]
+        is_valid_email = clean_df['email_address'].str.contains('^[\w_.+-]+@[\w-]+\.[a-zA-Z0-9-.]+$', flags=re.UNICODE, regex=True).to_numpy(dtype=bool)
+        clean_df = DataCleaning.keep_rows(clean_df, is_valid_email)
 
         # replace 'GGB' country code to 'GB'
         clean_df['country_code'] = clean_df['country_code'].replace('GGB', 'GB')
@@ -123,33 +255,25 @@ class DataCleaning:
         return clean_df
     
     @staticmethod
-    def clean_card_data(data: pd.DataFrame) -> pd.DataFrame:
+    def clean_card_data(data: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """
         This method cleans the card data
         
         Args:
             data (pd.DataFrame): card data to be cleaned
+            inplace (bool): whether the data is handed over to the cleaner, which then cleans it in place instead of copying it first. The data must not be used after the call.
 
         Returns:
             df (pd.DataFrame): cleaned card data
         """            
 
-        clean_df = data.copy()
+        clean_df = data if inplace else data.copy()
 
         # drop NA values
         clean_df.dropna(inplace=True)
 
-        # drop Null rows
-        null_values = clean_df.isnull()
-        clean_df = clean_df[~null_values.any(axis=1)]
-
-        # drop rows with string 'NULL'
-        null_string_values = clean_df.applymap(lambda x:x == 'NULL')
-        clean_df = clean_df[~null_string_values.any(axis=1)]
-
-        # drop rows with string 'NAN'
-        nan_string_values = clean_df.applymap(lambda x:x == 'NaN')
-        clean_df = clean_df[~nan_string_values.any(axis=1)]
+        # drop rows with the strings 'NULL' or 'NaN'
+        clean_df = DataCleaning.keep_rows(clean_df, ~DataCleaning.find_sentinel_nulls(clean_df))
 
         ######## card_number column checks
         # convert column to str before replacement
@@ -159,8 +283,8 @@ class DataCleaning:
         clean_df['card_number'] = clean_df['card_number'].str.replace('?', '')
 
         # drop rows with non digit values
-        non_digit_values = clean_df['card_number'].str.isdigit() == False
-        clean_df = clean_df[~non_digit_values]
+        non_digit_values = (clean_df['card_number'].str.isdigit() == False).to_numpy(dtype=bool)
+        clean_df = DataCleaning.keep_rows(clean_df, ~non_digit_values)
 
         ######### card_number length matching card_provider checks
         clean_df['card_length'] = clean_df['card_number'].str.len()
@@ -182,15 +306,15 @@ class DataCleaning:
         # clean_df = clean_df.drop(index=visa_anomalies_index)
 
         # remove the card length column
-        clean_df.drop(columns=['card_length'], inplace=True)
+        del clean_df['card_length']
 
         ######### expiry date has some days as 32
         # replace 32 day value with 01
         clean_df['expiry_date'] = clean_df['expiry_date'].str.replace('/32', '/01')
 
         ######## date payment confirmed column has some dates not properly formatted
-        # format the dates in order using the custom parser
-        clean_df['date_payment_confirmed'] = clean_df['date_payment_confirmed'].apply(DataCleaning.custom_date_parser)
+        # format the dates in order
+        clean_df['date_payment_confirmed'] = DataCleaning.normalise_dates(clean_df['date_payment_confirmed'])
 
         # convert the dates to datetime format
         clean_df['date_payment_confirmed'] = pd.to_datetime(clean_df['date_payment_confirmed'], errors='coerce')
@@ -198,20 +322,21 @@ class DataCleaning:
         return clean_df
     
     @staticmethod
-    def clean_store_data(data: pd.DataFrame) -> pd.DataFrame:
+    def clean_store_data(data: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """
         This method cleans the stores' data.
 
         Args:
             data (pd.DataFrame): stores data to be cleaned
+            inplace (bool): whether the data is handed over to the cleaner, which then cleans it in place instead of copying it first. The data must not be used after the call.
 
         Returns:
             pd.DataFrame: cleaned stores' data
         """
-        clean_df = data.copy()
+        clean_df = data if inplace else data.copy()
 
         # drop the lat column
-        clean_df.drop(columns=['lat'], inplace=True)
+        del clean_df['lat']
 
         # change the values in the special row for the online store
         clean_df.loc[clean_df['store_type'] == 'Web Portal', 'address'] = 'Online Address'
@@ -220,37 +345,22 @@ class DataCleaning:
         clean_df.loc[clean_df['store_type'] == 'Web Portal', 'latitude'] = '0'
 
         # drop the row that is none for the latitude column
-        clean_df = clean_df[~clean_df.isnull().any(axis=1)]
+        clean_df = DataCleaning.keep_rows(clean_df, ~clean_df.isnull().any(axis=1).to_numpy(dtype=bool))
 
         # drop rows that contains gibberish data for address
-        clean_df = clean_df[clean_df['address'].str.contains(' ')]
+        clean_df = DataCleaning.keep_rows(clean_df, clean_df['address'].str.contains(' ').to_numpy(dtype=bool))
 
         # convert longitude column to digit
         clean_df['longitude'] = pd.to_numeric(clean_df['longitude'], errors='coerce')
 
         # remove characters from staff_numbers column
-        def custom_staff_num_parser(staff_num: str) -> str:
-            """
-            custom parser that removes alphabets from staff numbers and keeps only digits.
-            parser is limited to scope only for clean_store_data function.
-
-            Args:
-                staff_num (str): the staff_num string 
-
-            Returns:
-                str: string from staff_num that is only digits
-
-            """
-            digit_only_lst = [char for char in staff_num if char.isdigit()]
-            return "".join(digit_only_lst)
-        
-        clean_df['staff_numbers'] = clean_df['staff_numbers'].apply(custom_staff_num_parser)
+        clean_df['staff_numbers'] = StringTransforms.keep_digits(clean_df['staff_numbers'])
 
         # convert staff_numbers column to int
         clean_df['staff_numbers'] = clean_df['staff_numbers'].astype(int)
 
         # parse opening_date to appropriate format
-        clean_df['opening_date'] = clean_df['opening_date'].apply(DataCleaning.custom_date_parser)
+        clean_df['opening_date'] = DataCleaning.normalise_dates(clean_df['opening_date'])
 
         # convert opening_date to datetime
         clean_df['opening_date'] = pd.to_datetime(clean_df['opening_date'], errors='coerce')
@@ -259,30 +369,10 @@ class DataCleaning:
         clean_df['latitude'] = pd.to_numeric(clean_df['latitude'], errors='coerce')
 
         # remove extra 'ee' from the continent names
-        def custom_continent_parser(continent: str) -> str:
-            """
-            custom parser that only retains continent name that starts after a uppercase char.
-            parser is limited in scope only for clean_store_data function.
-
-            Args:
-                continent (str): the continent name string
-
-            Returns:
-                str: string that only start after an upper case character
-            """
-            is_char_upper_bool = False
-            continent_char_lst = []
-            for char in continent:
-                if char.isupper():
-                    is_char_upper_bool = True
-                if is_char_upper_bool:
-                    continent_char_lst.append(char)
-            return "".join(continent_char_lst)
-        
-        clean_df['continent'] = clean_df['continent'].apply(custom_continent_parser)
+        clean_df['continent'] = StringTransforms.strip_before_uppercase(clean_df['continent'])
 
         # drop the index column and reset index
-        clean_df.drop(columns=['index'], inplace=True)
+        del clean_df['index']
         clean_df.reset_index(drop=True, inplace=True)
 
         # rearrange the columns 
@@ -293,107 +383,101 @@ class DataCleaning:
         return clean_df
     
     @staticmethod
-    def convert_product_weights(data: pd.DataFrame) -> pd.DataFrame:
+    def convert_product_weights(data: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """
         This method converts the weight column of the data to kg.
 
         Args:
             data (pd.DataFrame): the dataframe whose weight column needs to be converted to kg
+            inplace (bool): whether the data is handed over, and converted in place instead of copied first. The data must not be used after the call.
 
         Returns:
-            pd.DataFrame: the dataframe whose weight has been converted to kg.
+            pd.DataFrame: the dataframe whose weight has been converted to kg. Weights with an unknown unit are pd.NA.
+
+        Raises:
+            ValueError: if a weight is not one number, or two numbers separated by 'x', followed by its unit
         """
-        df = data.copy()
+        df = data if inplace else data.copy()
 
         # remove nan values for weight
-        df = df[~df['weight'].isna()]
+        df = DataCleaning.keep_rows(df, df['weight'].notna().to_numpy(dtype=bool))
 
         # weight contains some invalid weights remove those rows. values contain uppercase and numbers
-        df = df[~df['weight'].str.contains('^[A-Z0-9]+$')]
-
-        #custom parser to convert weights to kgs
-        def custom_weight_converter(weight: str) -> Union[float, pd.NA]:
-            """
-            custom parser that takes a weight string and returns its conversion to kg 
-            this parser is local in scope to convert_product_weights method
-
-            Args:
-                weight (str): weight to convert to kg
-
-            Returns:
-                Union[float, pd.NA]: if weight can be converted returns float of conversion, else pd.NA
-            """
-            weight_value_lst = [char for char in str(weight) if char.isdigit() or char == '.' or char == 'x']
-            metric_lst = [char for char in str(weight) if char.isalpha() and char != 'x']
-
-            if 'x' in weight_value_lst:
-                idx_of_x = weight_value_lst.index('x')
-                first_weight_value = float(''.join(weight_value_lst[:idx_of_x]))
-                second_weight_value = float(''.join(weight_value_lst[idx_of_x + 1:]))
-                weight_value = first_weight_value * second_weight_value
-            else:
-                weight_value = float(''.join(weight_value_lst))
-                
-            metric = ''.join(metric_lst)
-
-            if metric == 'kg':
-                return weight_value
-            elif metric == 'g' or metric == 'ml':
-                return weight_value/1000
-            elif metric == 'oz':
-                return weight_value * 0.0283495
-            else:
-                return pd.NA
-
-        # create a new column weight(in kg) with the converted weight converter
-        df['weight(in kg)'] = df['weight'].apply(custom_weight_converter)
+        weights = df['weight'].astype(STRING_DTYPE)
+        is_invalid = weights.str.contains('^[A-Z0-9]+$').to_numpy(dtype=bool)
+        df = DataCleaning.keep_rows(df, ~is_invalid)
+        weights = weights[~is_invalid]
+
+        weight_values = np.full(len(weights), np.nan)
+        units = np.full(len(weights), '', dtype=object)
+
+        # most weights are a number followed by the unit, e.g. "500ml". the unit is stripped off to get the number
+        is_simple = weights.str.fullmatch(r'\d+(?:\.\d+)?(?:kg|g|ml|oz)').fillna(False).to_numpy(dtype=bool)
+        simple_weights = weights[is_simple]
+        weight_values[is_simple] = simple_weights.str.rstrip('gklmoz').astype('Float64').to_numpy(dtype=float)
+        units[is_simple] = np.select([simple_weights.str.endswith('kg').to_numpy(dtype=bool),
+                                      simple_weights.str.endswith('ml').to_numpy(dtype=bool),
+                                      simple_weights.str.endswith('oz').to_numpy(dtype=bool)], ['kg', 'ml', 'oz'], 'g')
+
+        # for the rest, e.g. "12 x 100g" or "77g .", the value is made of the digits, '.' and 'x' and the unit of the letters other than 'x'
+        other_weights = weights[~is_simple]
+        other_values = other_weights.str.replace(r'[^0-9.x]', '', regex=True)
+        units[~is_simple] = other_weights.str.replace(NON_LETTER_PATTERN, '', regex=True).str.replace('x', '', regex=False).to_numpy(dtype=object)
+
+        # multipacks such as "12 x 100g" weigh the number of items times the item weight
+        has_multiplier = other_values.str.contains('x', regex=False).to_numpy(dtype=bool)
+        first_values = pd.to_numeric(other_values.str.replace(r'x.*', '', regex=True), errors='coerce').astype(float).to_numpy()
+        second_values = pd.to_numeric(other_values.str.replace(r'^[^x]*x', '', regex=True), errors='coerce').astype(float).to_numpy()
+        weight_values[~is_simple] = np.where(has_multiplier, first_values * second_values, first_values)
+
+        # weights whose value is not one or two numbers, e.g. "3 x 2 x 1g" or "x", cannot be converted
+        is_malformed = np.isnan(first_values) | (has_multiplier & np.isnan(second_values))
+        if is_malformed.any():
+            raise ValueError(f"weights {other_weights[is_malformed].unique().tolist()} could not be converted to kg.")
+
+        # convert to kg according to the unit, unknown units are pd.NA
+        is_kg = units == 'kg'
+        is_g = (units == 'g') | (units == 'ml')
+        is_oz = units == 'oz'
+        weights_in_kg = pd.Series(np.select([is_kg, is_g, is_oz], [weight_values, weight_values / 1000, weight_values * 0.0283495], np.nan), index=df.index)
+        is_known_unit = is_kg | is_g | is_oz
+        if not is_known_unit.all():
+            weights_in_kg = weights_in_kg.astype(object).where(is_known_unit, pd.NA)
+
+        # create a new column weight(in kg) with the converted weights
+        df['weight(in kg)'] = weights_in_kg
 
         # remove the old weight column
-        df.drop(columns=['weight'], inplace=True)
+        del df['weight']
 
         return df
 
     @staticmethod
-    def clean_products_data(data: pd.DataFrame) -> pd.DataFrame:
+    def clean_products_data(data: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """
         method that cleans the product dataframe and returns the cleaned dataframe
 
         Args:
             data (pd.DataFrame): dataframe for products
+            inplace (bool): whether the data is handed over to the cleaner, which then cleans it in place instead of copying it first. The data must not be used after the call.
 
         Returns:
             pd.DataFrame: cleaned dataframe
         """
-        # convert the weights to kg
-        weight_converted_product_df = DataCleaning.convert_product_weights(data)
-
-        # create a copy of weight converted df to clean
-        df = weight_converted_product_df.copy()
+        # convert the weights to kg. the converted dataframe is the only copy of the data and is cleaned in place
+        df = DataCleaning.convert_product_weights(data, inplace=inplace)
 
         # remove the Unnamed: 0 column
-        df.drop(columns=['Unnamed: 0'], inplace=True)
+        del df['Unnamed: 0']
 
         # create a separate column for product price in float format
-        def custom_retrieve_product_price(product_price: str) -> float:
-            """
-            custom parser to retrieve the product price and convert to float
-
-            Args:
-                product_price (str): product price
-
-            Returns:
-                float: float conversion of the product price after retieving the value
-            """
-            product_price_lst = [char for char in str(product_price) if char.isdigit() or char == '.']
-            return float(''.join(product_price_lst))
-
-        df['product_price(in £s)'] = df['product_price'].apply(custom_retrieve_product_price)
+        df['product_price(in £s)'] = StringTransforms.extract_price(df['product_price'])
 
         # drop the product price column
-        df.drop(columns=['product_price'], inplace=True)
+        del df['product_price']
 
-        # convert the dates with custom parser
-        df['date_added'] = df['date_added'].apply(DataCleaning.custom_date_parser)
+        # normalise the dates
+        df['date_added'] = DataCleaning.normalise_dates(df['date_added'])
 
         # convert date_added to pd.datetime
         df['date_added'] = pd.to_datetime(df['date_added'], errors='coerce')
@@ -409,55 +493,60 @@ class DataCleaning:
         return df
     
     @staticmethod
-    def clean_orders_data(data: pd.DataFrame) -> pd.DataFrame:
+    def clean_orders_data(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], inplace: bool = False) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """
         method that cleans the orders dataframe and returns the cleaned dataframe.
+        The ORDERS_DROPPED_COLUMNS left out of the extraction are not dropped again. An iterable of chunks is cleaned one chunk at a time as the chunks are read.
 
         Args:
-            data (pd.DataFrame): dataframe to be cleaned
+            data (Union[pd.DataFrame, Iterable[pd.DataFrame]]): dataframe, or iterable of dataframe chunks, to be cleaned
+            inplace (bool): whether the data is handed over to the cleaner, which then cleans it in place instead of copying it first. The data must not be used after the call.
 
         Returns:
-            pd.DataFrame: cleaned dataframe
+            Union[pd.DataFrame, Iterator[pd.DataFrame]]: cleaned dataframe, or iterator of cleaned dataframe chunks
         """
-
-        df = data.copy()
-
-        # drop the columns level_0, index, first_name, last_name, 1
-        df.drop(columns=['level_0', 'index', 'first_name', 'last_name', '1'], inplace=True)
-
-        # reset the index
+        if not isinstance(data, pd.DataFrame):
+            return DataCleaning.clean_chunks(data, functools.partial(DataCleaning.clean_orders_data, inplace=inplace))
+
+        # drop the columns level_0, index, first_name, last_name, 1. drop returns a new dataframe, so the data is copied once and not changed.
+        # deleting the columns of handed over data copies nothing
+        dropped_columns = [column for column in DataCleaning.ORDERS_DROPPED_COLUMNS if column in data.columns]
+        if inplace:
+            df = data
+            for column in dropped_columns:
+                del df[column]
+        else:
+            df = data.drop(columns=dropped_columns)
+
+        # reset the index, inserting the index column does not copy the other columns
         df.reset_index(inplace=True)
 
         return df
     
     @staticmethod
-    def clean_date_data(data: pd.DataFrame) -> pd.DataFrame:
+    def clean_date_data(data: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """
         method that cleans the date dataframe and returns the cleaned dataframe.
 
         Args:
             data (pd.DataFrame): dataframe to be cleaned
+            inplace (bool): whether the data is handed over to the cleaner, which then cleans it in place instead of copying it first. The data must not be used after the call.
 
         Returns:
             pd.DataFrame: cleaned dataframe
         """
 
-        df = data.copy()
-
-        # create a temp_timestamp column to convert timestamp to datetime and check if any invalid timestamps
-        df['temp_timestamp'] = pd.to_datetime(df['timestamp'], errors="coerce", format='%H:%M:%S')
-
-        # remove the rows with na temp_timestamps
-        df = df[~df['temp_timestamp'].isna()]
+        df = data if inplace else data.copy()
 
-        # remove the temp_timestamp column
-        df.drop(columns=['temp_timestamp'], inplace=True)
+        # convert timestamp to datetime to check if any invalid timestamps, and remove the rows with na timestamps
+        is_valid_timestamp = pd.to_datetime(df['timestamp'], errors="coerce", format='%H:%M:%S').notna().to_numpy(dtype=bool)
+        df = DataCleaning.keep_rows(df, is_valid_timestamp)
 
         # some months are only 1 digit long. make them two digits long
-        df['month'] = df['month'].apply(lambda x: '0'+x if len(x) < 2 else x)
+        df['month'] = StringTransforms.zero_pad(df['month'])
 
         # some days are also only 1 digit long. make them two digits long
-        df['day'] = df['day'].apply(lambda x: '0'+x if len(x) < 2 else x)
+        df['day'] = StringTransforms.zero_pad(df['day'])
 
         # combine the year, day, month and timestamp to create a new column datetime
         df['day'] = df['day'].astype(str)
@@ -1,25 +1,51 @@
 from database_utils import DatabaseConnector
+from http_session import HttpSession
+from download_cache import DownloadCache
+from network_usage import NetworkUsage
+from s3_stream import S3RangeReader
+from sqlalchemy import Engine, MetaData, Select, Table, func, select
+from typing import Iterator, Union
 import pandas as pd
 import requests
 import tabula
-import os
+import json
+import io
+import time
 import boto3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import re
 
 class DataExtractor:
     """
     This class is a utility class to extFract data from different sources.
+
+    Attributes:
+        http_session (HttpSession): pooled HTTP transport shared by all the web calls of the class
+        download_cache (DownloadCache): on-disk cache of the downloaded pdf, csv and json files
     """
+    http_session = HttpSession()
+    download_cache = DownloadCache()
+
     @staticmethod
-    def read_rds_table(db_connector: DatabaseConnector, table_name: str) -> pd.DataFrame:
+    def read_rds_table(db_connector: DatabaseConnector, table_name: str, chunksize: int = None, watermark_column: str = None, since=None, until=None, index_start: int = 0, source_spec: dict = None) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """
         This is a static method that returns a pandas dataframe for the specified table_name in db_connector database.
+        If chunksize is given, the table is streamed with a server-side cursor and an iterator of dataframe chunks is returned instead.
+        If watermark_column is given, the rows are read in watermark_column order and only the rows with a watermark_column value greater than since and up to until are read.
+        The columns and rows the cleaning discards can be described by a source_spec, see build_rds_query, so they are never sent by the database.
 
         Args:
             db_connector (DatabaseConnector): an instance of DatabaseConnector.
             table_name (str): the name of the table to extract as a pandas DataFrame.
+            chunksize (int): number of rows in each dataframe chunk. None reads the whole table at once.
+            watermark_column (str): key or timestamp column that increases for new or changed rows.
+            since: high-watermark of the previous read. None reads from the first row.
+            until: high-watermark of this read. None reads up to the last row.
+            index_start (int): first value of the index of the returned data, so incrementally read rows continue the index of the rows read before.
+            source_spec (dict): columns and rows not read, e.g. DataCleaning.SOURCE_SPECS['clean_user_data']. None reads every column and row.
 
         Returns:
-            dataframe (pd.DataFrame): an instance of pandas DataFrame with the data specified in the table_name.
+            dataframe (Union[pd.DataFrame, Iterator[pd.DataFrame]]): an instance of pandas DataFrame with the data specified in the table_name, or an iterator of DataFrame chunks if chunksize is given.
 
         Raises:
             ValueError: raises ValueError if the table_name is not in the database db_connector is connected to.
@@ -28,40 +54,195 @@ class DataExtractor:
         if isinstance(db_connector, DatabaseConnector):
             db_tables = db_connector.list_db_tables()
             if table_name in db_tables:
-                df = pd.read_sql(table_name, db_connector.engine)
+                query = table_name
+                if watermark_column is not None or source_spec:
+                    table = Table(table_name, MetaData(), autoload_with=db_connector.engine)
+                    query = DataExtractor.build_rds_query(table, watermark_column, since, until, source_spec)
+
+                if chunksize:
+                    return DataExtractor.stream_rds_table(db_connector.engine, query, chunksize, index_start=index_start)
+                df = pd.read_sql(query, db_connector.engine)
+                df.index = pd.RangeIndex(index_start, index_start + len(df))
                 return df
             else:
                 raise ValueError(f"'{table_name}' table is not present in the database.")
         else:
             raise TypeError("db_connector should be an instance of class DatabaseConnector.")
-        
+
     @staticmethod
-    def retrieve_pdf_data(link: str) -> pd.DataFrame:
+    def build_rds_query(table: Table, watermark_column: str = None, since=None, until=None, source_spec: dict = None) -> Select:
         """
-        This method retrieves pdf data from a link, converts it to a pandas dataframe and returns it.
+        This method builds the query reading a table, in watermark_column order and with a watermark_column value greater than since and up to until.
+        The source_spec describes the columns and rows the cleaning discards:
+
+        Source spec keys:
+            exclude_columns (list[str]): columns not read. watermark_column can be excluded, the rows are still filtered and ordered by it.
+            distinct_on (str): only the first row in watermark_column order of every value of this column is read, with postgres' DISTINCT ON
+            not_null (bool): whether the rows with a NULL in any column of the table are not read, after the duplicates of distinct_on are removed.
+                             NaN floats are not NULL in the database, so they are still dropped by the cleaning.
+
         Args:
-            link (str): link to the pdf data
+            table (Table): reflected table to read
+            watermark_column (str): key or timestamp column that increases for new or changed rows. None reads the rows in the order of the database
+            since: high-watermark of the previous read. None reads from the first row.
+            until: high-watermark of this read. None reads up to the last row.
+            source_spec (dict): columns and rows not read, None reads every column and row
 
         Returns:
-            df (pd.DataFrame): dataframe of the pdf data
+            Select: the query
         """
-        # pdf data file save location after download from link
-        file_destination = link.split('/')[-1]
-        
-        # download the pdf with requests
-        response = requests.get(link)
+        source_spec = source_spec or {}
+        exclude_columns = source_spec.get('exclude_columns', [])
+        distinct_on = source_spec.get('distinct_on')
+
+        # the rows of the watermark window
+        source = table
+        conditions = []
+        if watermark_column is not None and since is not None:
+            conditions.append(table.c[watermark_column] > since)
+        if watermark_column is not None and until is not None:
+            conditions.append(table.c[watermark_column] <= until)
 
-        # write the content of the response to the file in the destination
-        with open(file_destination, "wb") as destination:
-            destination.write(response.content)
+        # the duplicates are removed before the rows with NULLs, the same as the cleaning does
+        if distinct_on is not None:
+            order = [table.c[distinct_on]] + ([table.c[watermark_column]] if watermark_column is not None else [])
+            source = select(table).where(*conditions).distinct(table.c[distinct_on]).order_by(*order).subquery()
+            conditions = []
+
+        if source_spec.get('not_null'):
+            conditions.extend(column.isnot(None) for column in source.c)
+
+        query = select(*[column for column in source.c if column.name not in exclude_columns]).where(*conditions)
+        if watermark_column is not None:
+            query = query.order_by(source.c[watermark_column])
+        return query
+
+    @staticmethod
+    def read_rds_high_watermark(db_connector: DatabaseConnector, table_name: str, watermark_column: str):
+        """
+        This method returns the current high-watermark of a table, the maximum value of its watermark column.
+
+        Args:
+            db_connector (DatabaseConnector): an instance of DatabaseConnector.
+            table_name (str): the name of the table
+            watermark_column (str): key or timestamp column that increases for new or changed rows.
+
+        Returns:
+            the maximum value of watermark_column, None if the table is empty
+        """
+        table = Table(table_name, MetaData(), autoload_with=db_connector.engine)
+        with db_connector.engine.connect() as connection:
+            return connection.execute(select(func.max(table.c[watermark_column]))).scalar()
 
-        # read the locally saved pdf file with tabula and merge each page df to a single dataframe
-        pdf_df_lst = tabula.read_pdf(file_destination, pages='all')
+    @staticmethod
+    def stream_rds_table(engine: Engine, query: Union[str, Select], chunksize: int, index_start: int = 0) -> Iterator[pd.DataFrame]:
+        """
+        This method streams a table with a server-side cursor and yields it as dataframe chunks, so only one chunk is held in memory at a time.
+        The index of the chunks continues from one chunk to the next, the same as the index of the table read at once.
+
+        Args:
+            engine (Engine): SQLAlchemy engine connected to the database of the table
+            query (Union[str, Select]): the name of the table to stream, or a select query on it
+            chunksize (int): number of rows in each dataframe chunk
+            index_start (int): first value of the index of the first chunk
+
+        Yields:
+            pd.DataFrame: the next chunk of the table
+        """
+        with engine.connect().execution_options(stream_results=True, max_row_buffer=chunksize) as connection:
+            offset = index_start
+            for chunk in pd.read_sql(query, connection, chunksize=chunksize):
+                chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+                offset += len(chunk)
+                yield chunk
         
-        # remove the written file
-        os.remove(file_destination)
+    @staticmethod
+    def count_pdf_pages(filepath: str) -> Union[int, None]:
+        """
+        This method reads the number of pages of a pdf file from the /Count entry of its page tree.
+
+        Args:
+            filepath (str): path to the pdf file
+
+        Returns:
+            Union[int, None]: number of pages, None if the page tree is in a compressed object stream and can not be read
+        """
+        with open(filepath, "rb") as file:
+            content = file.read()
+
+        # the root of the page tree counts all the pages, the other /Pages nodes count fewer
+        counts = re.findall(rb'/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b', content)
+        if not counts:
+            return None
+        return max(int(first or second) for first, second in counts)
+
+    @staticmethod
+    def read_pdf_pages(filepath: str, pages: str) -> pd.DataFrame:
+        """
+        This method reads the tables of a range of pages of a pdf file with tabula and merges them into a single dataframe.
 
+        Args:
+            filepath (str): path to the pdf file
+            pages (str): pages to read, e.g. '1-10' or 'all'
+
+        Returns:
+            pd.DataFrame: the tables of the pages
+        """
+        pdf_df_lst = tabula.read_pdf(filepath, pages=pages)
+        if not pdf_df_lst:
+            return pd.DataFrame()
         return pd.concat(pdf_df_lst, ignore_index=True)
+
+    @staticmethod
+    def stream_pdf_data(link: str, max_workers: int = 1, shard_pages: int = None) -> Iterator[pd.DataFrame]:
+        """
+        This method retrieves pdf data from a link and yields the tables of the pdf shard by shard, in page order. The pdf is kept in the download cache.
+        The pages are split into shards of consecutive pages read at the same time in a process pool.
+        tabula starts a JVM for every read, so by default the pages are split into one shard per worker to start as few JVMs as possible.
+
+        Args:
+            link (str): link to the pdf data
+            max_workers (int): maximum number of shards read at the same time
+            shard_pages (int): number of pages in each shard. None splits the pages evenly between the workers.
+
+        Yields:
+            pd.DataFrame: the tables of the next shard, indexed after the rows of the previous shards
+        """
+        # download the pdf into the download cache, unless the cached copy is up to date
+        file_destination = DataExtractor.download_cache.fetch_url(link, DataExtractor.http_session)
+
+        # split the pages into shards, a pdf whose pages can not be counted is read in a single shard
+        num_of_pages = DataExtractor.count_pdf_pages(file_destination)
+        if num_of_pages is None or max_workers <= 1:
+            shards = ['all']
+        else:
+            shard_pages = shard_pages or -(-num_of_pages // max_workers)
+            shards = [f'{first}-{min(first + shard_pages - 1, num_of_pages)}' for first in range(1, num_of_pages + 1, shard_pages)]
+
+        if len(shards) == 1:
+            yield DataExtractor.read_pdf_pages(file_destination, shards[0])
+            return
+
+        offset = 0
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(shards))) as executor:
+            for shard_df in executor.map(DataExtractor.read_pdf_pages, [file_destination] * len(shards), shards):
+                shard_df.index = pd.RangeIndex(offset, offset + len(shard_df))
+                offset += len(shard_df)
+                yield shard_df
+
+    @staticmethod
+    def retrieve_pdf_data(link: str, max_workers: int = 1) -> pd.DataFrame:
+        """
+        This method retrieves pdf data from a link, converts it to a pandas dataframe and returns it.
+        Args:
+            link (str): link to the pdf data
+            max_workers (int): maximum number of page shards read at the same time, see stream_pdf_data
+
+        Returns:
+            df (pd.DataFrame): dataframe of the pdf data
+        """
+        # read the pdf shard by shard and merge each shard df to a single dataframe
+        return pd.concat(DataExtractor.stream_pdf_data(link, max_workers=max_workers), ignore_index=True)
     
     @staticmethod
     def list_number_of_stores(endpoint: str, headers: dict) -> int:
@@ -75,18 +256,52 @@ class DataExtractor:
         Returns:
             int: the number of stores available to get for from the API endpoint
         """
-        response = requests.get(endpoint, headers=headers)
+        response = DataExtractor.http_session.get(endpoint, headers=headers)
         return int(response.json()['number_stores'])
 
     @staticmethod
-    def retrieve_stores_data(endpoint: str, num_of_stores: int, headers: dict) -> pd.DataFrame:
+    def retrieve_store_data(endpoint: str, store_idx: int, headers: dict, timeout: float = None, retries: int = 0, backoff: float = 0.5) -> dict:
+        """
+        This method retrieves a single store's data from the API endpoint, retrying failed requests with exponential backoff.
+
+        Args:
+            endpoint (str): API endpoint for store
+            store_idx (int): index of the store to retrieve
+            headers (dict): key value pair dictionary for headers
+            timeout (float): seconds to wait for the server before giving up on a request. None waits forever.
+            retries (int): number of times a failed request is retried before the error is raised
+            backoff (float): seconds to wait before the first retry, doubled on every following retry
+
+        Returns:
+            dict: the json data of the store
+
+        Raises:
+            requests.RequestException: raises the last request error if the store could not be retrieved after all the retries.
+        """
+        for attempt in range(retries + 1):
+            try:
+                response = DataExtractor.http_session.get(endpoint + "/" + str(store_idx), headers=headers, timeout=timeout)
+                response.raise_for_status()
+                return response.json()
+            except requests.RequestException:
+                if attempt == retries:
+                    raise
+                time.sleep(backoff * 2 ** attempt)
+
+    @staticmethod
+    def retrieve_stores_data(endpoint: str, num_of_stores: int, headers: dict, max_workers: int = 1, timeout: float = None, retries: int = 0, backoff: float = 0.5) -> pd.DataFrame:
         """
         This method takes an API endpoint and header and retrieves all the stores' data specified in the argument.
+        The stores are requested concurrently by a pool of max_workers threads, the rows of the dataframe are always in store index order.
 
         Args:
             endpoint (str): API endpoint for store
             num_of_stores (int): number of stores' data to create pandas dataframe for
             headers (dict): key value pair dictionary for headers
+            max_workers (int): maximum number of requests in flight at the same time. 1 retrieves the stores one after another.
+            timeout (float): seconds to wait for the server before giving up on a request. None waits forever.
+            retries (int): number of times a failed request is retried before the error is raised
+            backoff (float): seconds to wait before the first retry, doubled on every following retry
 
         Returns:
             pd.DataFrame: pandas dataframe of all the specified stores' data
@@ -94,20 +309,28 @@ class DataExtractor:
         Raises:
             KeyError: raises a KeyError if the keys for the data of stores are not consistent.
         """
+        def retrieve(store_idx: int) -> dict:
+            return DataExtractor.retrieve_store_data(endpoint, store_idx, headers, timeout=timeout, retries=retries, backoff=backoff)
+
+        # retrieve all the stores, the responses are collected in store index order. the bytes received by the pool are counted for the caller
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [NetworkUsage.submit(executor, retrieve, store_idx) for store_idx in range(0, num_of_stores)]
+            try:
+                stores_json = [future.result() for future in futures]
+            except Exception:
+                # the stores not requested yet are not requested once one has failed
+                for future in futures:
+                    future.cancel()
+                raise
 
         # retrieve the first store data to create a dictionary with relevant keys
-        response = requests.get(endpoint + '/' + '0', headers=headers)
-        store_keys = response.json().keys()
+        store_keys = stores_json[0].keys() if stores_json else retrieve(0).keys()
         all_store_dict = {}
         for key in store_keys:
             all_store_dict[key] = []
 
-        # for each store available to query, retrieve the data and append the corresponding value of the dict to all_store_dict
-        # for all stores retrieve the data
-        for idx in range(0, num_of_stores):
-            response = requests.get(endpoint + "/" + str(idx), headers=headers)
-            response_json = response.json()
-
+        # for each store retrieved, append the corresponding value of the dict to all_store_dict
+        for response_json in stores_json:
             # check if all the keys match to our all stores' dictionary
             if len(response_json.keys()) != len(all_store_dict.keys()):
                 raise KeyError("The keys of store are not consistent.")
@@ -120,41 +343,71 @@ class DataExtractor:
         return pd.DataFrame(all_store_dict)
     
     @staticmethod
-    def extract_from_s3(s3_address: str) -> pd.DataFrame:
+    def extract_from_s3(s3_address: str, stream: bool = False, chunksize: int = None, max_workers: int = 1, part_size: int = 8 * 2**20) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """
         This method takes an amazon s3 address, extracts the data from that address and returns a dataframe.
-        The user must be logged in to aws cli to download from aws s3 bucket
+        The user must be logged in to aws cli to download from aws s3 bucket. The downloaded file is kept in the download cache.
+        If stream is True, the object is read straight from its s3 body without writing a file, in parallel ranged GETs if max_workers is more than 1.
 
         Args:
             s3_address (str): amazon s3 address for the data
+            stream (bool): whether to read the object straight from s3 instead of through the download cache
+            chunksize (int): number of rows in each dataframe chunk. None reads the whole file at once.
+            max_workers (int): number of parts of the object downloaded at the same time when streaming
+            part_size (int): size in bytes of each part downloaded in parallel when streaming
 
         Returns
-            pd.DataFrame: pandas dataframe for the data
+            Union[pd.DataFrame, Iterator[pd.DataFrame]]: pandas dataframe for the data, or an iterator of dataframe chunks if chunksize is given
         """
         # separate the s3 part of s3_address
         address_split = s3_address.split('//')
 
-        # assign s3 client, separated bucket path, filename, and the local path to save the downloaded file
+        # assign s3 client, separated bucket path and filename
         s3 = boto3.client('s3')
         bucket_name = '/'.join(address_split[-1].split('/')[:-1])
         filename = address_split[-1].split('/')[-1]
-        local_file_path = os.path.join(os.getcwd(), filename)
 
-        # download the data file from s3 buckeet
-        s3.download_file(bucket_name, filename, local_file_path)
+        if not stream:
+            # download the data file from s3 bucket into the download cache, unless the cached copy is up to date
+            local_file_path = DataExtractor.download_cache.fetch_s3(s3, bucket_name, filename)
+
+            # read the downloaded file
+            return pd.read_csv(local_file_path, chunksize=chunksize)
+
+        # read the object body as a stream, a single GET or parts downloaded in parallel
+        if max_workers > 1:
+            body = io.BufferedReader(S3RangeReader(s3, bucket_name, filename, part_size=part_size, max_workers=max_workers), buffer_size=2**20)
+        else:
+            response = s3.get_object(Bucket=bucket_name, Key=filename)
+            NetworkUsage.count(response['ContentLength'])
+            body = response['Body']
 
-        # read the downloaded file
-        df = pd.read_csv(local_file_path)
+        if chunksize:
+            return DataExtractor.read_csv_chunks(body, chunksize)
 
-        # remove the local downloaded file
-        os.remove(local_file_path)
+        with body:
+            return pd.read_csv(body)
 
-        return df
+    @staticmethod
+    def read_csv_chunks(body, chunksize: int) -> Iterator[pd.DataFrame]:
+        """
+        This method reads a csv stream in dataframe chunks and closes the stream once all the chunks are read.
+
+        Args:
+            body: file-like csv stream
+            chunksize (int): number of rows in each dataframe chunk
+
+        Yields:
+            pd.DataFrame: the next chunk of rows
+        """
+        with body:
+            with pd.read_csv(body, chunksize=chunksize) as reader:
+                yield from reader
     
     @staticmethod
     def retrieve_date_events_data(link: str) -> pd.DataFrame:
         """
-        This method retrieves the date event data and returns a pandas dataframe.
+        This method retrieves the date event data and returns a pandas dataframe. The downloaded file is kept in the download cache.
 
         Args:
             link (str): the link to the date events data
@@ -162,10 +415,8 @@ class DataExtractor:
         Returns
             pd.DataFrame: pandas dataframe of the date events data
         """
-        # get the filename from the link
-        filename = link.split('//')[-1].split('/')[-1]
-
-        # send a request 
-        response = requests.get(link)
+        # download the json file into the download cache, unless the cached copy is up to date
+        file_path = DataExtractor.download_cache.fetch_url(link, DataExtractor.http_session)
 
-        return pd.DataFrame(response.json())
\ No newline at end of file
+        with open(file_path, "rb") as file:
+            return pd.DataFrame(json.load(file))
\ No newline at end of file
@@ -1,7 +1,11 @@
 import yaml
-from sqlalchemy import create_engine, Engine, inspect, text
+from engine_registry import EngineRegistry
+from sqlalchemy import Engine, inspect, text
 import pandas as pd
 from urllib.parse import quote_plus
+from typing import Iterable, Iterator, Union
+import csv
+import io
 
 class DatabaseConnector:
     """
@@ -10,7 +14,10 @@ class DatabaseConnector:
     Attributes:
         db_creds (dict): dictionary holding the database credentials
         engine (SQLAlchemyEngine): a SQLAlchemy engine connected to database specified in db_creds
+        local_db_urls (dict): credentials file path to database url of the local databases, so each credentials file is read once
     """
+    local_db_urls = {}
+
     def __init__(self, db_creds) -> None:
         """
         Args:
@@ -39,12 +46,13 @@ class DatabaseConnector:
     def init_db_engine(self) -> Engine:
         """
         This method reads the database credentials attribute of the class and returns a SQLAlchemy database engine
+        The engine is shared through the EngineRegistry with every other connector to the same database.
 
         Returns:
             Engine (SQLAlchemyEngine): A SQLAlchemy engine initialised with the db_creds attribute of the class
         """
         connection_str = f"postgresql://{self.db_creds['RDS_USER']}:{self.db_creds['RDS_PASSWORD']}@{self.db_creds['RDS_HOST']}:{self.db_creds['RDS_PORT']}/{self.db_creds['RDS_DATABASE']}"
-        return create_engine(connection_str)
+        return EngineRegistry.get_engine(connection_str)
     
     def list_db_tables(self) -> list[str]:
         """
@@ -57,9 +65,77 @@ class DatabaseConnector:
         return inspector.get_table_names()
     
     @staticmethod
-    def upload_to_db(data: pd.DataFrame, table_name: str) -> None:
+    def init_local_db_engine(yaml_filepath: str = "config/local_db_creds.yaml") -> Engine:
+        """
+        This method returns a SQLAlchemy engine connected to the local database.
+        The credentials file is only read on the first call and the engine is shared through the EngineRegistry, so the connection pool is reused by every upload.
+
+        Args:
+            yaml_filepath (str): file path to the local database credentials
+
+        Returns:
+            Engine (SQLAlchemyEngine): A SQLAlchemy engine connected to the local database
+        """
+        if yaml_filepath not in DatabaseConnector.local_db_urls:
+            local_creds = DatabaseConnector.read_db_creds(yaml_filepath)
+            DatabaseConnector.local_db_urls[yaml_filepath] = f"{local_creds['DATABASE_TYPE']}+{local_creds['DB_API']}://{local_creds['USER']}:{quote_plus(local_creds['PASSWORD'])}@{local_creds['HOST']}:{local_creds['PORT']}/{local_creds['DATABASE']}"
+
+        return EngineRegistry.get_engine(DatabaseConnector.local_db_urls[yaml_filepath])
+
+    @staticmethod
+    def read_local_max(table_name: str, column_name: str):
+        """
+        This method returns the maximum value of a column of a table in the local database.
+
+        Args:
+            table_name (str): the table name in the local database
+            column_name (str): the column to get the maximum value of
+
+        Returns:
+            the maximum value of the column, None if the table is empty or does not exist
+        """
+        local_engine = DatabaseConnector.init_local_db_engine()
+        if not inspect(local_engine).has_table(table_name):
+            return None
+
+        with local_engine.connect() as conn:
+            return conn.execute(text(f'select max("{column_name}") from {table_name}')).scalar()
+
+    @staticmethod
+    def copy_insert(table, conn, keys: list[str], data_iter: Iterator[tuple]) -> int:
+        """
+        This method is an insertion method for DataFrame.to_sql that bulk loads the rows with PostgreSQL's COPY ... FROM STDIN instead of INSERT statements.
+        The table is still created by to_sql, which maps the dataframe dtypes to the column types. The rows are written as csv to an in-memory buffer and streamed to the server with psycopg2's copy_expert.
+
+        Args:
+            table (pandas.io.sql.SQLTable): the table the rows are inserted into
+            conn (sqlalchemy.engine.Connection): connection to the database
+            keys (list[str]): the column names
+            data_iter (Iterator[tuple]): the rows of values to insert, missing values are None
+
+        Returns:
+            int: number of rows loaded
+        """
+        # missing values are written as \N, so they are not confused with empty strings
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in data_iter:
+            writer.writerow([r'\N' if value is None else value for value in row])
+        buffer.seek(0)
+
+        table_name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+        columns = ', '.join(f'"{key}"' for key in keys)
+
+        with conn.connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+            return cursor.rowcount
+
+    @staticmethod
+    def upload_to_db(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], table_name: str, method: str = 'copy', dtype: dict = None, chunksize: int = 100000) -> None:
         """
         This method uploads a dataframe to the local database. The local database configuration should be stored in a file named 'config/local_db_creds.yaml'.
+        The data can also be an iterable of dataframe chunks, the first chunk replaces the table and the following chunks are appended to it.
+        By default the rows are bulk loaded with PostgreSQL's COPY protocol, see copy_insert.
         The local configuration should have the following variables defined in yaml file:
         
         Yaml Configuration Variables:
@@ -72,16 +148,108 @@ class DatabaseConnector:
             DATABASE: the name of the database to connect to in the server
 
         Args:
-            data (pd.DataFrame): dataframe to save in the database
+            data (Union[pd.DataFrame, Iterable[pd.DataFrame]]): dataframe, or iterable of dataframe chunks, to save in the database
             table_name (str): the table name in the database where the dataframe is to be saved
+            method (str): 'copy' to load the rows with COPY. any other value is passed on to DataFrame.to_sql, None sends INSERT statements.
+            dtype (dict): column name to SQLAlchemy type of the columns whose type should not be mapped from the dataframe dtype
+            chunksize (int): maximum number of rows sent in a single COPY or INSERT batch
         """
-        local_creds = DatabaseConnector.read_db_creds("config/local_db_creds.yaml")
-        local_engine = create_engine(f"{local_creds['DATABASE_TYPE']}+{local_creds['DB_API']}://{local_creds['USER']}:{quote_plus(local_creds['PASSWORD'])}@{local_creds['HOST']}:{local_creds['PORT']}/{local_creds['DATABASE']}")
-        
-        data.to_sql(table_name, local_engine, if_exists='replace', index=False)
+        local_engine = DatabaseConnector.init_local_db_engine()
+
+        if isinstance(data, pd.DataFrame):
+            data = [data]
+
+        if method == 'copy':
+            method = DatabaseConnector.copy_insert
+
+        # replace the table with the first chunk and append the rest
+        uploaded = False
+        for chunk in data:
+            chunk.to_sql(table_name, local_engine, if_exists='append' if uploaded else 'replace', index=False,
+                         method=method, dtype=dtype, chunksize=chunksize)
+            uploaded = True
+
+        if not uploaded:
+            return
 
         inspector = inspect(local_engine)
         columns = inspector.get_columns(table_name)
 
         with local_engine.begin() as conn:
             conn.execute(text(f"alter table {table_name} add primary key ({columns[0]['name']})"))
+
+    @staticmethod
+    def merge_into_db(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], table_name: str, key_column: str, update_existing: bool = True) -> None:
+        """
+        This method merges a dataframe into an existing table of the local database instead of rebuilding the table.
+        Rows whose key_column value is not in the table are inserted. Rows whose key_column value is already in the table update the existing row if update_existing is True, otherwise they are skipped.
+        Each chunk is loaded into a staging table and merged with a single INSERT ... ON CONFLICT statement in one transaction.
+        A key repeated in a chunk is merged once, with its last row if update_existing is True and its first row otherwise, the same as merging the rows one by one.
+        VARCHAR(n) columns are widened to the longest value of the chunk first, so no value is cut to the length of the table's column.
+        If the table does not exist yet, the data is uploaded with upload_to_db.
+
+        Args:
+            data (Union[pd.DataFrame, Iterable[pd.DataFrame]]): dataframe, or iterable of dataframe chunks, to merge into the table
+            table_name (str): the table name in the database the dataframe is merged into
+            key_column (str): column identifying a row. a unique index is created on it if the table does not have one.
+            update_existing (bool): whether rows already in the table are updated or skipped
+        """
+        local_engine = DatabaseConnector.init_local_db_engine()
+
+        if not inspect(local_engine).has_table(table_name):
+            DatabaseConnector.upload_to_db(data, table_name)
+            return
+
+        if isinstance(data, pd.DataFrame):
+            data = [data]
+
+        staging_table_name = f"{table_name}_staging"
+
+        with local_engine.begin() as conn:
+            # the columns of the target table and their types, the staging columns are cast to them
+            results = conn.execute(text("""
+                select a.attname, format_type(a.atttypid, a.atttypmod)
+                from pg_attribute a
+                where a.attrelid = cast(:table_name as regclass) and a.attnum > 0 and not a.attisdropped
+            """), {'table_name': table_name})
+            column_types = dict(results.fetchall())
+
+            primary_key_columns = inspect(conn).get_pk_constraint(table_name)['constrained_columns']
+
+            # ON CONFLICT needs a unique index on the key column
+            if key_column not in primary_key_columns:
+                conn.execute(text(f'create unique index if not exists {table_name}_{key_column}_key on {table_name} ("{key_column}")'))
+
+        for chunk in data:
+            columns = [column for column in chunk.columns if column in column_types]
+            insert_columns = ', '.join(f'"{column}"' for column in columns)
+            # an explicit cast to VARCHAR(n) cuts longer values, so they are cast to VARCHAR and the columns are widened to fit them
+            varchar_columns = [column for column in columns if column_types[column].startswith('character varying(')]
+            select_columns = ', '.join(f'cast("{column}" as {"character varying" if column in varchar_columns else column_types[column]})' for column in columns)
+            update_columns = [column for column in columns if column != key_column and column not in primary_key_columns]
+
+            if update_existing and update_columns:
+                conflict_action = 'do update set ' + ', '.join(f'"{column}" = excluded."{column}"' for column in update_columns)
+            else:
+                conflict_action = 'do nothing'
+
+            with local_engine.begin() as conn:
+                chunk[columns].to_sql(staging_table_name, conn, if_exists='replace', index=False, method=DatabaseConnector.copy_insert)
+
+                if varchar_columns:
+                    max_length_columns = ', '.join(f'max(char_length(cast("{column}" as text)))' for column in varchar_columns)
+                    max_lengths = conn.execute(text(f"select {max_length_columns} from {staging_table_name}")).fetchone()
+                    for column, max_length in zip(varchar_columns, max_lengths):
+                        if max_length is not None and max_length > int(column_types[column][len('character varying('):-1]):
+                            conn.execute(text(f'alter table {table_name} alter column "{column}" type varchar({max_length})'))
+                            column_types[column] = f'character varying({max_length})'
+
+                # ON CONFLICT can not change a row twice, so every key is merged once. the staged rows are in the order of the chunk
+                staged_row_order = 'ctid desc' if update_existing else 'ctid'
+                conn.execute(text(f"""
+                    insert into {table_name} ({insert_columns})
+                    select distinct on ("{key_column}") {select_columns} from {staging_table_name}
+                    order by "{key_column}", {staged_row_order}
+                    on conflict ("{key_column}") {conflict_action}
+                """))
+                conn.execute(text(f"drop table {staging_table_name}"))
@@ -0,0 +1,263 @@
+from botocore.exceptions import ClientError
+from http_session import HttpSession
+from network_usage import NetworkUsage
+from typing import Callable, Iterable, Iterator
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+class DownloadCache:
+    """
+    This class is an on-disk cache of downloaded files. Each url is stored with the ETag and Last-Modified of its last download,
+    so a file is only downloaded again when the source has changed. An unchanged source costs a single conditional request.
+    The files are stored under the sha256 of their content, so identical files downloaded from different urls are stored once.
+    The least recently used files are evicted when the cache grows over its size limit.
+
+    Attributes:
+        directory (str): directory holding the cached files and the index
+        max_bytes (int): maximum total size of the cached files in bytes
+        index_filepath (str): path to the json index of the cache, url to the ETag, Last-Modified, file name, size and last use of its cached file
+    """
+    def __init__(self, directory: str = "cache/downloads", max_bytes: int = 2**30) -> None:
+        """
+        Args:
+            directory (str): directory holding the cached files and the index
+            max_bytes (int): maximum total size of the cached files in bytes
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_filepath = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        """
+        This method returns the state the cache is pickled with, e.g. to send it to a process pool. The lock is not picklable and is left out.
+
+        Returns:
+            dict: attribute name to value key value pairs without the lock
+        """
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        This method restores a pickled cache with a new lock. The index is on disk, so every process shares it, but only the threads of a process share the lock.
+
+        Args:
+            state (dict): attribute name to value key value pairs without the lock
+        """
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def read_index(self) -> dict:
+        """
+        This method reads the index of the cache.
+
+        Returns:
+            dict: url to cache entry key value pairs. empty if nothing has been cached yet.
+        """
+        if not os.path.exists(self.index_filepath):
+            return {}
+
+        with open(self.index_filepath, "r") as file:
+            return json.load(file)
+
+    def write_index(self, index: dict) -> None:
+        """
+        This method replaces the index of the cache. The file is replaced atomically, so a failed run never leaves a partially written index.
+
+        Args:
+            index (dict): url to cache entry key value pairs
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        temp_filepath = self.index_filepath + f".{uuid.uuid4().hex}.tmp"
+        with open(temp_filepath, "w") as file:
+            json.dump(index, file, indent=4)
+        os.replace(temp_filepath, self.index_filepath)
+
+    def lookup(self, url: str) -> dict:
+        """
+        This method returns the cache entry of a url if its file is still in the cache.
+
+        Args:
+            url (str): url of the source
+
+        Returns:
+            dict: the cache entry with the 'etag', 'last_modified', 'filename', 'size' and 'last_used' of the cached file, None if the url is not cached
+        """
+        with self._lock:
+            entry = self.read_index().get(url)
+
+        if entry is None or not os.path.exists(os.path.join(self.directory, entry['filename'])):
+            return None
+        return entry
+
+    def touch(self, url: str, entry: dict) -> str:
+        """
+        This method marks the cached file of a url as used now, so it is the last to be evicted.
+
+        Args:
+            url (str): url of the source
+            entry (dict): the cache entry of the url returned by lookup
+
+        Returns:
+            str: path to the cached file
+        """
+        with self._lock:
+            index = self.read_index()
+            # the entry is added back if another thread evicted it since the lookup
+            index[url] = dict(index.get(url, entry), last_used=time.time())
+            self.write_index(index)
+            return os.path.join(self.directory, index[url]['filename'])
+
+    @staticmethod
+    def counted_chunks(chunks: Iterable[bytes], count: Callable[[int], None]) -> Iterator[bytes]:
+        """
+        This method counts the bytes of the chunks of a download as they are read.
+
+        Args:
+            chunks (Iterable[bytes]): content of the download
+            count (Callable[[int], None]): called with the size of every chunk, e.g. HttpSession.count_received
+
+        Yields:
+            bytes: the next chunk
+        """
+        for chunk in chunks:
+            count(len(chunk))
+            yield chunk
+
+    def store(self, url: str, chunks: Iterable[bytes], etag: str = None, last_modified: str = None) -> str:
+        """
+        This method writes a downloaded file into the cache, records it in the index and evicts the least recently used files over the size limit.
+
+        Args:
+            url (str): url of the source
+            chunks (Iterable[bytes]): content of the file
+            etag (str): ETag of the source
+            last_modified (str): Last-Modified of the source
+
+        Returns:
+            str: path to the cached file
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        # write to a temporary file while hashing the content, so the file is never read before it is complete
+        sha256 = hashlib.sha256()
+        size = 0
+        temp_filepath = os.path.join(self.directory, f"{uuid.uuid4().hex}.tmp")
+        with open(temp_filepath, "wb") as file:
+            for chunk in chunks:
+                sha256.update(chunk)
+                size += len(chunk)
+                file.write(chunk)
+
+        # the extension of the url is kept, so readers inferring the file type from it still work
+        extension = os.path.splitext(url.split('?')[0])[1]
+        filename = sha256.hexdigest() + extension
+        os.replace(temp_filepath, os.path.join(self.directory, filename))
+
+        with self._lock:
+            index = self.read_index()
+            previous_entry = index.get(url)
+            index[url] = {'etag': etag, 'last_modified': last_modified, 'filename': filename, 'size': size, 'last_used': time.time()}
+
+            # the file of the previous version of the source is deleted unless another url has the same content
+            if previous_entry is not None and all(entry['filename'] != previous_entry['filename'] for entry in index.values()):
+                previous_filepath = os.path.join(self.directory, previous_entry['filename'])
+                if os.path.exists(previous_filepath):
+                    os.remove(previous_filepath)
+
+            self.evict(index, keep=url)
+            self.write_index(index)
+
+        return os.path.join(self.directory, filename)
+
+    def evict(self, index: dict, keep: str = None) -> None:
+        """
+        This method removes the least recently used entries from the index and deletes their files until the cached files fit in max_bytes.
+
+        Args:
+            index (dict): url to cache entry key value pairs, updated in place
+            keep (str): url that is never evicted, e.g. the file that has just been downloaded
+        """
+        # files are shared by the urls with identical content, so each file is counted once
+        file_sizes = {entry['filename']: entry['size'] for entry in index.values()}
+        total_size = sum(file_sizes.values())
+
+        for url in sorted(index, key=lambda url: index[url]['last_used']):
+            if total_size <= self.max_bytes:
+                break
+            if url == keep:
+                continue
+
+            filename = index.pop(url)['filename']
+            if all(entry['filename'] != filename for entry in index.values()):
+                total_size -= file_sizes[filename]
+                os.remove(os.path.join(self.directory, filename))
+
+    def fetch_url(self, url: str, http_session: HttpSession) -> str:
+        """
+        This method returns the path to the cached file of a url, downloading it only if it is not cached or has changed.
+        The cached file's ETag and Last-Modified are sent with If-None-Match and If-Modified-Since, a 304 response means it is unchanged.
+
+        Args:
+            url (str): url of the file
+            http_session (HttpSession): session the request is sent through
+
+        Returns:
+            str: path to the cached file
+
+        Raises:
+            requests.HTTPError: raises HTTPError if the download fails
+        """
+        entry = self.lookup(url)
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = http_session.get(url, headers=headers, stream=True)
+        with response:
+            if entry is not None and response.status_code == 304:
+                return self.touch(url, entry)
+
+            response.raise_for_status()
+            return self.store(url, DownloadCache.counted_chunks(response.iter_content(chunk_size=2**20), http_session.count_received),
+                              etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+
+    def fetch_s3(self, s3_client, bucket_name: str, key: str) -> str:
+        """
+        This method returns the path to the cached file of an s3 object, downloading it only if it is not cached or has changed.
+        The object is requested with the cached file's ETag in IfNoneMatch, a 304 error means it is unchanged.
+
+        Args:
+            s3_client: boto3 s3 client
+            bucket_name (str): name of the bucket
+            key (str): key of the object
+
+        Returns:
+            str: path to the cached file
+        """
+        url = f"s3://{bucket_name}/{key}"
+        entry = self.lookup(url)
+
+        try:
+            if entry is not None and entry['etag']:
+                response = s3_client.get_object(Bucket=bucket_name, Key=key, IfNoneMatch=entry['etag'])
+            else:
+                response = s3_client.get_object(Bucket=bucket_name, Key=key)
+        except ClientError as e:
+            if entry is not None and e.response.get('Error', {}).get('Code') in ('304', 'NotModified'):
+                return self.touch(url, entry)
+            raise
+
+        NetworkUsage.count(response.get('ContentLength', 0))
+        last_modified = response.get('LastModified')
+        return self.store(url, response['Body'].iter_chunks(chunk_size=2**20),
+                          etag=response.get('ETag'), last_modified=str(last_modified) if last_modified else None)
@@ -0,0 +1,107 @@
+from string_transforms import StringTransforms
+import pandas as pd
+from typing import Iterable, Iterator
+
+class DtypePolicy:
+    """
+    This class converts the string columns of extracted dataframes to compact dtypes: the low-cardinality columns to category
+    and the other string columns to STRING_DTYPE, which is backed by pyarrow when it is installed.
+    Columns mixing strings with other values, such as card numbers, are left as object dtype.
+
+    Attributes:
+        CATEGORY_COLUMNS (tuple[str]): names of the low-cardinality columns converted to category
+    """
+    CATEGORY_COLUMNS = ('card_provider', 'country_code', 'continent', 'store_type', 'category', 'removed', 'time_period')
+
+    @staticmethod
+    def memory_usage(data: pd.DataFrame) -> int:
+        """
+        This method returns the memory used by a dataframe, including the strings held by object columns.
+
+        Args:
+            data (pd.DataFrame): dataframe to be measured
+
+        Returns:
+            int: memory used by the dataframe in bytes
+        """
+        return int(data.memory_usage(deep=True).sum())
+
+    @staticmethod
+    def apply(data: pd.DataFrame, category_columns: Iterable[str] = CATEGORY_COLUMNS) -> pd.DataFrame:
+        """
+        This method converts the string columns of a dataframe to category or STRING_DTYPE.
+
+        Args:
+            data (pd.DataFrame): extracted dataframe
+            category_columns (Iterable[str]): names of the columns converted to category
+
+        Returns:
+            pd.DataFrame: the dataframe with its string columns converted
+        """
+        category_columns = set(category_columns)
+
+        # a shallow copy shares the columns that are not converted with the extracted dataframe
+        converted = data.copy(deep=False)
+        for name, column in data.items():
+            if column.dtype != object or pd.api.types.infer_dtype(column, skipna=True) != 'string':
+                continue
+
+            if name in category_columns:
+                converted[name] = column.astype('category')
+            else:
+                converted[name] = StringTransforms.as_strings(column)
+
+        return converted
+
+    @staticmethod
+    def apply_with_report(data: pd.DataFrame, table_name: str, category_columns: Iterable[str] = CATEGORY_COLUMNS) -> pd.DataFrame:
+        """
+        This method converts the string columns of a dataframe to category or STRING_DTYPE and prints its memory before and after.
+
+        Args:
+            data (pd.DataFrame): extracted dataframe
+            table_name (str): name of the table printed in the report
+            category_columns (Iterable[str]): names of the columns converted to category
+
+        Returns:
+            pd.DataFrame: the dataframe with its string columns converted
+        """
+        memory_before = DtypePolicy.memory_usage(data)
+        converted = DtypePolicy.apply(data, category_columns)
+        DtypePolicy.print_report(table_name, memory_before, DtypePolicy.memory_usage(converted))
+        return converted
+
+    @staticmethod
+    def apply_to_chunks(chunks: Iterable[pd.DataFrame], table_name: str, category_columns: Iterable[str] = CATEGORY_COLUMNS) -> Iterator[pd.DataFrame]:
+        """
+        This method converts the string columns of every chunk of a table and prints the memory of all the chunks before and after once they are all converted.
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): extracted dataframe chunks
+            table_name (str): name of the table printed in the report
+            category_columns (Iterable[str]): names of the columns converted to category
+
+        Yields:
+            pd.DataFrame: the next converted chunk
+        """
+        memory_before = memory_after = 0
+        for chunk in chunks:
+            memory_before += DtypePolicy.memory_usage(chunk)
+            chunk = DtypePolicy.apply(chunk, category_columns)
+            memory_after += DtypePolicy.memory_usage(chunk)
+            yield chunk
+
+        DtypePolicy.print_report(table_name, memory_before, memory_after)
+
+    @staticmethod
+    def print_report(table_name: str, memory_before: int, memory_after: int) -> None:
+        """
+        This method prints the memory of a table before and after its columns were converted.
+
+        Args:
+            table_name (str): name of the table
+            memory_before (int): memory in bytes before the conversion
+            memory_after (int): memory in bytes after the conversion
+        """
+        saved = 1 - memory_after / memory_before if memory_before else 0
+        print(f"{table_name}: {memory_before / 2**20:.1f} MiB -> {memory_after / 2**20:.1f} MiB ({saved:.0%} less memory)")
@@ -0,0 +1,114 @@
+from sqlalchemy import create_engine, Engine
+from sqlalchemy.pool import QueuePool
+import threading
+import time
+
+class MeteredQueuePool(QueuePool):
+    """
+    This class is a SQLAlchemy QueuePool that counts its connections and checkouts and measures how long checkouts wait for a free connection.
+
+    Attributes:
+        metrics (dict): 'connections' opened, 'checkouts' served, total 'wait_seconds' and 'max_wait_seconds' of the checkouts
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = {'connections': 0, 'checkouts': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+        self.metrics_lock = threading.Lock()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait_seconds = time.perf_counter() - start
+            with self.metrics_lock:
+                self.metrics['checkouts'] += 1
+                self.metrics['wait_seconds'] += wait_seconds
+                self.metrics['max_wait_seconds'] = max(self.metrics['max_wait_seconds'], wait_seconds)
+
+    def _create_connection(self):
+        with self.metrics_lock:
+            self.metrics['connections'] += 1
+        return super()._create_connection()
+
+class EngineRegistry:
+    """
+    This class is a process-wide registry of SQLAlchemy engines, so every class connecting to the same database shares one engine and its connection pool.
+    Engines are keyed by their database url and pool options.
+
+    Attributes:
+        pool_options (dict): options of the connection pools of the engines created from now on
+        engines (dict): (url, pool options) to engine key value pairs of the created engines
+    """
+    pool_options = {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    }
+    engines = {}
+    lock = threading.Lock()
+
+    @staticmethod
+    def configure(pool_size: int = None, max_overflow: int = None, pool_pre_ping: bool = None, pool_recycle: int = None) -> None:
+        """
+        This method changes the connection pool options of the engines created from now on. Arguments left as None keep their current value.
+
+        Args:
+            pool_size (int): number of connections kept open in the pool
+            max_overflow (int): number of connections opened beyond pool_size when all pooled connections are checked out
+            pool_pre_ping (bool): whether a connection is tested before it is checked out, so dropped connections are replaced transparently
+            pool_recycle (int): seconds after which a connection is replaced. -1 never replaces connections.
+        """
+        options = {'pool_size': pool_size, 'max_overflow': max_overflow, 'pool_pre_ping': pool_pre_ping, 'pool_recycle': pool_recycle}
+        with EngineRegistry.lock:
+            EngineRegistry.pool_options.update({key: value for key, value in options.items() if value is not None})
+
+    @staticmethod
+    def get_engine(url: str) -> Engine:
+        """
+        This method returns the engine of a database url, creating it on the first call.
+
+        Args:
+            url (str): SQLAlchemy database url
+
+        Returns:
+            Engine (SQLAlchemyEngine): the shared engine of the url
+        """
+        with EngineRegistry.lock:
+            key = (url, tuple(sorted(EngineRegistry.pool_options.items())))
+            if key not in EngineRegistry.engines:
+                EngineRegistry.engines[key] = create_engine(url, poolclass=MeteredQueuePool, **EngineRegistry.pool_options)
+            return EngineRegistry.engines[key]
+
+    @staticmethod
+    def pool_metrics() -> dict[str, dict]:
+        """
+        This method returns the connection pool metrics of every engine in the registry.
+
+        Returns:
+            dict[str, dict]: database url, without password, to the pool's connection, checkout and wait metrics and its current status
+        """
+        with EngineRegistry.lock:
+            engines = list(EngineRegistry.engines.values())
+
+        metrics = {}
+        for engine in engines:
+            pool = engine.pool
+            with pool.metrics_lock:
+                pool_metrics = dict(pool.metrics)
+            pool_metrics['checked_out'] = pool.checkedout()
+            pool_metrics['status'] = pool.status()
+            metrics[engine.url.render_as_string(hide_password=True)] = pool_metrics
+
+        return metrics
+
+    @staticmethod
+    def dispose_all() -> None:
+        """
+        This method closes the pooled connections of every engine and empties the registry.
+        """
+        with EngineRegistry.lock:
+            for engine in EngineRegistry.engines.values():
+                engine.dispose()
+            EngineRegistry.engines.clear()
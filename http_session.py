@@ -0,0 +1,162 @@
+from network_usage import NetworkUsage
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+class HttpSession:
+    """
+    This class is a pooled, reusable HTTP transport for the web calls of DataExtractor.
+    Connections are kept alive in a pool and reused between requests to the same host instead of opening a new TCP/TLS connection for every request.
+
+    Attributes:
+        session (requests.Session): the requests session holding the default headers and the mounted adapter
+        adapter (HTTPAdapter): the adapter holding the keep-alive connection pools
+        min_interval (float): minimum number of seconds between two requests to the same host
+        bytes_received (int): number of response body bytes received through the session, including the streamed bodies read through count_received
+    """
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 32, retries: int = 3, backoff: float = 0.5, requests_per_second: float = None) -> None:
+        """
+        Args:
+            pool_connections (int): number of hosts to keep a connection pool for
+            pool_maxsize (int): maximum number of keep-alive connections kept in each host's pool
+            retries (int): number of times a request is retried on connection errors and 429/5xx responses
+            backoff (float): backoff factor in seconds between retries, doubled on every following retry
+            requests_per_second (float): maximum number of requests per second sent to a single host. None does not limit the rate.
+        """
+        retry = Retry(total=retries,
+                      backoff_factor=backoff,
+                      status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=['HEAD', 'GET'],
+                      respect_retry_after_header=True,
+                      raise_on_status=False)
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+        self.min_interval = 1 / requests_per_second if requests_per_second else 0
+        self.bytes_received = 0
+        self._next_request_time = {}
+        self._lock = threading.Lock()
+
+        # the pool manager drops the pools of the least recently used hosts beyond pool_connections, their counts are kept when they are dropped
+        self._evicted_stats = {'opened': 0, 'requests': 0}
+        pools = self.adapter.poolmanager.pools
+        self._dispose_pool = pools.dispose_func
+        pools.dispose_func = self.count_evicted_pool
+
+    def count_evicted_pool(self, pool) -> None:
+        """
+        This method adds the connections and requests of a host's pool dropped by the pool manager to the counts of connection_stats, and disposes of the pool.
+
+        Args:
+            pool (urllib3.HTTPConnectionPool): the dropped pool
+        """
+        with self._lock:
+            self._evicted_stats['opened'] += pool.num_connections
+            self._evicted_stats['requests'] += pool.num_requests
+
+        if self._dispose_pool is not None:
+            self._dispose_pool(pool)
+
+    def wait_for_host(self, url: str) -> None:
+        """
+        This method blocks until a request to the host of the url is allowed by the per-host rate limit.
+
+        Args:
+            url (str): the url that is going to be requested
+        """
+        if not self.min_interval:
+            return
+
+        host = urlsplit(url).netloc
+
+        # reserve the next free slot for the host, so concurrent callers are spaced min_interval apart
+        with self._lock:
+            now = time.monotonic()
+            request_time = max(now, self._next_request_time.get(host, now))
+            self._next_request_time[host] = request_time + self.min_interval
+
+        if request_time > now:
+            time.sleep(request_time - now)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        This method sends a request through the pooled session.
+
+        Args:
+            method (str): HTTP method of the request
+            url (str): url to request
+            **kwargs: keyword arguments passed on to requests.Session.request
+
+        Returns:
+            requests.Response: the response of the request
+        """
+        self.wait_for_host(url)
+        response = self.session.request(method, url, **kwargs)
+
+        # streamed bodies are not read here, their reader counts them with count_received
+        if not kwargs.get('stream'):
+            self.count_received(len(response.content))
+
+        return response
+
+    def count_received(self, size: int) -> None:
+        """
+        This method counts response body bytes received through the session, in bytes_received and by the NetworkUsage counter of the caller.
+
+        Args:
+            size (int): number of bytes received
+        """
+        with self._lock:
+            self.bytes_received += size
+        NetworkUsage.count(size)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        This method sends a GET request through the pooled session.
+
+        Args:
+            url (str): url to request
+            **kwargs: keyword arguments passed on to requests.Session.request
+
+        Returns:
+            requests.Response: the response of the request
+        """
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        """
+        This method sends a HEAD request through the pooled session.
+
+        Args:
+            url (str): url to request
+            **kwargs: keyword arguments passed on to requests.Session.request
+
+        Returns:
+            requests.Response: the response of the request
+        """
+        return self.request('HEAD', url, **kwargs)
+
+    def connection_stats(self) -> dict[str, int]:
+        """
+        This method counts the connections opened by the session against the requests sent over them, including those of the hosts whose pool has been dropped.
+
+        Returns:
+            dict[str, int]: number of connections 'opened', number of 'requests' sent and number of requests that 'reused' an open connection
+        """
+        with self._lock:
+            opened = self._evicted_stats['opened']
+            sent = self._evicted_stats['requests']
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            opened += pool.num_connections
+            sent += pool.num_requests
+
+        return {'opened': opened, 'requests': sent, 'reused': sent - opened}
@@ -2,53 +2,253 @@ from database_utils import DatabaseConnector
 from data_extraction import DataExtractor
 from data_cleaning import DataCleaning
 from alter_data_types import AlterDatabase
+from watermarks import WatermarkStore
+from dtype_policy import DtypePolicy
+from download_cache import DownloadCache
+from clean_cache import CleanedFrameCache
+from staging import StagingArea
+from stage_metrics import StageMetrics
+from schema_finaliser import SchemaFinaliser
+from pipeline import TaskGraph
+from engine_registry import EngineRegistry
+from typing import Callable, Iterable, Union
+import pandas as pd
+import argparse
+import functools
+import os
+
+# number of rows streamed from the RDS tables at a time
+RDS_CHUNKSIZE = 50000
+
+# number of page shards of the card details pdf read at the same time
+PDF_WORKERS = os.cpu_count() or 1
+
+# cache of the cleaned dataframes, None to always clean the extracted data
+clean_cache = None
+
+def cached(cleaner: Callable[[pd.DataFrame], pd.DataFrame]) -> Callable[[pd.DataFrame], pd.DataFrame]:
+    """
+    This method returns a clean method that reads its result from clean_cache when the same data has been cleaned by the same code before.
+
+    Args:
+        cleaner (Callable[[pd.DataFrame], pd.DataFrame]): clean method, e.g. DataCleaning.clean_card_data
+
+    Returns:
+        Callable[[pd.DataFrame], pd.DataFrame]: the cached clean method, cleaner itself if the cache is disabled
+    """
+    if clean_cache is None:
+        return cleaner
+    return functools.update_wrapper(functools.partial(clean_cache.clean, cleaner=cleaner), cleaner)
+
+def handed_over(cleaner: Callable[[pd.DataFrame], pd.DataFrame]) -> Callable[[pd.DataFrame], pd.DataFrame]:
+    """
+    This method returns a clean method the extracted data is handed over to, which cleans it in place instead of copying it first.
+    The pipeline does not use the extracted data once it is cleaned, so its memory is freed as it is cleaned.
+
+    Args:
+        cleaner (Callable[[pd.DataFrame], pd.DataFrame]): clean method with an inplace argument, e.g. DataCleaning.clean_card_data
+
+    Returns:
+        Callable[[pd.DataFrame], pd.DataFrame]: the clean method called with inplace=True
+    """
+    return functools.update_wrapper(functools.partial(cleaner, inplace=True), cleaner)
+
+# measurements of the calls of every stage of every table, None to not measure them
+pipeline_metrics = None
+
+def measured(table_name: str, stage: str, func: Callable) -> Callable:
+    """
+    This method returns a function whose calls are measured in pipeline_metrics.
+
+    Args:
+        table_name (str): name of the table the calls are made for
+        stage (str): stage of the pipeline the calls are made in, e.g. 'extract'
+        func (Callable): function to measure, e.g. DataExtractor.extract_from_s3
+
+    Returns:
+        Callable: the measured function, func itself if the calls are not measured
+    """
+    if pipeline_metrics is None:
+        return func
+    return pipeline_metrics.measure(table_name, stage, func)
+
+def run_measured_task(task: Callable, table_name: str, state: dict = None, **kwargs) -> list[dict]:
+    """
+    This method runs the task of a table and returns the measurements of its calls, so they reach the main process when the task runs in a process pool.
+
+    Args:
+        task (Callable): the task, e.g. retrieve_data_and_create_card_table
+        table_name (str): name of the table the calls of the task are measured for
+        state (dict): the pipeline state the task runs with, see use_pipeline_state. None to run it with the state of the process
+        **kwargs: keyword arguments of the task
+
+    Returns:
+        list[dict]: the measurements of the calls of the task, None if the calls are not measured
+    """
+    if state is not None:
+        use_pipeline_state(state)
+    task(**kwargs)
+    if pipeline_metrics is None:
+        return None
+    return pipeline_metrics.pop_records(table_name)
+
+# persisted output of the stages of every table, None to stream every table from extraction to load in memory
+staging_area = None
+
+def use_pipeline_state(state: dict) -> None:
+    """
+    This method sets clean_cache, pipeline_metrics and staging_area and the download_cache of DataExtractor.
+    A process pool started with spawn or forkserver imports this module again in each worker, without the values set by running it as a script,
+    so every task is sent the state it runs with and sets it first.
+
+    Args:
+        state (dict): 'clean_cache', 'pipeline_metrics', 'staging_area' and 'download_cache' key value pairs
+    """
+    global clean_cache, pipeline_metrics, staging_area
+    clean_cache = state['clean_cache']
+    pipeline_metrics = state['pipeline_metrics']
+    staging_area = state['staging_area']
+    DataExtractor.download_cache = state['download_cache']
+
+def staged(table_name: str, stage: str, run_stage: Callable[[], Union[pd.DataFrame, Iterable[pd.DataFrame]]], from_stage: str = None, metadata: dict = None) -> Union[pd.DataFrame, Iterable[pd.DataFrame]]:
+    """
+    This method returns the output of a stage of a table. Without staging_area the stage is run and its output returned as it is produced.
+    With staging_area, the output is read back from the staging area if the table is re-run from a later stage, otherwise the stage is run and its output persisted before it is read back.
+
+    Args:
+        table_name (str): name of the table
+        stage (str): stage of the pipeline, one of StagingArea.STAGES
+        run_stage (Callable[[], Union[pd.DataFrame, Iterable[pd.DataFrame]]]): runs the stage and returns its output
+        from_stage (str): stage the table is re-run from, None to run every stage
+        metadata (dict): json serialisable values persisted with the output, e.g. the watermarks of an incremental extraction
+
+    Returns:
+        Union[pd.DataFrame, Iterable[pd.DataFrame]]: the output of the stage, a dataframe or an iterable of dataframe chunks
+    """
+    if staging_area is None:
+        return run_stage()
 
-def retrieve_data_and_create_card_table():
+    if from_stage is not None and StagingArea.STAGES.index(stage) < StagingArea.STAGES.index(from_stage):
+        return staging_area.read(table_name, stage)
+
+    staging_area.write(run_stage(), table_name, stage, metadata)
+    return staging_area.read(table_name, stage)
+
+def retrieve_data_and_create_card_table(compact_dtypes: bool = False, from_stage: str = None, to_stage: str = None):
     """
     This method retrieves card sdata from public amazon s3 bucket, cleans the data and create a table in local database.
+
+    Args:
+        compact_dtypes (bool): whether to convert the string columns of the extracted data to category and pyarrow strings
+        from_stage (str): stage the table is re-run from, the output of the stages before it is read from staging_area. None to run every stage
+        to_stage (str): last stage run, None to run every stage
     """
-    # retrieve card data
-    card_df = DataExtractor.retrieve_pdf_data("https://data-handling-public.s3.eu-west-1.amazonaws.com/card_details.pdf")
+    # retrieve card data, the pages of the pdf are read in shards in parallel
+    link = "https://data-handling-public.s3.eu-west-1.amazonaws.com/card_details.pdf"
+    card_chunks = staged('dim_card_details', 'extract', lambda: measured('dim_card_details', 'extract', DataExtractor.stream_pdf_data)(link, max_workers=PDF_WORKERS), from_stage)
+    if to_stage == 'extract':
+        return
+
+    # convert the string columns to compact dtypes
+    if compact_dtypes:
+        card_chunks = DtypePolicy.apply_to_chunks(card_chunks, 'dim_card_details')
 
-    # clean card data and check whether the card_number columns are unique
-    clean_card_df = DataCleaning.clean_card_data(card_df)
+    # clean card data shard by shard as each shard is read
+    clean_card_chunks = staged('dim_card_details', 'clean', lambda: DataCleaning.clean_chunks(card_chunks, measured('dim_card_details', 'clean', cached(handed_over(DataCleaning.clean_card_data)))), from_stage)
+    if to_stage == 'clean':
+        return
 
     # save to local df
-    DatabaseConnector.upload_to_db(clean_card_df, 'dim_card_details')
+    measured('dim_card_details', 'load', SchemaFinaliser.upload_to_db)(clean_card_chunks, 'dim_card_details')
 
-def retrieve_data_and_create_product_table():
+def retrieve_data_and_create_product_table(compact_dtypes: bool = False, from_stage: str = None, to_stage: str = None):
     """
     This method retrieves products data from amazon s3 bucket, cleans it and creates a table in local database.
+
+    Args:
+        compact_dtypes (bool): whether to convert the string columns of the extracted data to category and pyarrow strings
+        from_stage (str): stage the table is re-run from, the output of the stages before it is read from staging_area. None to run every stage
+        to_stage (str): last stage run, None to run every stage
     """
     # product data links
     s3_address = 's3://data-handling-public/products.csv'
 
     # extract the products data from s3
-    product_df = DataExtractor.extract_from_s3(s3_address)
+    product_df = staged('dim_products', 'extract', lambda: measured('dim_products', 'extract', DataExtractor.extract_from_s3)(s3_address), from_stage)
+    if to_stage == 'extract':
+        return
+
+    # convert the string columns to compact dtypes
+    if compact_dtypes:
+        product_df = DtypePolicy.apply_with_report(product_df, 'dim_products')
 
     # clean the products data
-    clean_product_df = DataCleaning.clean_products_data(product_df)
+    clean_product_df = staged('dim_products', 'clean', lambda: measured('dim_products', 'clean', cached(handed_over(DataCleaning.clean_products_data)))(product_df), from_stage)
+    if to_stage == 'clean':
+        return
 
     # save to local db
-    DatabaseConnector.upload_to_db(clean_product_df, 'dim_products')
+    measured('dim_products', 'load', SchemaFinaliser.upload_to_db)(clean_product_df, 'dim_products')
 
-def retrieve_data_and_create_user_table():
+def retrieve_data_and_create_user_table(incremental: bool = False, compact_dtypes: bool = False, from_stage: str = None, to_stage: str = None):
     """
     This method retrieves user data from amazon RDS database, cleans it and creates a table in local database.
+    If incremental is True and the table has been extracted before, only the users added since the last run are retrieved and merged into the local table.
+
+    Args:
+        incremental (bool): whether to merge only the new users into the local table instead of rebuilding it
+        compact_dtypes (bool): whether to convert the string columns of the extracted data to category and pyarrow strings
+        from_stage (str): stage the table is re-run from, the output of the stages before it is read from staging_area. None to run every stage
+        to_stage (str): last stage run, None to run every stage
     """
-    # extract the users data
+    # high-watermark of the users already loaded and of the users available now. the watermark is the index, so only the users added since are read,
+    # legacy_users has no column recording changes and the users changed since they were loaded are not read again.
+    # a re-run from a later stage uses the watermarks the staged users were extracted with.
+    watermarks = WatermarkStore()
     db_connector = DatabaseConnector('config/db_creds.yaml')
-    user_df = DataExtractor.read_rds_table(db_connector, 'legacy_users')
-
-    # clean the users data
-    clean_user_df = DataCleaning.clean_user_data(user_df)
-
-    # save to local db
-    DatabaseConnector.upload_to_db(clean_user_df, 'dim_users')
-
-def retrieve_data_and_create_store_table():
+    if from_stage in (None, 'extract'):
+        window = {'since': watermarks.get('legacy_users') if incremental else None,
+                  'until': measured('dim_users', 'extract', DataExtractor.read_rds_high_watermark)(db_connector, 'legacy_users', 'index')}
+    else:
+        window = staging_area.read_metadata('dim_users', 'extract')
+
+    # extract the users data, without the duplicate users and the rows with missing values the cleaning drops
+    user_chunks = staged('dim_users', 'extract',
+                         lambda: measured('dim_users', 'extract', DataExtractor.read_rds_table)(db_connector, 'legacy_users', chunksize=RDS_CHUNKSIZE,
+                                                                                                watermark_column='index', since=window['since'], until=window['until'],
+                                                                                                source_spec=DataCleaning.SOURCE_SPECS['clean_user_data']),
+                         from_stage, metadata=window)
+    if to_stage == 'extract':
+        return
+
+    # convert the string columns to compact dtypes
+    if compact_dtypes:
+        user_chunks = DtypePolicy.apply_to_chunks(user_chunks, 'dim_users')
+
+    # clean the users data chunk by chunk. the chunks are new on every run, so they are not looked up in the clean cache
+    clean_user_chunks = staged('dim_users', 'clean',
+                               lambda: DataCleaning.clean_chunks(user_chunks, measured('dim_users', 'clean', handed_over(DataCleaning.clean_user_data)), unique_column='user_uuid'),
+                               from_stage)
+    if to_stage == 'clean':
+        return
+
+    # save to local db, users already in the table keep their first occurrence.
+    # a user whose first occurrence was dropped as invalid in an earlier run is loaded from its next valid occurrence.
+    if window['since'] is None:
+        measured('dim_users', 'load', SchemaFinaliser.upload_to_db)(clean_user_chunks, 'dim_users')
+    else:
+        measured('dim_users', 'load', DatabaseConnector.merge_into_db)(clean_user_chunks, 'dim_users', 'user_uuid', update_existing=False)
+
+    watermarks.set('legacy_users', window['until'])
+
+def retrieve_data_and_create_store_table(compact_dtypes: bool = False, from_stage: str = None, to_stage: str = None):
     """
     This method retrieves store data from amazon API endpoints, cleans it and creates a table in local database.
+
+    Args:
+        compact_dtypes (bool): whether to convert the string columns of the extracted data to category and pyarrow strings
+        from_stage (str): stage the table is re-run from, the output of the stages before it is read from staging_area. None to run every stage
+        to_stage (str): last stage run, None to run every stage
     """
     # data endpoints
     store_endpoint = 'https://aqj7u5id95.execute-api.eu-west-1.amazonaws.com/prod/store_details'
@@ -60,84 +260,253 @@ def retrieve_data_and_create_store_table():
     }
 
     # retrieve data
-    no_of_stores = DataExtractor.list_number_of_stores(store_num_endpoint, headers=headers)
-    store_df = DataExtractor.retrieve_stores_data(store_endpoint, no_of_stores, headers=headers)
+    def retrieve_stores():
+        no_of_stores = measured('dim_store_details', 'extract', DataExtractor.list_number_of_stores)(store_num_endpoint, headers=headers)
+        return measured('dim_store_details', 'extract', DataExtractor.retrieve_stores_data)(store_endpoint, no_of_stores, headers=headers, max_workers=16, timeout=10)
+
+    store_df = staged('dim_store_details', 'extract', retrieve_stores, from_stage)
+    if to_stage == 'extract':
+        return
+
+    # convert the string columns to compact dtypes
+    if compact_dtypes:
+        store_df = DtypePolicy.apply_with_report(store_df, 'dim_store_details')
 
     # clean the data
-    clean_store_df = DataCleaning.clean_store_data(store_df)
+    clean_store_df = staged('dim_store_details', 'clean', lambda: measured('dim_store_details', 'clean', cached(handed_over(DataCleaning.clean_store_data)))(store_df), from_stage)
+    if to_stage == 'clean':
+        return
 
     # save data to local db
-    DatabaseConnector.upload_to_db(clean_store_df, 'dim_store_details')
+    measured('dim_store_details', 'load', SchemaFinaliser.upload_to_db)(clean_store_df, 'dim_store_details')
 
-def retrieve_data_and_create_order_table():
+def retrieve_data_and_create_order_table(incremental: bool = False, compact_dtypes: bool = False, from_stage: str = None, to_stage: str = None):
     """
     This method retrieves single source of truth orders data from amazon RDS database, cleans it and creates a table in local database
+    If incremental is True and the table has been extracted before, only the orders added since the last run are retrieved and merged into the local table.
+
+    Args:
+        incremental (bool): whether to merge only the new orders into the local table instead of rebuilding it
+        compact_dtypes (bool): whether to convert the string columns of the extracted data to category and pyarrow strings
+        from_stage (str): stage the table is re-run from, the output of the stages before it is read from staging_area. None to run every stage
+        to_stage (str): last stage run, None to run every stage
     """
     # initialis an instance of database connector
     db_connector = DatabaseConnector('config/db_creds.yaml')
 
-    # retrieve data
-    order_df = DataExtractor.read_rds_table(db_connector, 'orders_table')
-
-    # clean the data
-    clean_order_df = DataCleaning.clean_orders_data(order_df)
+    # high-watermark of the orders already loaded and of the orders available now. the watermark is the index, so only the orders added since are read,
+    # orders_table has no column recording changes and the orders changed since they were loaded are not read again.
+    # a re-run from a later stage uses the watermarks the staged orders were extracted with.
+    watermarks = WatermarkStore()
+    if from_stage in (None, 'extract'):
+        window = {'since': watermarks.get('orders_table') if incremental else None,
+                  'until': measured('orders_table', 'extract', DataExtractor.read_rds_high_watermark)(db_connector, 'orders_table', 'index'),
+                  'index_start': 0}
+
+        # new orders continue the index of the orders already in the local table
+        if window['since'] is not None:
+            local_max_index = DatabaseConnector.read_local_max('orders_table', 'index')
+            window['index_start'] = 0 if local_max_index is None else local_max_index + 1
+    else:
+        window = staging_area.read_metadata('orders_table', 'extract')
+
+    # retrieve data, without the columns the cleaning drops
+    order_chunks = staged('orders_table', 'extract',
+                          lambda: measured('orders_table', 'extract', DataExtractor.read_rds_table)(db_connector, 'orders_table', chunksize=RDS_CHUNKSIZE, watermark_column='index',
+                                                                                                 since=window['since'], until=window['until'], index_start=window['index_start'],
+                                                                                                 source_spec=DataCleaning.SOURCE_SPECS['clean_orders_data']),
+                          from_stage, metadata=window)
+    if to_stage == 'extract':
+        return
+
+    # convert the string columns to compact dtypes
+    if compact_dtypes:
+        order_chunks = DtypePolicy.apply_to_chunks(order_chunks, 'orders_table')
+
+    # clean the data chunk by chunk. the chunks are new on every run, so they are not looked up in the clean cache
+    clean_order_chunks = staged('orders_table', 'clean', lambda: DataCleaning.clean_chunks(order_chunks, measured('orders_table', 'clean', handed_over(DataCleaning.clean_orders_data))), from_stage)
+    if to_stage == 'clean':
+        return
 
     # save data to local db
-    DatabaseConnector.upload_to_db(clean_order_df, 'orders_table')
+    if window['since'] is None:
+        measured('orders_table', 'load', SchemaFinaliser.upload_to_db)(clean_order_chunks, 'orders_table')
+    else:
+        measured('orders_table', 'load', DatabaseConnector.merge_into_db)(clean_order_chunks, 'orders_table', 'date_uuid')
 
-def retrieve_data_and_create_date_table():
+    watermarks.set('orders_table', window['until'])
+
+def retrieve_data_and_create_date_table(compact_dtypes: bool = False, from_stage: str = None, to_stage: str = None):
     """
     This method retrieves date and events data from aws in json format, cleans it and creates a table in local database
+
+    Args:
+        compact_dtypes (bool): whether to convert the string columns of the extracted data to category and pyarrow strings
+        from_stage (str): stage the table is re-run from, the output of the stages before it is read from staging_area. None to run every stage
+        to_stage (str): last stage run, None to run every stage
     """
     # assign the link to the data
     link = 'https://data-handling-public.s3.eu-west-1.amazonaws.com/date_details.json'
 
     # retireve data
-    time_df = DataExtractor.retrieve_date_events_data(link)
+    time_df = staged('dim_date_times', 'extract', lambda: measured('dim_date_times', 'extract', DataExtractor.retrieve_date_events_data)(link), from_stage)
+    if to_stage == 'extract':
+        return
+
+    # convert the string columns to compact dtypes
+    if compact_dtypes:
+        time_df = DtypePolicy.apply_with_report(time_df, 'dim_date_times')
 
     # clean the data
-    clean_time_df = DataCleaning.clean_date_data(time_df)
+    clean_time_df = staged('dim_date_times', 'clean', lambda: measured('dim_date_times', 'clean', cached(handed_over(DataCleaning.clean_date_data)))(time_df), from_stage)
+    if to_stage == 'clean':
+        return
 
     # save data to local db
-    DatabaseConnector.upload_to_db(clean_time_df, 'dim_date_times')
+    measured('dim_date_times', 'load', SchemaFinaliser.upload_to_db)(clean_time_df, 'dim_date_times')
 
-def alter_data_and_add_foreign_keys():
+def drop_foreign_keys():
     """
-    This method alters the data types of tables in local database and adds relevant foreign keys to the orders_table.
+    This method drops the foreign keys of orders_table added by an earlier run, so the tables they reference can be replaced.
     """
-    # alter data types
-    database_alterer = AlterDatabase()
-    database_alterer.alter_all()
-    database_alterer.add_foreign_keys()
+    AlterDatabase().drop_foreign_keys()
 
 
-if __name__ == "__main__":
-    print("Tables creation starting. This might take some time......")
-
-    print("Starting dim_card_details table creation.")
-    retrieve_data_and_create_card_table()
-    print("Finished dim_card_details table creation.\n")
+def alter_data_and_add_foreign_keys(deferred_fk_validation: bool = False):
+    """
+    This method alters the data types of tables in local database and adds relevant foreign keys to the orders_table.
 
-    print("Starting dim_products table creation.")
-    retrieve_data_and_create_product_table()
-    print("Finished dim_products table creation.\n")
+    Args:
+        deferred_fk_validation (bool): whether the foreign key columns are indexed and the foreign keys added NOT VALID and validated afterwards
+    """
+    # alter data types
+    database_alterer = AlterDatabase()
+    measured('sales_data', 'alter', database_alterer.alter_all)()
+    measured('sales_data', 'alter', database_alterer.add_foreign_keys)(deferred_validation=deferred_fk_validation)
 
-    print("Starting dim_users table creation.")
-    retrieve_data_and_create_user_table()
-    print("Ending dim_users table creation.\n")
 
-    print("Starting dim_store_details table creation.")
-    retrieve_data_and_create_store_table()
-    print("Ending dim_store_details table creation.\n")
+def build_pipeline(incremental: bool = False, compact_dtypes: bool = False, from_stage: str = None, to_stage: str = None, deferred_fk_validation: bool = False,
+                   clean_cache: CleanedFrameCache = None, pipeline_metrics: StageMetrics = None, staging_area: StagingArea = None, download_cache: DownloadCache = None) -> TaskGraph:
+    """
+    This method builds the task graph of the pipeline. The table creation tasks do not depend on each other and run concurrently, the alter and foreign key task runs once all the tables are created.
+    When the tables are loaded, the foreign keys of the previous run are dropped before the table creation tasks start.
+    The caches, measurements and staging area are passed to every task, so the tasks run with them in a process pool whatever its start method.
+
+    Args:
+        incremental (bool): whether dim_users and orders_table are updated incrementally
+        compact_dtypes (bool): whether the string columns of the extracted data are converted to category and pyarrow strings
+        from_stage (str): stage the tables are re-run from, the output of the stages before it is read from staging_area. None to run every stage
+        to_stage (str): last stage run, the alter and foreign key task only runs if the tables are loaded. None to run every stage
+        deferred_fk_validation (bool): whether the foreign key columns are indexed and the foreign keys added NOT VALID and validated afterwards
+        clean_cache (CleanedFrameCache): cache of the cleaned dataframes, None to always clean the extracted data
+        pipeline_metrics (StageMetrics): measurements of the calls of every stage of every table, None to not measure them
+        staging_area (StagingArea): persisted output of the stages of every table, None to stream every table from extraction to load in memory
+        download_cache (DownloadCache): cache of the downloaded files, None to use DataExtractor.download_cache
+
+    Returns:
+        TaskGraph: the task graph of the pipeline
+    """
+    stages = {'compact_dtypes': compact_dtypes, 'from_stage': from_stage, 'to_stage': to_stage}
+    state = {'clean_cache': clean_cache, 'pipeline_metrics': pipeline_metrics, 'staging_area': staging_area,
+             'download_cache': download_cache if download_cache is not None else DataExtractor.download_cache}
+    graph = TaskGraph()
+
+    # every task sets the pipeline state and returns the measurements of its calls
+    def add_task(name: str, task: Callable, table_name: str, **kwargs):
+        graph.add_task(name, functools.partial(run_measured_task, task, table_name, state), **kwargs)
+
+    # the foreign keys of the previous run would stop the tables they reference from being replaced
+    loads_tables = to_stage in (None, 'load')
+    dependencies = []
+    if loads_tables:
+        add_task('drop_foreign_keys', drop_foreign_keys, 'sales_data')
+        dependencies = ['drop_foreign_keys']
+
+    add_task('dim_card_details', retrieve_data_and_create_card_table, 'dim_card_details', dependencies=dependencies, **stages)
+    add_task('dim_products', retrieve_data_and_create_product_table, 'dim_products', dependencies=dependencies, **stages)
+    add_task('dim_users', retrieve_data_and_create_user_table, 'dim_users', dependencies=dependencies, incremental=incremental, **stages)
+    add_task('dim_store_details', retrieve_data_and_create_store_table, 'dim_store_details', dependencies=dependencies, **stages)
+    add_task('orders_table', retrieve_data_and_create_order_table, 'orders_table', dependencies=dependencies, incremental=incremental, **stages)
+    add_task('dim_date_times', retrieve_data_and_create_date_table, 'dim_date_times', dependencies=dependencies, **stages)
+    if not loads_tables:
+        return graph
+
+    add_task('alter_data_and_add_foreign_keys', alter_data_and_add_foreign_keys, 'sales_data', deferred_fk_validation=deferred_fk_validation,
+             dependencies=['dim_card_details', 'dim_products', 'dim_users', 'dim_store_details', 'orders_table', 'dim_date_times'])
+    return graph
 
-    print("Starting orders_table table creation.")
-    retrieve_data_and_create_order_table()
-    print("Ending orders_table table creation.\n")
 
-    print("Starting dim_date_times table creation.")
-    retrieve_data_and_create_date_table()
-    print("Ending dim_date_times table creation.\n")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrieve, clean and save the retail data in the local sales_data database.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="merge only the rows added to the RDS tables since the last run instead of rebuilding dim_users and orders_table. rows changed in the RDS tables after they were loaded are not updated")
+    parser.add_argument("--workers", type=int, default=6,
+                        help="maximum number of tables created at the same time")
+    parser.add_argument("--executor", choices=['thread', 'process'], default='thread',
+                        help="run the tasks in a thread pool or a process pool")
+    parser.add_argument("--compact-dtypes", action="store_true",
+                        help="convert low-cardinality string columns to category and other string columns to pyarrow strings after extraction, printing the memory of each table before and after")
+    parser.add_argument("--cache-dir", default="cache/downloads",
+                        help="directory of the cache of the downloaded pdf, csv and json files")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="maximum size of the download cache in MiB, the least recently used files are evicted beyond it")
+    parser.add_argument("--clean-cache-dir", default="cache/cleaned",
+                        help="directory of the cache of the cleaned dataframes")
+    parser.add_argument("--clean-cache-size", type=int, default=1024,
+                        help="maximum size of the cache of the cleaned dataframes in MiB, the least recently used results are evicted beyond it")
+    parser.add_argument("--clean-cache", action="store_true",
+                        help="read the cleaned dim tables from the cache of an earlier run when their extracted data and the cleaning code are unchanged")
+    parser.add_argument("--staging", action="store_true",
+                        help="persist the extracted and the cleaned data of every table as Parquet, so a failed run can be re-run from the stage that failed")
+    parser.add_argument("--staging-dir", default="staging",
+                        help="directory of the persisted extracted and cleaned data")
+    parser.add_argument("--from-stage", choices=StagingArea.STAGES,
+                        help="re-run the tables from a stage, reading the output of the stages before it from the staging directory. implies --staging")
+    parser.add_argument("--to-stage", choices=StagingArea.STAGES,
+                        help="last stage run, e.g. clean to re-run only the cleaning with --from-stage clean. implies --staging")
+    parser.add_argument("--deferred-fk-validation", action="store_true",
+                        help="index the foreign key columns of orders_table, add its foreign keys NOT VALID and validate them afterwards, printing the time of each phase")
+    parser.add_argument("--metrics-json",
+                        help="measure the wall time, CPU time, peak RSS growth, rows, dataframe memory and network bytes of every extract, clean, load and alter call and write them to this json file")
+    parser.add_argument("--metrics-textfile",
+                        help="also write the measurements in the Prometheus text format to this file, e.g. for the textfile collector of the node exporter")
+    parser.add_argument("--profile", choices=StageMetrics.PROFILERS,
+                        help="profile every measured call with cProfile or pyinstrument, writing one profile per table, stage and call")
+    parser.add_argument("--profile-dir", default="profiles",
+                        help="directory of the profiles")
+    args = parser.parse_args()
+    if args.from_stage and args.to_stage and StagingArea.STAGES.index(args.to_stage) < StagingArea.STAGES.index(args.from_stage):
+        parser.error("--to-stage must not come before --from-stage")
+
+    # unchanged sources are read from the download cache instead of being downloaded again
+    DataExtractor.download_cache = DownloadCache(args.cache_dir, max_bytes=args.cache_size * 2**20)
+
+    # with --clean-cache, dim data already cleaned by the same code is read from the clean cache instead of being cleaned again
+    if args.clean_cache:
+        clean_cache = CleanedFrameCache(args.clean_cache_dir, max_bytes=args.clean_cache_size * 2**20)
+
+    # the output of the extract and clean stages is persisted, so a stage can be re-run without running the stages before it
+    if args.staging or args.from_stage or args.to_stage:
+        staging_area = StagingArea(args.staging_dir)
+
+    # the calls of every stage are measured and profiled
+    if args.metrics_json or args.metrics_textfile or args.profile:
+        pipeline_metrics = StageMetrics(profiler=args.profile, profile_directory=args.profile_dir)
 
-    print("Adding foreign keys to the orders_table table.")
-    alter_data_and_add_foreign_keys()
-    print("Finished adding foreign keys to orders_table table.")
\ No newline at end of file
+    print("Tables creation starting. This might take some time......")
+    pipeline = build_pipeline(incremental=args.incremental, compact_dtypes=args.compact_dtypes,
+                              from_stage=args.from_stage, to_stage=args.to_stage, deferred_fk_validation=args.deferred_fk_validation,
+                              clean_cache=clean_cache, pipeline_metrics=pipeline_metrics, staging_area=staging_area, download_cache=DataExtractor.download_cache)
+    try:
+        pipeline.run(max_workers=args.workers, executor=args.executor)
+    finally:
+        # the measurements of the finished tasks are written even if a task failed
+        if pipeline_metrics is not None:
+            for records in pipeline.results.values():
+                pipeline_metrics.add_records(records)
+            pipeline_metrics.print_summary()
+            if args.metrics_json:
+                pipeline_metrics.write_json(args.metrics_json, {'pools': EngineRegistry.pool_metrics()})
+            if args.metrics_textfile:
+                pipeline_metrics.write_textfile(args.metrics_textfile)
+    print("Finished creating tables and adding foreign keys to orders_table table.")
@@ -0,0 +1,55 @@
+from concurrent.futures import Executor, Future
+from typing import Callable
+import contextlib
+import contextvars
+
+class NetworkUsage:
+    """
+    This class attributes the bytes received over the network to the code that received them, e.g. to the measured calls of StageMetrics.
+    The counter is held in a context variable, so calls running at the same time in different threads each count their own bytes.
+    Work sent to a thread pool runs in a copy of the context of the code that sent it when it is submitted with submit.
+    """
+    _counter = contextvars.ContextVar('network_usage_counter', default=None)
+
+    @staticmethod
+    def count(size: int) -> None:
+        """
+        This method adds bytes received over the network to the counter of the current context, if any.
+
+        Args:
+            size (int): number of bytes received
+        """
+        counter = NetworkUsage._counter.get()
+        if counter is not None and size:
+            counter(size)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def counted_by(counter: Callable[[int], None]):
+        """
+        This method counts the bytes received by the code run inside the context with counter, instead of the counter of the outer context.
+
+        Args:
+            counter (Callable[[int], None]): called with the number of bytes every time bytes are received
+        """
+        token = NetworkUsage._counter.set(counter)
+        try:
+            yield
+        finally:
+            NetworkUsage._counter.reset(token)
+
+    @staticmethod
+    def submit(executor: Executor, func: Callable, *args, **kwargs) -> Future:
+        """
+        This method submits a function to a thread pool, running it in a copy of the current context so the bytes it receives are counted by the current counter.
+
+        Args:
+            executor (Executor): the thread pool
+            func (Callable): the function
+            *args: positional arguments of the function
+            **kwargs: keyword arguments of the function
+
+        Returns:
+            Future: the future of the call
+        """
+        return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
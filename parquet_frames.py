@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+import os
+import uuid
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+class ParquetFrames:
+    """
+    This class writes dataframes to Parquet files and reads them back exactly as they were written.
+    Parquet narrows some columns, e.g. object columns of floats are read back as float64 and their pd.NA as NaN, so the dtypes
+    and the missing value of every object column are recorded in a schema when a dataframe is written and restored when it is read.
+
+    Attributes:
+        OBJECT_VALUE_TYPES (tuple[str]): types of the values of object columns that can be restored, as returned by pd.api.types.infer_dtype
+        NULL_VALUES (dict): name to value of the missing values of object columns that can be restored
+    """
+    OBJECT_VALUE_TYPES = ('string', 'floating', 'integer', 'boolean', 'empty')
+    NULL_VALUES = {'None': None, 'nan': np.nan, 'NA': pd.NA, 'NaT': pd.NaT}
+
+    @staticmethod
+    def dtype_name(dtype) -> str:
+        """
+        This method returns the name of a dtype, including the storage of string dtypes so pyarrow and python strings are told apart.
+
+        Args:
+            dtype: dtype of a column
+
+        Returns:
+            str: name of the dtype accepted by astype
+        """
+        if isinstance(dtype, pd.StringDtype):
+            return f"string[{dtype.storage}]"
+        return str(dtype)
+
+    @staticmethod
+    def dtype_names(data: pd.DataFrame) -> dict[str, str]:
+        """
+        This method returns the names of the dtypes of the columns of a dataframe.
+
+        Args:
+            data (pd.DataFrame): dataframe
+
+        Returns:
+            dict[str, str]: column name to dtype name key value pairs
+        """
+        return {str(name): ParquetFrames.dtype_name(dtype) for name, dtype in data.dtypes.items()}
+
+    @staticmethod
+    def null_name(value) -> str:
+        """
+        This method returns the name of a missing value, one of the keys of NULL_VALUES.
+
+        Args:
+            value: missing value, e.g. None or pd.NA
+
+        Returns:
+            str: name of the missing value
+        """
+        if value is None:
+            return 'None'
+        if value is pd.NA:
+            return 'NA'
+        if value is pd.NaT:
+            return 'NaT'
+        return 'nan'
+
+    @staticmethod
+    def schema(data: pd.DataFrame) -> dict:
+        """
+        This method returns the schema a dataframe is restored with when it is read back from Parquet.
+
+        Args:
+            data (pd.DataFrame): dataframe to be written
+
+        Returns:
+            dict: the 'dtypes' of the columns and the 'nulls', the name of the missing value of every object column with missing values.
+                  None if an object column mixes types or missing values that can not be restored.
+        """
+        nulls = {}
+        for name, column in data.items():
+            if column.dtype != object:
+                continue
+
+            is_null = column.isna().to_numpy()
+            if pd.api.types.infer_dtype(column[~is_null], skipna=False) not in ParquetFrames.OBJECT_VALUE_TYPES:
+                return None
+
+            null_names = {ParquetFrames.null_name(value) for value in column[is_null]}
+            if len(null_names) > 1:
+                return None
+            if null_names:
+                nulls[str(name)] = null_names.pop()
+
+        return {'dtypes': ParquetFrames.dtype_names(data), 'nulls': nulls}
+
+    @staticmethod
+    def write(data: pd.DataFrame, filepath: str) -> dict:
+        """
+        This method writes a dataframe to a Parquet file. The file is replaced atomically, so it is never read before it is complete.
+
+        Args:
+            data (pd.DataFrame): dataframe to be written
+            filepath (str): path to the Parquet file
+
+        Returns:
+            dict: the schema to read the dataframe back with. None if the dataframe was not written because pyarrow is not installed
+                  or a column can not be restored from Parquet, e.g. a column mixing strings and numbers.
+        """
+        schema = ParquetFrames.schema(data) if pq is not None else None
+        if schema is None:
+            return None
+
+        temp_filepath = filepath + f".{uuid.uuid4().hex}.tmp"
+        try:
+            data.to_parquet(temp_filepath, engine='pyarrow')
+        except (ValueError, TypeError):
+            # pyarrow's conversion errors derive from ValueError and TypeError
+            if os.path.exists(temp_filepath):
+                os.remove(temp_filepath)
+            return None
+
+        os.replace(temp_filepath, filepath)
+        return schema
+
+    @staticmethod
+    def read(filepath: str, schema: dict) -> pd.DataFrame:
+        """
+        This method reads a dataframe from a memory-mapped Parquet file.
+
+        Args:
+            filepath (str): path to the Parquet file
+            schema (dict): the schema returned by write
+
+        Returns:
+            pd.DataFrame: the dataframe as it was written
+        """
+        # integers with missing values stay python integers, instead of floats which can not hold every 64 bit integer
+        data = pq.read_table(filepath, memory_map=True).to_pandas(integer_object_nulls=True)
+
+        for name, dtype in schema['dtypes'].items():
+            if ParquetFrames.dtype_name(data[name].dtype) != dtype:
+                data[name] = data[name].astype(dtype)
+
+        for name, null_name in schema['nulls'].items():
+            values = data[name].to_numpy(dtype=object, copy=True)
+            values[pd.isna(values)] = ParquetFrames.NULL_VALUES[null_name]
+            data[name] = pd.Series(values, index=data.index, dtype=object)
+
+        return data
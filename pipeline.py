@@ -0,0 +1,130 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Iterable
+import time
+
+def run_timed_task(func: Callable, kwargs: dict) -> tuple:
+    """
+    This method runs a task and returns how long it took and what it returned. It is module level, so it can be sent to a process pool.
+
+    Args:
+        func (Callable): the task
+        kwargs (dict): keyword arguments of the task
+
+    Returns:
+        tuple: wall time of the task in seconds, and the return value of the task
+    """
+    start = time.perf_counter()
+    result = func(**kwargs)
+    return time.perf_counter() - start, result
+
+class TaskGraph:
+    """
+    This class is a small task-graph scheduler. Tasks declare the tasks they depend on and every task whose dependencies have finished runs concurrently with the others in a pool of workers.
+
+    Attributes:
+        tasks (dict): task name to (task, dependencies, keyword arguments) of the added tasks
+        results (dict): task name to return value of the tasks finished by the last run
+    """
+    def __init__(self) -> None:
+        self.tasks = {}
+        self.results = {}
+
+    def add_task(self, name: str, func: Callable, dependencies: Iterable[str] = (), **kwargs) -> None:
+        """
+        This method adds a task to the graph.
+
+        Args:
+            name (str): unique name of the task
+            func (Callable): the task. it must be a module level function to run in a process pool.
+            dependencies (Iterable[str]): names of the tasks that have to finish before this task starts
+            **kwargs: keyword arguments the task is called with
+
+        Raises:
+            ValueError: raises ValueError if a task with the same name was already added.
+        """
+        if name in self.tasks:
+            raise ValueError(f"'{name}' task is already in the graph.")
+        self.tasks[name] = (func, list(dependencies), kwargs)
+
+    def validate(self) -> None:
+        """
+        This method checks that every dependency is a task of the graph and that the dependencies do not form a cycle.
+
+        Raises:
+            ValueError: raises ValueError if a dependency is unknown or the graph has a cycle.
+        """
+        for name, (_, dependencies, _) in self.tasks.items():
+            for dependency in dependencies:
+                if dependency not in self.tasks:
+                    raise ValueError(f"'{name}' task depends on unknown task '{dependency}'.")
+
+        # repeatedly remove the tasks whose dependencies have all been removed, a cycle is left over
+        remaining = {name: set(dependencies) for name, (_, dependencies, _) in self.tasks.items()}
+        while remaining:
+            ready = [name for name, dependencies in remaining.items() if not dependencies]
+            if not ready:
+                raise ValueError(f"tasks {sorted(remaining)} have cyclic dependencies.")
+            for name in ready:
+                del remaining[name]
+            for dependencies in remaining.values():
+                dependencies.difference_update(ready)
+
+    def run(self, max_workers: int = 4, executor: str = 'thread') -> dict[str, float]:
+        """
+        This method runs all the tasks of the graph, each as soon as its dependencies have finished, and prints the time of each task.
+        The return values of the tasks are kept in results, they have to be picklable to run the tasks in a process pool.
+        If a task fails, the tasks depending on it are not started, the running tasks are finished and the error is raised.
+
+        Args:
+            max_workers (int): maximum number of tasks running at the same time
+            executor (str): 'thread' runs the tasks in a thread pool, 'process' in a process pool
+
+        Returns:
+            dict[str, float]: task name to wall time in seconds of the finished tasks
+
+        Raises:
+            ValueError: raises ValueError if the graph is not valid or executor is unknown.
+        """
+        self.validate()
+        if executor == 'thread':
+            pool_class = ThreadPoolExecutor
+        elif executor == 'process':
+            pool_class = ProcessPoolExecutor
+        else:
+            raise ValueError("executor should be either 'thread' or 'process'.")
+
+        timings = {}
+        self.results = {}
+        pending = dict(self.tasks)
+        running = {}
+        error = None
+        start = time.perf_counter()
+
+        with pool_class(max_workers=max_workers) as pool:
+            while pending or running:
+                # start every pending task whose dependencies have finished
+                if error is None:
+                    for name, (func, dependencies, kwargs) in list(pending.items()):
+                        if all(dependency in timings for dependency in dependencies):
+                            print(f"Starting {name}.")
+                            running[pool.submit(run_timed_task, func, kwargs)] = name
+                            del pending[name]
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        timings[name], self.results[name] = future.result()
+                        print(f"Finished {name} in {timings[name]:.2f}s.")
+                    except Exception as e:
+                        print(f"{name} failed: {e}")
+                        error = error or e
+
+        print(f"Pipeline finished in {time.perf_counter() - start:.2f}s, sum of task times {sum(timings.values()):.2f}s.")
+        if error is not None:
+            raise error
+
+        return timings
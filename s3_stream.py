@@ -0,0 +1,98 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import deque
+from network_usage import NetworkUsage
+import io
+
+class S3RangeReader(io.RawIOBase):
+    """
+    This class is a read-only file-like stream of an s3 object, downloaded in parts with ranged GET requests sent in parallel.
+    The parts are read in order and only a few parts ahead of the reader are downloaded, so the memory used does not grow with the object.
+    Every part is requested with the ETag of the object, so the object changing during the download raises an error instead of mixing two versions.
+
+    Attributes:
+        size (int): size of the object in bytes
+        etag (str): ETag of the object when the stream was opened
+    """
+    def __init__(self, s3_client, bucket_name: str, key: str, part_size: int = 8 * 2**20, max_workers: int = 4) -> None:
+        """
+        Args:
+            s3_client: boto3 s3 client
+            bucket_name (str): name of the bucket
+            key (str): key of the object
+            part_size (int): size in bytes of each ranged GET
+            max_workers (int): number of parts downloaded at the same time
+        """
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.key = key
+
+        head = s3_client.head_object(Bucket=bucket_name, Key=key)
+        self.size = head['ContentLength']
+        self.etag = head['ETag']
+
+        self._ranges = iter([(first, min(first + part_size, self.size) - 1) for first in range(0, self.size, part_size)])
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = deque()
+        self._buffer = memoryview(b'')
+
+        # keep two parts per worker in flight, so a worker is never idle while the reader consumes a part
+        for _ in range(2 * max_workers):
+            self._submit_next_part()
+
+    def _submit_next_part(self) -> None:
+        """
+        This method starts the download of the next part of the object, if any is left.
+        """
+        byte_range = next(self._ranges, None)
+        if byte_range is not None:
+            self._pending.append(NetworkUsage.submit(self._executor, self._download_part, *byte_range))
+
+    def _download_part(self, first: int, last: int) -> bytes:
+        """
+        This method downloads a part of the object.
+
+        Args:
+            first (int): first byte of the part
+            last (int): last byte of the part, included
+
+        Returns:
+            bytes: the content of the part
+        """
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.key, Range=f'bytes={first}-{last}', IfMatch=self.etag)
+        NetworkUsage.count(response['ContentLength'])
+        return response['Body'].read()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        """
+        This method reads the next bytes of the object into buffer, waiting for the next part to be downloaded if needed.
+
+        Args:
+            buffer: writable buffer to read the bytes into
+
+        Returns:
+            int: number of bytes read, 0 at the end of the object
+        """
+        while not self._buffer:
+            if not self._pending:
+                return 0
+            future: Future = self._pending.popleft()
+            self._buffer = memoryview(future.result())
+            self._submit_next_part()
+
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self) -> None:
+        """
+        This method stops the downloads of the parts that have not started yet and closes the stream.
+        """
+        if not self.closed:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._pending.clear()
+        super().close()
@@ -0,0 +1,213 @@
+from database_utils import DatabaseConnector
+from staging import StagingArea
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.types import VARCHAR, Date, Float, SmallInteger, TypeEngine
+from typing import Iterable, Iterator, Union
+import pandas as pd
+import re
+import shutil
+import tempfile
+
+class SchemaFinaliser:
+    """
+    This class creates the tables of the sales_data database with their final column types before the data is loaded, so no table is rewritten by an ALTER after loading.
+    The lengths of the VARCHAR columns are measured on the dataframes. Chunks of a table are spooled to a temporary directory while they are measured, because the table is created before its first chunk is loaded.
+    A column is only created with its final type if all its values fit it, e.g. every value of a UUID column is a valid uuid. The other columns keep the type mapped from their dtype and are altered after loading by AlterDatabase.
+
+    Attributes:
+        FINAL_TYPES (dict[str, dict[str, str]]): table name to the final types of its columns. VARCHAR without a length is a VARCHAR as long as the longest value.
+        UUID_PATTERN (str): regular expression of the uuids created as UUID
+    """
+    FINAL_TYPES = {
+        'orders_table': {'date_uuid': 'UUID', 'user_uuid': 'UUID', 'card_number': 'VARCHAR', 'store_code': 'VARCHAR',
+                         'product_code': 'VARCHAR', 'product_quantity': 'SMALLINT'},
+        'dim_users': {'first_name': 'VARCHAR(255)', 'last_name': 'VARCHAR(255)', 'date_of_birth': 'DATE', 'country_code': 'VARCHAR',
+                      'user_uuid': 'UUID', 'join_date': 'DATE'},
+        'dim_store_details': {'longitude': 'FLOAT', 'locality': 'VARCHAR(255)', 'store_code': 'VARCHAR', 'staff_numbers': 'SMALLINT',
+                              'opening_date': 'DATE', 'store_type': 'VARCHAR(255)', 'latitude': 'FLOAT', 'country_code': 'VARCHAR',
+                              'continent': 'VARCHAR(255)'},
+        # the columns of dim_products as they are loaded, AlterDatabase.alter_products_table derives weight_class and still_available after loading
+        'dim_products': {'product_price(in £s)': 'FLOAT', 'weight(in kg)': 'FLOAT', 'EAN': 'VARCHAR', 'product_code': 'VARCHAR',
+                         'date_added': 'DATE', 'uuid': 'UUID'},
+        'dim_date_times': {'month': 'VARCHAR', 'year': 'VARCHAR', 'day': 'VARCHAR', 'time_period': 'VARCHAR', 'date_uuid': 'UUID',
+                           'datetime': 'DATE'},
+        'dim_card_details': {'card_number': 'VARCHAR', 'expiry_date': 'VARCHAR', 'date_payment_confirmed': 'DATE'},
+    }
+    UUID_PATTERN = r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+
+    @staticmethod
+    def varchar_length(sql_type: str) -> int:
+        """
+        This method returns the length of a VARCHAR type.
+
+        Args:
+            sql_type (str): final type of a column, e.g. 'VARCHAR(255)'
+
+        Returns:
+            int: the length of the VARCHAR, None if the type is not a VARCHAR with a length
+        """
+        match = re.fullmatch(r'VARCHAR\((\d+)\)', sql_type)
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def max_length(column: pd.Series) -> int:
+        """
+        This method returns the number of characters of the longest value of a column as it is written to the database.
+
+        Args:
+            column (pd.Series): column of a dataframe
+
+        Returns:
+            int: the length of the longest value, 0 if the column has no values
+        """
+        column = column.dropna()
+        if column.empty:
+            return 0
+        if pd.api.types.infer_dtype(column, skipna=False) != 'string':
+            column = column.astype(str)
+        return int(column.str.len().max())
+
+    @staticmethod
+    def fits(column: pd.Series, sql_type: str) -> bool:
+        """
+        This method checks that every value of a column can be loaded into a column of its final type.
+
+        Args:
+            column (pd.Series): column of a dataframe
+            sql_type (str): final type of the column
+
+        Returns:
+            bool: whether the column can be created with its final type
+        """
+        values = column.dropna()
+        if sql_type == 'UUID':
+            if pd.api.types.infer_dtype(values, skipna=False) not in ('string', 'empty'):
+                return False
+            return bool(values.astype(str).str.fullmatch(SchemaFinaliser.UUID_PATTERN).all())
+        if sql_type == 'SMALLINT':
+            return pd.api.types.is_integer_dtype(column) and (values.empty or (values.min() >= -2**15 and values.max() < 2**15))
+        if sql_type == 'DATE':
+            return pd.api.types.is_datetime64_dtype(column)
+        if sql_type == 'FLOAT':
+            if pd.api.types.is_bool_dtype(column):
+                return False
+            return pd.api.types.is_numeric_dtype(column) or pd.api.types.infer_dtype(values, skipna=False) in ('floating', 'integer', 'empty')
+        if SchemaFinaliser.varchar_length(sql_type) is not None:
+            return SchemaFinaliser.max_length(column) <= SchemaFinaliser.varchar_length(sql_type)
+        return True
+
+    @staticmethod
+    def measure(data: pd.DataFrame, final_types: dict[str, str], measurements: dict[str, dict]) -> None:
+        """
+        This method measures whether the columns of a dataframe fit their final types and the length of their longest values.
+        The measurements of the chunks of a table are combined, so a column fits only if it fits in every chunk.
+
+        Args:
+            data (pd.DataFrame): dataframe, or chunk of a table
+            final_types (dict[str, str]): column name to final type of the columns of the table
+            measurements (dict[str, dict]): column name to 'fits' and 'length' of the chunks measured so far, updated in place
+        """
+        for name, sql_type in final_types.items():
+            if name not in data:
+                continue
+            measurement = measurements.setdefault(name, {'fits': True, 'length': 0})
+            measurement['fits'] = measurement['fits'] and SchemaFinaliser.fits(data[name], sql_type)
+            if sql_type == 'VARCHAR':
+                measurement['length'] = max(measurement['length'], SchemaFinaliser.max_length(data[name]))
+
+    @staticmethod
+    def column_types(final_types: dict[str, str], measurements: dict[str, dict]) -> dict[str, TypeEngine]:
+        """
+        This method returns the SQLAlchemy types the columns that fit their final types are created with.
+
+        Args:
+            final_types (dict[str, str]): column name to final type of the columns of the table
+            measurements (dict[str, dict]): column name to 'fits' and 'length' returned by measure
+
+        Returns:
+            dict[str, TypeEngine]: column name to SQLAlchemy type key value pairs, passed to DataFrame.to_sql as dtype
+        """
+        column_types = {}
+        for name, measurement in measurements.items():
+            if not measurement['fits']:
+                continue
+
+            sql_type = final_types[name]
+            if sql_type == 'UUID':
+                column_types[name] = UUID(as_uuid=False)
+            elif sql_type == 'SMALLINT':
+                column_types[name] = SmallInteger()
+            elif sql_type == 'DATE':
+                column_types[name] = Date()
+            elif sql_type == 'FLOAT':
+                column_types[name] = Float()
+            elif sql_type == 'VARCHAR':
+                # a column without values has no length to measure
+                column_types[name] = VARCHAR(measurement['length'] or None)
+            else:
+                column_types[name] = VARCHAR(SchemaFinaliser.varchar_length(sql_type))
+
+        return column_types
+
+    @staticmethod
+    def finalise(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], table_name: str) -> tuple[Union[pd.DataFrame, Iterator[pd.DataFrame]], dict[str, TypeEngine]]:
+        """
+        This method measures the data of a table and returns the types its columns are created with.
+        An iterable of chunks is spooled to a temporary directory while it is measured and read back from it, the directory is removed once every chunk has been read.
+
+        Args:
+            data (Union[pd.DataFrame, Iterable[pd.DataFrame]]): dataframe, or iterable of dataframe chunks, of the table
+            table_name (str): name of the table
+
+        Returns:
+            tuple[Union[pd.DataFrame, Iterator[pd.DataFrame]], dict[str, TypeEngine]]: the data to be loaded, and the column name to SQLAlchemy type of the columns created with their final types
+        """
+        final_types = SchemaFinaliser.FINAL_TYPES.get(table_name, {})
+        measurements = {}
+
+        if isinstance(data, pd.DataFrame):
+            SchemaFinaliser.measure(data, final_types, measurements)
+            return data, SchemaFinaliser.column_types(final_types, measurements)
+
+        def measured_chunks() -> Iterator[pd.DataFrame]:
+            for chunk in data:
+                SchemaFinaliser.measure(chunk, final_types, measurements)
+                yield chunk
+
+        spool = StagingArea(tempfile.mkdtemp(prefix=f"{table_name}-"))
+        try:
+            spool.write(measured_chunks(), table_name, 'clean')
+        except BaseException:
+            shutil.rmtree(spool.directory, ignore_errors=True)
+            raise
+
+        return SchemaFinaliser.read_spool(spool, table_name), SchemaFinaliser.column_types(final_types, measurements)
+
+    @staticmethod
+    def read_spool(spool: StagingArea, table_name: str) -> Iterator[pd.DataFrame]:
+        """
+        This method reads the spooled chunks of a table and removes the spool directory once they have been read.
+
+        Args:
+            spool (StagingArea): temporary staging area the chunks were spooled to
+            table_name (str): name of the table
+
+        Yields:
+            pd.DataFrame: the next chunk
+        """
+        try:
+            yield from spool.read(table_name, 'clean')
+        finally:
+            shutil.rmtree(spool.directory, ignore_errors=True)
+
+    @staticmethod
+    def upload_to_db(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], table_name: str) -> None:
+        """
+        This method creates a table with the final types of its columns and loads the data into it with DatabaseConnector.upload_to_db.
+
+        Args:
+            data (Union[pd.DataFrame, Iterable[pd.DataFrame]]): dataframe, or iterable of dataframe chunks, to save in the database
+            table_name (str): the table name in the database where the data is to be saved
+        """
+        data, column_types = SchemaFinaliser.finalise(data, table_name)
+        DatabaseConnector.upload_to_db(data, table_name, dtype=column_types)
@@ -0,0 +1,415 @@
+from collections.abc import Iterator
+from network_usage import NetworkUsage
+from typing import Callable
+import pandas as pd
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+class StageMetrics:
+    """
+    This class measures the calls made by each stage of the pipeline for each table: wall time, CPU time, growth of the peak RSS, rows and memory of the dataframes in and out,
+    and bytes received over the network.
+    A call returning an iterator of chunks is measured every time a chunk is produced, so the time of a stage streaming its chunks into the next stage is not counted in the next stage.
+    Measured calls running inside another measured call, e.g. the extraction of the chunks an upload reads, are subtracted from the outer call.
+
+    CPU time is the CPU time of the calling thread, the work of the thread and process pools of a call is not counted. The peak RSS is the peak of the whole process,
+    so its growth is shared by the tables measured at the same time. The memory in and out is the memory of the dataframes passed in and out of a call, not the bytes transferred.
+    The network bytes are the HTTP response bodies and S3 objects received by the call, counted through NetworkUsage, including those received by the thread pools of the extractors.
+    Bytes read from the RDS database are not counted.
+
+    Attributes:
+        PROFILERS (tuple[str]): names of the profilers a stage can be profiled with
+        FIELDS (dict[str, str]): name to description of the measurements of every call
+        profiler (str): profiler every measured call is profiled with, None to not profile
+        profile_directory (str): directory the profiles are written to, one file per table, stage and call
+        records (dict): (table name, stage, call) to measurements key value pairs
+    """
+    PROFILERS = ('cprofile', 'pyinstrument')
+    FIELDS = {
+        'calls': 'number of calls, or of chunks produced',
+        'wall_seconds': 'wall time in seconds',
+        'cpu_seconds': 'CPU time of the calling thread in seconds',
+        'peak_rss_delta_bytes': 'growth of the peak resident set size of the process in bytes',
+        'rows_in': 'rows of the dataframes passed in',
+        'rows_out': 'rows of the dataframes returned',
+        'memory_in_bytes': 'memory of the dataframes passed in in bytes',
+        'memory_out_bytes': 'memory of the dataframes returned in bytes',
+        'network_in_bytes': 'bytes of the HTTP response bodies and S3 objects received',
+    }
+
+    def __init__(self, profiler: str = None, profile_directory: str = "profiles") -> None:
+        """
+        Args:
+            profiler (str): profiler every measured call is profiled with, one of PROFILERS. None to not profile
+            profile_directory (str): directory the profiles are written to
+
+        Raises:
+            ValueError: raises ValueError if the profiler is unknown.
+            ImportError: raises ImportError if the profiler is pyinstrument and it is not installed.
+        """
+        if profiler is not None and profiler not in StageMetrics.PROFILERS:
+            raise ValueError(f"profiler should be one of {StageMetrics.PROFILERS}.")
+        if profiler == 'pyinstrument' and pyinstrument is None:
+            raise ImportError("pyinstrument is not installed, install it with pip install pyinstrument")
+
+        self.profiler = profiler
+        self.profile_directory = profile_directory
+        self.records = {}
+        self.profiles = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def __getstate__(self) -> dict:
+        """
+        This method returns the state the measurements are pickled with, e.g. to send them to a process pool.
+        The lock, the thread local call stacks and the running profiles are not picklable and are left out.
+
+        Returns:
+            dict: attribute name to value key value pairs
+        """
+        with self.lock:
+            return {'profiler': self.profiler, 'profile_directory': self.profile_directory, 'records': {key: dict(record) for key, record in self.records.items()}}
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        This method restores pickled measurements without profiles, with a new lock and new thread local call stacks.
+
+        Args:
+            state (dict): attribute name to value key value pairs
+        """
+        self.__dict__.update(state)
+        self.profiles = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @staticmethod
+    def peak_rss() -> int:
+        """
+        This method returns the peak resident set size of the process.
+
+        Returns:
+            int: the peak resident set size in bytes, the current one if the platform does not report the peak
+        """
+        if resource is not None:
+            # ru_maxrss is in kilobytes on linux and in bytes on macOS
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return max_rss if sys.platform == 'darwin' else max_rss * 1024
+        if psutil is None:
+            return 0
+        # windows reports the peak working set
+        memory_info = psutil.Process().memory_info()
+        return getattr(memory_info, 'peak_wset', memory_info.rss)
+
+    @staticmethod
+    def frame_bytes(data: pd.DataFrame) -> int:
+        """
+        This method returns the memory of a dataframe, including the memory of the python objects of its object columns.
+
+        Args:
+            data (pd.DataFrame): dataframe
+
+        Returns:
+            int: memory of the dataframe in bytes
+        """
+        return int(data.memory_usage(index=True, deep=True).sum())
+
+    def record(self, key: tuple[str, str, str]) -> dict:
+        """
+        This method returns the measurements of a call, creating them on the first call.
+
+        Args:
+            key (tuple[str, str, str]): table name, stage and call
+
+        Returns:
+            dict: field name to measurement key value pairs
+        """
+        with self.lock:
+            if key not in self.records:
+                self.records[key] = dict.fromkeys(StageMetrics.FIELDS, 0)
+            return self.records[key]
+
+    def add(self, key: tuple[str, str, str], **measurements) -> None:
+        """
+        This method adds measurements to the measurements of a call.
+
+        Args:
+            key (tuple[str, str, str]): table name, stage and call
+            **measurements: field name to measurement to add
+        """
+        record = self.record(key)
+        with self.lock:
+            for field, value in measurements.items():
+                record[field] += value
+
+    def start_profile(self, key: tuple[str, str, str]) -> None:
+        """
+        This method starts or resumes profiling a call in the current thread.
+
+        Args:
+            key (tuple[str, str, str]): table name, stage and call
+        """
+        if self.profiler is None:
+            return
+        with self.lock:
+            if key not in self.profiles:
+                self.profiles[key] = cProfile.Profile() if self.profiler == 'cprofile' else pyinstrument.Profiler(async_mode='disabled')
+            profile = self.profiles[key]
+        if self.profiler == 'cprofile':
+            profile.enable()
+        else:
+            profile.start()
+
+    def stop_profile(self, key: tuple[str, str, str]) -> None:
+        """
+        This method pauses profiling a call in the current thread.
+
+        Args:
+            key (tuple[str, str, str]): table name, stage and call
+        """
+        if self.profiler is None:
+            return
+        if self.profiler == 'cprofile':
+            self.profiles[key].disable()
+        else:
+            self.profiles[key].stop()
+
+    @contextlib.contextmanager
+    def span(self, key: tuple[str, str, str]):
+        """
+        This method measures the code run inside the context as one call. The measurements of the calls measured inside it are subtracted.
+        Only one profiler can run in a thread, so the profile of the outer call is paused while an inner call is measured.
+        The bytes received over the network inside the context are counted for the call, those of an inner call are counted for the inner call only.
+
+        Args:
+            key (tuple[str, str, str]): table name, stage and call
+        """
+        stack = self.local.__dict__.setdefault('stack', [])
+        if stack:
+            self.stop_profile(stack[-1]['key'])
+
+        frame = {'key': key, 'wall': time.perf_counter(), 'cpu': time.thread_time(), 'rss': StageMetrics.peak_rss(),
+                 'inner_wall': 0.0, 'inner_cpu': 0.0, 'inner_rss': 0}
+        stack.append(frame)
+        self.start_profile(key)
+        try:
+            with NetworkUsage.counted_by(lambda size: self.add(key, network_in_bytes=size)):
+                yield
+        finally:
+            self.stop_profile(key)
+            stack.pop()
+            wall = time.perf_counter() - frame['wall']
+            cpu = time.thread_time() - frame['cpu']
+            rss = max(StageMetrics.peak_rss() - frame['rss'], 0)
+            self.add(key, calls=1, wall_seconds=wall - frame['inner_wall'], cpu_seconds=cpu - frame['inner_cpu'],
+                     peak_rss_delta_bytes=max(rss - frame['inner_rss'], 0))
+
+            if stack:
+                stack[-1]['inner_wall'] += wall
+                stack[-1]['inner_cpu'] += cpu
+                stack[-1]['inner_rss'] += rss
+                self.start_profile(stack[-1]['key'])
+
+    def count_chunks(self, key: tuple[str, str, str], chunks: Iterator[pd.DataFrame], direction: str) -> Iterator:
+        """
+        This method counts the rows and memory of the chunks of an iterator as they pass through it.
+
+        Args:
+            key (tuple[str, str, str]): table name, stage and call the chunks are passed in or out of
+            chunks (Iterator[pd.DataFrame]): iterator of dataframe chunks
+            direction (str): 'in' for chunks passed in to the call, 'out' for chunks produced by it
+
+        Yields:
+            pd.DataFrame: the next chunk
+        """
+        for chunk in chunks:
+            if isinstance(chunk, pd.DataFrame):
+                self.add(key, **{f'rows_{direction}': len(chunk), f'memory_{direction}_bytes': StageMetrics.frame_bytes(chunk)})
+            yield chunk
+
+    def measure_chunks(self, key: tuple[str, str, str], chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        This method measures the production of every chunk of an iterator as a call.
+
+        Args:
+            key (tuple[str, str, str]): table name, stage and call producing the chunks
+            chunks (Iterator[pd.DataFrame]): iterator of dataframe chunks
+
+        Yields:
+            pd.DataFrame: the next chunk
+        """
+        while True:
+            with self.span(key):
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+            yield chunk
+
+    def measure(self, table_name: str, stage: str, func: Callable) -> Callable:
+        """
+        This method returns a function measuring every call of func. Dataframes passed in and returned are counted, and so are the chunks of iterators
+        passed in or returned, as they are read.
+
+        Args:
+            table_name (str): name of the table the calls are made for
+            stage (str): stage of the pipeline the calls are made in, e.g. 'extract'
+            func (Callable): function to measure, e.g. DataCleaning.clean_card_data
+
+        Returns:
+            Callable: the measured function
+        """
+        key = (table_name, stage, getattr(func, '__qualname__', repr(func)))
+
+        def measured(*args, **kwargs):
+            arguments = []
+            for argument in args:
+                if isinstance(argument, pd.DataFrame):
+                    self.add(key, rows_in=len(argument), memory_in_bytes=StageMetrics.frame_bytes(argument))
+                elif isinstance(argument, Iterator):
+                    argument = self.count_chunks(key, argument, 'in')
+                arguments.append(argument)
+
+            with self.span(key):
+                result = func(*arguments, **kwargs)
+
+            if isinstance(result, pd.DataFrame):
+                self.add(key, rows_out=len(result), memory_out_bytes=StageMetrics.frame_bytes(result))
+            elif isinstance(result, Iterator):
+                result = self.count_chunks(key, self.measure_chunks(key, result), 'out')
+            return result
+
+        return measured
+
+    def pop_records(self, table_name: str) -> list[dict]:
+        """
+        This method removes the measurements of a table and returns them, and writes the profiles of its calls to profile_directory.
+        The measurements of a table created in a worker process are sent back to the main process this way.
+
+        Args:
+            table_name (str): name of the table
+
+        Returns:
+            list[dict]: the measurements of every call made for the table, with its 'table', 'stage' and 'call'
+        """
+        with self.lock:
+            keys = [key for key in self.records if key[0] == table_name]
+            records = [{'table': key[0], 'stage': key[1], 'call': key[2], **self.records.pop(key)} for key in keys]
+            profiles = {key: self.profiles.pop(key) for key in list(self.profiles) if key[0] == table_name}
+
+        if profiles:
+            os.makedirs(self.profile_directory, exist_ok=True)
+        for (table, stage, call), profile in profiles.items():
+            filepath = os.path.join(self.profile_directory, f"{table}.{stage}.{call.replace('<', '').replace('>', '')}")
+            if self.profiler == 'cprofile':
+                profile.dump_stats(filepath + ".prof")
+            else:
+                with open(filepath + ".html", "w") as file:
+                    file.write(profile.output_html())
+
+        return records
+
+    def add_records(self, records: list[dict]) -> None:
+        """
+        This method adds measurements returned by pop_records.
+
+        Args:
+            records (list[dict]): measurements of calls, with their 'table', 'stage' and 'call'
+        """
+        for record in records:
+            self.add((record['table'], record['stage'], record['call']), **{field: record[field] for field in StageMetrics.FIELDS})
+
+    def to_list(self) -> list[dict]:
+        """
+        This method returns the measurements of every call, ordered by table and stage.
+
+        Returns:
+            list[dict]: the measurements of every call, with its 'table', 'stage' and 'call'
+        """
+        with self.lock:
+            return [{'table': key[0], 'stage': key[1], 'call': key[2], **record} for key, record in sorted(self.records.items())]
+
+    def print_summary(self) -> None:
+        """
+        This method prints the wall time, CPU time, peak RSS growth, rows in and out and network bytes received of every table and stage.
+        """
+        totals = {}
+        for record in self.to_list():
+            total = totals.setdefault((record['table'], record['stage']), dict.fromkeys(StageMetrics.FIELDS, 0))
+            for field in StageMetrics.FIELDS:
+                total[field] += record[field]
+
+        for (table, stage), total in totals.items():
+            print(f"{table} {stage}: wall {total['wall_seconds']:.2f}s, cpu {total['cpu_seconds']:.2f}s, "
+                  f"peak rss +{total['peak_rss_delta_bytes'] / 2**20:.1f}MiB, rows in {total['rows_in']}, rows out {total['rows_out']}, "
+                  f"received {total['network_in_bytes'] / 2**20:.1f}MiB")
+
+    @staticmethod
+    def write_atomically(filepath: str, content: str) -> None:
+        """
+        This method writes a file through a temporary file, so it is never read before it is complete.
+
+        Args:
+            filepath (str): path to the file
+            content (str): content of the file
+        """
+        if os.path.dirname(filepath):
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        temp_filepath = filepath + f".{uuid.uuid4().hex}.tmp"
+        with open(temp_filepath, "w") as file:
+            file.write(content)
+        os.replace(temp_filepath, filepath)
+
+    def write_json(self, filepath: str, extra: dict = None) -> None:
+        """
+        This method writes the measurements of every call to a json file.
+
+        Args:
+            filepath (str): path to the json file
+            extra (dict): json serialisable values written with the measurements, e.g. the wall time of every task
+        """
+        content = {'created': time.time(), 'records': self.to_list(), **(extra or {})}
+        StageMetrics.write_atomically(filepath, json.dumps(content, indent=4))
+
+    def write_textfile(self, filepath: str, prefix: str = "retail_pipeline") -> None:
+        """
+        This method writes the measurements of every call in the Prometheus text format, for the textfile collector of the node exporter.
+
+        Args:
+            filepath (str): path to the textfile, it should end with .prom
+            prefix (str): prefix of the metric names
+        """
+        def label(value: str) -> str:
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        records = self.to_list()
+        lines = []
+        for field, description in StageMetrics.FIELDS.items():
+            name = f"{prefix}_{field}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} gauge")
+            for record in records:
+                labels = f'table="{label(record["table"])}",stage="{label(record["stage"])}",call="{label(record["call"])}"'
+                lines.append(f"{name}{{{labels}}} {record[field]}")
+
+        StageMetrics.write_atomically(filepath, "\n".join(lines) + "\n")
@@ -0,0 +1,145 @@
+from parquet_frames import ParquetFrames
+from typing import Iterable, Iterator, Union
+import pandas as pd
+import json
+import os
+import shutil
+import time
+import uuid
+
+class StagingArea:
+    """
+    This class persists the output of each stage of the pipeline, so a stage can be re-run from the output of the stage before it
+    instead of running the whole pipeline again, e.g. uploading the cleaned data again after a failed upload without extracting it again.
+    The output of a stage is stored as one Parquet file per chunk in a directory per table and stage, with a manifest of the chunks.
+    Chunks with columns Parquet can not store, e.g. mixing strings and numbers, are pickled instead.
+
+    Attributes:
+        STAGES (tuple[str]): stages of the pipeline in order, the output of each stage but the last is persisted
+        directory (str): directory holding the output of every table and stage
+    """
+    STAGES = ('extract', 'clean', 'load')
+
+    def __init__(self, directory: str = "staging") -> None:
+        """
+        Args:
+            directory (str): directory holding the output of every table and stage
+        """
+        self.directory = directory
+
+    def stage_directory(self, table_name: str, stage: str) -> str:
+        """
+        This method returns the directory holding the output of a stage of a table.
+
+        Args:
+            table_name (str): name of the table
+            stage (str): stage of the pipeline, one of STAGES
+
+        Returns:
+            str: path to the directory
+        """
+        return os.path.join(self.directory, table_name, stage)
+
+    def write(self, data: Union[pd.DataFrame, Iterable[pd.DataFrame]], table_name: str, stage: str, metadata: dict = None) -> None:
+        """
+        This method persists the output of a stage of a table, replacing its previous output once every chunk has been written.
+        Chunks are written as they are produced, so an iterable of chunks is never held in memory at once.
+
+        Args:
+            data (Union[pd.DataFrame, Iterable[pd.DataFrame]]): output of the stage, a dataframe or an iterable of dataframe chunks
+            table_name (str): name of the table
+            stage (str): stage of the pipeline, one of STAGES
+            metadata (dict): json serialisable values needed to re-run the next stage, e.g. the watermarks of an incremental extraction
+        """
+        stage_directory = self.stage_directory(table_name, stage)
+        temp_directory = stage_directory + f".{uuid.uuid4().hex}.tmp"
+        os.makedirs(temp_directory)
+
+        chunked = not isinstance(data, pd.DataFrame)
+        parts = []
+        for number, chunk in enumerate(data if chunked else [data]):
+            filename = f"part-{number:05d}.parquet"
+            schema = ParquetFrames.write(chunk, os.path.join(temp_directory, filename))
+            if schema is None:
+                filename = f"part-{number:05d}.pkl"
+                chunk.to_pickle(os.path.join(temp_directory, filename))
+            parts.append({'filename': filename, 'rows': len(chunk), 'schema': schema})
+
+        manifest = {'chunked': chunked, 'parts': parts, 'metadata': metadata or {}, 'created': time.time()}
+        with open(os.path.join(temp_directory, "manifest.json"), "w") as file:
+            json.dump(manifest, file, indent=4)
+
+        # the previous output is only replaced by a complete one
+        if os.path.exists(stage_directory):
+            shutil.rmtree(stage_directory)
+        os.replace(temp_directory, stage_directory)
+
+    def read_manifest(self, table_name: str, stage: str) -> dict:
+        """
+        This method reads the manifest of the output of a stage of a table.
+
+        Args:
+            table_name (str): name of the table
+            stage (str): stage of the pipeline, one of STAGES
+
+        Returns:
+            dict: the manifest with the 'chunked' flag, the 'parts' and the 'metadata' of the output
+
+        Raises:
+            FileNotFoundError: raises FileNotFoundError if the stage has not been persisted for the table
+        """
+        manifest_filepath = os.path.join(self.stage_directory(table_name, stage), "manifest.json")
+        if not os.path.exists(manifest_filepath):
+            raise FileNotFoundError(f"no {stage} output of {table_name} in {self.directory}, run the {stage} stage with staging first")
+
+        with open(manifest_filepath, "r") as file:
+            return json.load(file)
+
+    def read_metadata(self, table_name: str, stage: str) -> dict:
+        """
+        This method reads the metadata persisted with the output of a stage of a table.
+
+        Args:
+            table_name (str): name of the table
+            stage (str): stage of the pipeline, one of STAGES
+
+        Returns:
+            dict: the metadata passed to write
+        """
+        return self.read_manifest(table_name, stage)['metadata']
+
+    def read(self, table_name: str, stage: str) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+        """
+        This method reads the output of a stage of a table. The Parquet files are memory-mapped.
+
+        Args:
+            table_name (str): name of the table
+            stage (str): stage of the pipeline, one of STAGES
+
+        Returns:
+            Union[pd.DataFrame, Iterator[pd.DataFrame]]: the output as it was written, a dataframe or an iterator of dataframe chunks read one at a time
+        """
+        manifest = self.read_manifest(table_name, stage)
+        chunks = self.read_parts(self.stage_directory(table_name, stage), manifest['parts'])
+        if manifest['chunked']:
+            return chunks
+        return next(chunks)
+
+    @staticmethod
+    def read_parts(stage_directory: str, parts: list[dict]) -> Iterator[pd.DataFrame]:
+        """
+        This method reads the chunks of the output of a stage one at a time.
+
+        Args:
+            stage_directory (str): directory holding the output of the stage
+            parts (list[dict]): the parts of the manifest of the output
+
+        Yields:
+            pd.DataFrame: the next chunk
+        """
+        for part in parts:
+            filepath = os.path.join(stage_directory, part['filename'])
+            if filepath.endswith(".parquet"):
+                yield ParquetFrames.read(filepath, part['schema'])
+            else:
+                yield pd.read_pickle(filepath)
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+from typing import Callable
+
+# pandas string dtype used for vectorized string operations, backed by pyarrow when it is installed
+# and the pattern matching everything but letters and the digit and uppercase character classes in that dtype's regex engine
+try:
+    import pyarrow
+    STRING_DTYPE = 'string[pyarrow]'
+    NON_LETTER_PATTERN = r'\PL'
+    DIGIT_CLASS = r'\p{Nd}'
+    UPPERCASE_CLASS = r'\p{Lu}'
+except ImportError:
+    STRING_DTYPE = 'string'
+    NON_LETTER_PATTERN = r'[\W\d_]'
+    DIGIT_CLASS = r'\d'
+    UPPERCASE_CLASS = r'A-Z'
+
+class StringTransforms:
+    """
+    This class is a library of string transforms applied over a whole column at once with pandas .str operations,
+    which run in pyarrow compute kernels when pyarrow is installed, instead of calling a Python function on every value.
+    The transforms only rewrite the values that need it and return the column in its own dtype.
+    Categorical columns are transformed once per category instead of once per value.
+    """
+    @staticmethod
+    def as_strings(column: pd.Series) -> pd.Series:
+        """
+        This method converts a column to STRING_DTYPE for the vectorized string operations.
+
+        Args:
+            column (pd.Series): column of strings
+
+        Returns:
+            pd.Series: the column in STRING_DTYPE
+        """
+        if column.dtype == STRING_DTYPE:
+            return column
+
+        # building the arrow array directly is about twice as fast as astype, which first checks every value is a string
+        if STRING_DTYPE == 'string[pyarrow]' and column.dtype == object:
+            try:
+                strings = pyarrow.array(column.to_numpy(), type=pyarrow.string(), from_pandas=True)
+                return pd.Series(pd.arrays.ArrowStringArray(strings), index=column.index, name=column.name)
+            except (pyarrow.ArrowTypeError, pyarrow.ArrowInvalid):
+                # columns holding values other than strings are converted with astype, which converts them with str
+                pass
+
+        return column.astype(STRING_DTYPE)
+
+    @staticmethod
+    def transform_where(column: pd.Series, needs_transform: np.ndarray, transform: Callable[[pd.Series], pd.Series]) -> pd.Series:
+        """
+        This method applies a string transform only to the values that need it and copies the other values unchanged,
+        so the cost of the transform and of converting its results back to the column's dtype is only paid for the changed values.
+
+        Args:
+            column (pd.Series): column of strings
+            needs_transform (np.ndarray): boolean mask of the values to transform
+            transform (Callable[[pd.Series], pd.Series]): string transform applied to the masked values
+
+        Returns:
+            pd.Series: the column with the masked values transformed, in the column's dtype
+        """
+        transformed = column.copy()
+        if needs_transform.any():
+            transformed[needs_transform] = transform(column[needs_transform]).to_numpy(dtype=object)
+        return transformed
+
+    @staticmethod
+    def transform_categories(column: pd.Series, transform: Callable[[pd.Series], pd.Series]) -> pd.Series:
+        """
+        This method applies a transform to the categories of a categorical column and maps every value to its transformed category.
+
+        Args:
+            column (pd.Series): categorical column of strings
+            transform (Callable[[pd.Series], pd.Series]): transform of a column of strings, e.g. StringTransforms.keep_digits
+
+        Returns:
+            pd.Series: categorical column of the transformed strings, or a float column if the transform returns floats
+        """
+        transformed = transform(pd.Series(column.cat.categories.to_numpy(dtype=object)))
+        codes = column.cat.codes.to_numpy()
+
+        # transformed categories may be equal, e.g. "eeEurope" and "Europe", so they are deduplicated into new categories
+        if transformed.dtype == object:
+            new_codes, new_categories = pd.factorize(transformed)
+            values = pd.Categorical.from_codes(np.where(codes >= 0, new_codes[codes], -1), new_categories)
+        else:
+            values = pd.api.extensions.take(transformed.to_numpy(), codes, allow_fill=True)
+
+        return pd.Series(values, index=column.index, name=column.name)
+
+    @staticmethod
+    def keep_digits(column: pd.Series) -> pd.Series:
+        """
+        This method removes every character that is not a digit, e.g. "J78" becomes "78".
+
+        Args:
+            column (pd.Series): column of strings
+
+        Returns:
+            pd.Series: strings made of the digits only
+        """
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return StringTransforms.transform_categories(column, StringTransforms.keep_digits)
+
+        has_non_digit = (~StringTransforms.as_strings(column).str.isdecimal()).fillna(False).to_numpy(dtype=bool)
+        return StringTransforms.transform_where(column, has_non_digit, lambda strings: StringTransforms.as_strings(strings).str.replace(f'[^{DIGIT_CLASS}]', '', regex=True))
+
+    @staticmethod
+    def strip_before_uppercase(column: pd.Series) -> pd.Series:
+        """
+        This method removes the characters before the first uppercase character, e.g. "eeEurope" becomes "Europe".
+        Strings without an uppercase character become empty strings.
+
+        Args:
+            column (pd.Series): column of strings
+
+        Returns:
+            pd.Series: strings starting at their first uppercase character
+        """
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return StringTransforms.transform_categories(column, StringTransforms.strip_before_uppercase)
+
+        # pandas compiles contains patterns with Python's re, so the mask uses an ASCII pattern matching a superset of the values to transform
+        starts_with_other = StringTransforms.as_strings(column).str.contains('^[^A-Z]').fillna(False).to_numpy(dtype=bool)
+        return StringTransforms.transform_where(column, starts_with_other, lambda strings: StringTransforms.as_strings(strings).str.replace(f'^[^{UPPERCASE_CLASS}]*', '', regex=True))
+
+    @staticmethod
+    def fix_double_at(column: pd.Series) -> pd.Series:
+        """
+        This method removes the first '@' of the strings containing '@@', e.g. "name@@mail.com" becomes "name@mail.com".
+
+        Args:
+            column (pd.Series): column of email strings
+
+        Returns:
+            pd.Series: email strings with '@@' replaced by '@'
+        """
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return StringTransforms.transform_categories(column, StringTransforms.fix_double_at)
+
+        has_double_at = StringTransforms.as_strings(column).str.contains('@@', regex=False).fillna(False).to_numpy(dtype=bool)
+        return StringTransforms.transform_where(column, has_double_at, lambda strings: StringTransforms.as_strings(strings).str.replace('@', '', n=1, regex=False))
+
+    @staticmethod
+    def extract_price(column: pd.Series, currency: str = '£') -> pd.Series:
+        """
+        This method converts prices to floats by keeping only their digits and '.', e.g. "£39.99" becomes 39.99.
+
+        Args:
+            column (pd.Series): column of price strings
+            currency (str): currency symbol most prices start with
+
+        Returns:
+            pd.Series: prices as floats
+
+        Raises:
+            ValueError: raises ValueError if a price has no digits or more than one '.'.
+        """
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return StringTransforms.transform_categories(column, lambda categories: StringTransforms.extract_price(categories, currency))
+
+        # the currency symbol is removed with a fast literal replace, the regex only runs on the prices with other characters left
+        numbers = StringTransforms.as_strings(column).str.replace(currency, '', regex=False)
+        has_other = numbers.str.contains('[^0-9.]').fillna(False).to_numpy(dtype=bool)
+        numbers = StringTransforms.transform_where(numbers, has_other, lambda strings: strings.str.replace(f'[^{DIGIT_CLASS}.]', '', regex=True))
+        prices = numbers.astype('Float64')
+        return pd.Series(prices.to_numpy(dtype=float, na_value=np.nan), index=column.index, name=column.name)
+
+    @staticmethod
+    def zero_pad(column: pd.Series) -> pd.Series:
+        """
+        This method prefixes '0' to the strings shorter than two characters, e.g. the month "7" becomes "07".
+
+        Args:
+            column (pd.Series): column of one or two character strings
+
+        Returns:
+            pd.Series: strings with a leading '0' added to the one character strings
+        """
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return StringTransforms.transform_categories(column, StringTransforms.zero_pad)
+
+        is_short = (StringTransforms.as_strings(column).str.len() < 2).fillna(False).to_numpy(dtype=bool)
+        return StringTransforms.transform_where(column, is_short, lambda strings: '0' + strings)
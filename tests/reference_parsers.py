@@ -0,0 +1,78 @@
+import pandas as pd
+from typing import Union
+
+def staff_num_by_row(staff_num: str) -> str:
+    """
+    This method is the row by row staff number parser clean_store_data used before it was vectorized, kept as the reference for its results.
+    """
+    digit_only_lst = [char for char in staff_num if char.isdigit()]
+    return "".join(digit_only_lst)
+
+def continent_by_row(continent: str) -> str:
+    """
+    This method is the row by row continent parser clean_store_data used before it was vectorized, kept as the reference for its results.
+    """
+    is_char_upper_bool = False
+    continent_char_lst = []
+    for char in continent:
+        if char.isupper():
+            is_char_upper_bool = True
+        if is_char_upper_bool:
+            continent_char_lst.append(char)
+    return "".join(continent_char_lst)
+
+def email_by_row(email: str) -> str:
+    """
+    This method is the row by row email parser clean_user_data used before it was vectorized, kept as the reference for its results.
+    """
+    if '@@' not in email:
+        return email
+
+    email_char_list = list(email)
+    email_char_list.remove('@')
+    return ''.join(email_char_list)
+
+def price_by_row(product_price: str) -> float:
+    """
+    This method is the row by row price parser clean_products_data used before it was vectorized, kept as the reference for its results.
+    """
+    product_price_lst = [char for char in str(product_price) if char.isdigit() or char == '.']
+    return float(''.join(product_price_lst))
+
+def zero_pad_by_row(value: str) -> str:
+    """
+    This method is the row by row month and day padding clean_date_data used before it was vectorized, kept as the reference for its results.
+    """
+    return '0'+value if len(value) < 2 else value
+
+def weight_to_kg_by_row(weight: str) -> Union[float, pd.NA]:
+    """
+    This method is the row by row weight parser convert_product_weights used before it was vectorized, kept as the reference for its results.
+
+    Args:
+        weight (str): weight to convert to kg
+
+    Returns:
+        Union[float, pd.NA]: if weight can be converted returns float of conversion, else pd.NA
+    """
+    weight_value_lst = [char for char in str(weight) if char.isdigit() or char == '.' or char == 'x']
+    metric_lst = [char for char in str(weight) if char.isalpha() and char != 'x']
+
+    if 'x' in weight_value_lst:
+        idx_of_x = weight_value_lst.index('x')
+        first_weight_value = float(''.join(weight_value_lst[:idx_of_x]))
+        second_weight_value = float(''.join(weight_value_lst[idx_of_x + 1:]))
+        weight_value = first_weight_value * second_weight_value
+    else:
+        weight_value = float(''.join(weight_value_lst))
+        
+    metric = ''.join(metric_lst)
+
+    if metric == 'kg':
+        return weight_value
+    elif metric == 'g' or metric == 'ml':
+        return weight_value/1000
+    elif metric == 'oz':
+        return weight_value * 0.0283495
+    else:
+        return pd.NA
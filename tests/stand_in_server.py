@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+import json
+import threading
+import time
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    This class answers the requests of a StandInServer with the replies planned for their path, keeping the connections alive between requests.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        server = self.server
+        with server.lock:
+            attempt = server.attempts.get(self.path, 0)
+            server.attempts[self.path] = attempt + 1
+            server.requests.append((self.path, dict(self.headers), self.client_address, time.monotonic()))
+            replies = server.replies.get(self.path, [(200, 0)])
+            status, delay = replies[min(attempt, len(replies) - 1)]
+
+        time.sleep(delay)
+        body = json.dumps(server.bodies.get(self.path, {'path': self.path})).encode() if status == 200 else b'{}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client gave up on a delayed reply
+            return
+
+        with server.lock:
+            server.replied.append(self.path)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    This class is a local HTTP server standing in for a web API in the tests. Every request is answered on its own thread.
+
+    Attributes:
+        bodies (dict): path to the json body of its successful replies
+        replies (dict): path to the (status, delay in seconds) of its successive replies, the last one repeated. 200 without delay for the other paths
+        attempts (dict): path to the number of requests received for it
+        requests (list): (path, headers, client address, time) of every request received, in the order received
+        replied (list): paths of the replies sent, in the order they were sent
+    """
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.bodies = {}
+        self.replies = {}
+        self.attempts = {}
+        self.requests = []
+        self.replied = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+@contextmanager
+def stand_in_server() -> Iterator[StandInServer]:
+    """
+    This method runs a StandInServer on a free local port while the context is open.
+
+    Yields:
+        StandInServer: the running server
+    """
+    server = StandInServer()
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
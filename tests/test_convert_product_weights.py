@@ -0,0 +1,83 @@
+from data_cleaning import DataCleaning
+from tests.reference_parsers import weight_to_kg_by_row
+import pandas as pd
+import pytest
+
+# weights of the products data and their weight in kg
+WEIGHT_CASES = [
+    ('1.6kg', 1.6),
+    ('2kg', 2.0),
+    ('500g', 0.5),
+    ('77g .', 0.077),
+    ('500ml', 0.5),
+    ('1.5ml', 0.0015),
+    ('16oz', 16 * 0.0283495),
+    ('12 x 100g', 1.2),
+    ('3 x 2kg', 6.0),
+    ('8 x 150ml', 1.2),
+    ('2x5.5oz', 11 * 0.0283495),
+    ('100lb', pd.NA),
+    ('100 .', pd.NA),
+    ('2 x 100', pd.NA),
+]
+
+# weights the row by row converter could not convert either
+MALFORMED_WEIGHTS = ['3 x 2 x 1g', 'x', 'g', '1.2.3kg', '12 x g', 'x 100g']
+
+
+def products(weights: list) -> pd.DataFrame:
+    return pd.DataFrame({'product_name': [f'product {i}' for i in range(len(weights))], 'weight': weights}, index=range(10, 10 + len(weights)))
+
+
+@pytest.mark.parametrize('weight, expected', WEIGHT_CASES)
+def test_weight_is_converted_to_kg(weight, expected):
+    converted = DataCleaning.convert_product_weights(products([weight]))
+
+    if expected is pd.NA:
+        assert converted['weight(in kg)'].iloc[0] is pd.NA
+    else:
+        assert converted['weight(in kg)'].iloc[0] == pytest.approx(expected)
+
+
+def test_weights_match_the_row_by_row_converter():
+    weights = [weight for weight, _ in WEIGHT_CASES]
+    raw = products(weights)
+
+    converted = DataCleaning.convert_product_weights(raw)
+
+    expected = raw.copy()
+    expected['weight(in kg)'] = expected['weight'].apply(weight_to_kg_by_row)
+    del expected['weight']
+    pd.testing.assert_frame_equal(converted, expected)
+
+
+def test_known_units_give_a_float_column():
+    converted = DataCleaning.convert_product_weights(products(['1kg', '12 x 100g', '500ml', '16oz']))
+
+    assert converted['weight(in kg)'].dtype == float
+
+
+def test_missing_and_invalid_weights_are_removed():
+    raw = products(['1kg', None, '9GO5AWF6HC', '500g'])
+
+    converted = DataCleaning.convert_product_weights(raw)
+
+    assert converted.index.tolist() == [10, 13]
+    assert 'weight' not in converted.columns
+
+
+def test_data_is_not_changed_unless_handed_over():
+    raw = products(['1kg', None, '500g'])
+
+    DataCleaning.convert_product_weights(raw)
+
+    assert raw['weight'].tolist() == ['1kg', None, '500g']
+
+
+@pytest.mark.parametrize('weight', MALFORMED_WEIGHTS)
+def test_malformed_weight_raises_like_the_row_by_row_converter(weight):
+    with pytest.raises(ValueError):
+        weight_to_kg_by_row(weight)
+
+    with pytest.raises(ValueError, match='could not be converted to kg'):
+        DataCleaning.convert_product_weights(products(['1kg', weight]))
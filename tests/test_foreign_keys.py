@@ -0,0 +1,60 @@
+from alter_data_types import AlterDatabase
+from database_utils import DatabaseConnector
+from sqlalchemy import text
+import pandas as pd
+import pytest
+import os
+
+# the tests replace the dim tables and orders_table, so they only run against a scratch database, e.g. postgresql+psycopg2://postgres@localhost:5432/sales_data_test
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+pytestmark = pytest.mark.skipif(TEST_DATABASE_URL is None, reason="TEST_DATABASE_URL is not set")
+
+
+@pytest.fixture
+def local_engine(monkeypatch):
+    monkeypatch.setitem(DatabaseConnector.local_db_urls, "config/local_db_creds.yaml", TEST_DATABASE_URL)
+    engine = DatabaseConnector.init_local_db_engine()
+    with engine.begin() as conn:
+        for table_name in ['orders_table'] + [fk_table_name for fk_table_name, _, _ in AlterDatabase.FOREIGN_KEYS]:
+            conn.execute(text(f"drop table if exists {table_name} cascade"))
+    return engine
+
+
+def load_tables():
+    """
+    This method loads the dim tables and orders_table the way the pipeline does, replacing the tables of the previous load.
+    """
+    for fk_table_name, _, column_name in AlterDatabase.FOREIGN_KEYS:
+        DatabaseConnector.upload_to_db(pd.DataFrame({column_name: ['a', 'b']}), fk_table_name)
+
+    orders = {'index': [0, 1]}
+    orders.update({column_name: ['a', 'b'] for _, _, column_name in AlterDatabase.FOREIGN_KEYS})
+    DatabaseConnector.upload_to_db(pd.DataFrame(orders), 'orders_table')
+
+
+def valid_foreign_keys(engine) -> set[str]:
+    with engine.connect() as conn:
+        results = conn.execute(text("select conname from pg_constraint where conrelid = 'orders_table'::regclass and contype = 'f' and convalidated"))
+        return {constraint_name for constraint_name, in results}
+
+
+@pytest.mark.parametrize('deferred_validation', [False, True])
+def test_tables_are_reloaded_on_a_second_run(local_engine, deferred_validation):
+    database_alterer = AlterDatabase()
+    for _ in range(2):
+        database_alterer.drop_foreign_keys()
+        load_tables()
+        database_alterer.add_foreign_keys(deferred_validation=deferred_validation)
+
+    assert valid_foreign_keys(local_engine) == {constraint_name for _, constraint_name, _ in AlterDatabase.FOREIGN_KEYS}
+
+
+@pytest.mark.parametrize('deferred_validation', [False, True])
+def test_existing_foreign_keys_are_not_added_again(local_engine, deferred_validation):
+    database_alterer = AlterDatabase()
+    load_tables()
+    database_alterer.add_foreign_keys(deferred_validation=deferred_validation)
+    database_alterer.add_foreign_keys(deferred_validation=deferred_validation)
+
+    assert valid_foreign_keys(local_engine) == {constraint_name for _, constraint_name, _ in AlterDatabase.FOREIGN_KEYS}
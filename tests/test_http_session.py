@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+from http_session import HttpSession
+from tests.stand_in_server import stand_in_server
+import pytest
+import time
+
+
+@pytest.fixture
+def server():
+    with stand_in_server() as server:
+        yield server
+
+
+def test_connection_is_reused_between_requests(server):
+    session = HttpSession()
+
+    for call in range(5):
+        assert session.get(f'{server.url}/stores/{call}').status_code == 200
+
+    assert session.connection_stats() == {'opened': 1, 'requests': 5, 'reused': 4}
+    assert len({client_address for _, _, client_address, _ in server.requests}) == 1
+
+
+def test_concurrent_requests_open_at_most_one_connection_per_worker(server):
+    session = HttpSession(pool_maxsize=4)
+    server.replies = {f'/stores/{call}': [(200, 0.05)] for call in range(16)}
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda call: session.get(f'{server.url}/stores/{call}'), range(16)))
+
+    stats = session.connection_stats()
+    assert stats['requests'] == 16
+    assert stats['opened'] <= 4
+    assert len({client_address for _, _, client_address, _ in server.requests}) == stats['opened']
+
+
+def test_requests_to_a_host_are_spaced_by_the_rate_limit(server):
+    session = HttpSession(requests_per_second=20)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda call: session.get(f'{server.url}/stores/{call}'), range(8)))
+    elapsed = time.monotonic() - start
+
+    # the first request is sent at once and the other 7 each wait for their slot
+    assert elapsed >= 7 * session.min_interval
+    received = sorted(request_time for _, _, _, request_time in server.requests)
+    gaps = [later - earlier for earlier, later in zip(received, received[1:])]
+    assert min(gaps) >= session.min_interval / 2
+
+
+def test_rate_limit_is_per_host(server):
+    session = HttpSession(requests_per_second=2)
+    port = server.server_address[1]
+
+    start = time.monotonic()
+    session.get(f'http://127.0.0.1:{port}/stores/0')
+    session.get(f'http://localhost:{port}/stores/0')
+
+    assert time.monotonic() - start < session.min_interval
+
+
+def test_requests_are_not_spaced_without_a_rate_limit(server):
+    session = HttpSession()
+
+    start = time.monotonic()
+    for call in range(10):
+        session.get(f'{server.url}/stores/{call}')
+
+    assert time.monotonic() - start < 1
+
+
+def test_connections_of_dropped_pools_are_still_counted(server):
+    # one pool is kept, so alternating between two hosts drops the pool of the other host every time
+    session = HttpSession(pool_connections=1)
+    port = server.server_address[1]
+
+    for call in range(3):
+        session.get(f'http://127.0.0.1:{port}/stores/{call}')
+        session.get(f'http://localhost:{port}/stores/{call}')
+
+    stats = session.connection_stats()
+    assert stats['requests'] == 6
+    assert stats['opened'] == 6
+    assert stats['reused'] == 0
+
+
+def test_bytes_of_the_bodies_are_counted(server):
+    session = HttpSession()
+    server.bodies['/stores/0'] = {'store_code': 'ST-000'}
+
+    body = session.get(f'{server.url}/stores/0').content
+    session.get(f'{server.url}/stores/0', stream=True).close()
+
+    assert session.bytes_received == len(body)
@@ -0,0 +1,68 @@
+from database_utils import DatabaseConnector
+from sqlalchemy import text
+import pandas as pd
+import pytest
+import os
+
+# the tests replace the merge_test table, so they only run against a scratch database, e.g. postgresql+psycopg2://postgres@localhost:5432/sales_data_test
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+pytestmark = pytest.mark.skipif(TEST_DATABASE_URL is None, reason="TEST_DATABASE_URL is not set")
+
+
+@pytest.fixture
+def local_engine(monkeypatch):
+    monkeypatch.setitem(DatabaseConnector.local_db_urls, "config/local_db_creds.yaml", TEST_DATABASE_URL)
+    engine = DatabaseConnector.init_local_db_engine()
+    with engine.begin() as conn:
+        conn.execute(text("drop table if exists merge_test"))
+        conn.execute(text("create table merge_test (index bigint primary key, date_uuid uuid, card_number varchar(4))"))
+        conn.execute(text("insert into merge_test values (0, '00000000-0000-0000-0000-000000000000', '1234')"))
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(text("drop table if exists merge_test"))
+
+
+def read_table(engine) -> pd.DataFrame:
+    with engine.connect() as conn:
+        return pd.read_sql("select index, cast(date_uuid as text) as date_uuid, card_number from merge_test order by index", conn)
+
+
+def test_longer_values_widen_the_column(local_engine):
+    chunk = pd.DataFrame({'index': [1], 'date_uuid': ['11111111-1111-1111-1111-111111111111'], 'card_number': ['1234567890123456']})
+
+    DatabaseConnector.merge_into_db(chunk, 'merge_test', 'date_uuid')
+
+    assert read_table(local_engine)['card_number'].tolist() == ['1234', '1234567890123456']
+    with local_engine.connect() as conn:
+        column_type = conn.execute(text("select format_type(atttypid, atttypmod) from pg_attribute where attrelid = 'merge_test'::regclass and attname = 'card_number'")).scalar()
+    assert column_type == 'character varying(16)'
+
+
+def test_longer_values_in_a_later_chunk_widen_the_column_again(local_engine):
+    chunks = [pd.DataFrame({'index': [index], 'date_uuid': [f'{index}' * 8 + '-1111-1111-1111-111111111111'], 'card_number': [card_number]})
+              for index, card_number in [(1, '12345'), (2, '1234567')]]
+
+    DatabaseConnector.merge_into_db(chunks, 'merge_test', 'date_uuid')
+
+    assert read_table(local_engine)['card_number'].tolist() == ['1234', '12345', '1234567']
+
+
+def test_repeated_key_keeps_the_last_row_when_updating(local_engine):
+    date_uuid = '22222222-2222-2222-2222-222222222222'
+    chunk = pd.DataFrame({'index': [1, 2], 'date_uuid': [date_uuid, date_uuid], 'card_number': ['1111', '2222']})
+
+    DatabaseConnector.merge_into_db(chunk, 'merge_test', 'date_uuid')
+
+    merged = read_table(local_engine)
+    assert merged[merged['date_uuid'] == date_uuid][['index', 'card_number']].values.tolist() == [[2, '2222']]
+
+
+def test_repeated_key_keeps_the_first_row_when_not_updating(local_engine):
+    date_uuid = '22222222-2222-2222-2222-222222222222'
+    chunk = pd.DataFrame({'index': [1, 2], 'date_uuid': [date_uuid, date_uuid], 'card_number': ['1111', '2222']})
+
+    DatabaseConnector.merge_into_db(chunk, 'merge_test', 'date_uuid', update_existing=False)
+
+    merged = read_table(local_engine)
+    assert merged[merged['date_uuid'] == date_uuid][['index', 'card_number']].values.tolist() == [[1, '1111']]
@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor
+from data_extraction import DataExtractor
+from download_cache import DownloadCache
+from http_session import HttpSession
+from stage_metrics import StageMetrics
+from tests.stand_in_server import stand_in_server
+import boto3
+import json
+import pandas as pd
+import pytest
+
+moto = pytest.importorskip('moto')
+
+BUCKET_NAME = 'data-handling-test'
+NUM_OF_STORES = 8
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(DataExtractor, 'http_session', HttpSession(backoff=0))
+    with stand_in_server() as server:
+        for store_idx in range(NUM_OF_STORES):
+            server.bodies[f'/store_details/{store_idx}'] = {'index': store_idx, 'store_code': f'ST-{store_idx:03d}'}
+            server.bodies[f'/other_store_details/{store_idx}'] = {'index': store_idx, 'store_code': f'OTHER-STORE-{store_idx:03d}', 'extra': 'x' * 100}
+        yield server
+
+
+def body_bytes(server, prefix: str) -> int:
+    return sum(len(json.dumps(body).encode()) for path, body in server.bodies.items() if path.startswith(prefix))
+
+
+def record(metrics: StageMetrics, table_name: str) -> dict:
+    records = [record for record in metrics.to_list() if record['table'] == table_name]
+    assert len(records) == 1
+    return records[0]
+
+
+def test_bytes_received_by_the_thread_pool_of_a_call_are_counted(server):
+    metrics = StageMetrics()
+
+    stores = metrics.measure('dim_store_details', 'extract', DataExtractor.retrieve_stores_data)(f'{server.url}/store_details', NUM_OF_STORES, headers={}, max_workers=4)
+
+    measured = record(metrics, 'dim_store_details')
+    assert measured['network_in_bytes'] == body_bytes(server, '/store_details/')
+    assert measured['network_in_bytes'] == DataExtractor.http_session.bytes_received
+    assert measured['memory_out_bytes'] == StageMetrics.frame_bytes(stores)
+
+
+def test_calls_running_at_the_same_time_count_their_own_bytes(server):
+    metrics = StageMetrics()
+    server.replies = {f'/{prefix}/{store_idx}': [(200, 0.02)] for prefix in ('store_details', 'other_store_details') for store_idx in range(NUM_OF_STORES)}
+
+    def extract(table_name: str, path: str):
+        return metrics.measure(table_name, 'extract', DataExtractor.retrieve_stores_data)(f'{server.url}/{path}', NUM_OF_STORES, headers={}, max_workers=2)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(extract, ['dim_store_details', 'other_stores'], ['store_details', 'other_store_details']))
+
+    assert record(metrics, 'dim_store_details')['network_in_bytes'] == body_bytes(server, '/store_details/')
+    assert record(metrics, 'other_stores')['network_in_bytes'] == body_bytes(server, '/other_store_details/')
+
+
+def test_bytes_of_an_inner_call_are_counted_for_the_inner_call_only(server):
+    metrics = StageMetrics()
+    retrieve_store = metrics.measure('dim_store_details', 'extract', DataExtractor.retrieve_store_data)
+
+    def retrieve_two_stores():
+        retrieve_store(f'{server.url}/store_details', 0, headers={})
+        return DataExtractor.http_session.get(f'{server.url}/store_details/1').json()
+
+    metrics.measure('dim_store_details', 'load', retrieve_two_stores)()
+
+    measured = {record['stage']: record['network_in_bytes'] for record in metrics.to_list()}
+    assert measured == {'extract': len(json.dumps(server.bodies['/store_details/0']).encode()), 'load': len(json.dumps(server.bodies['/store_details/1']).encode())}
+
+
+def test_streamed_downloads_are_counted(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(DataExtractor, 'download_cache', DownloadCache(str(tmp_path / 'downloads')))
+    server.bodies['/date_details.json'] = {'timestamp': {str(row): '22:00:06' for row in range(100)}, 'month': {str(row): '9' for row in range(100)}}
+    metrics = StageMetrics()
+
+    metrics.measure('dim_date_times', 'extract', DataExtractor.retrieve_date_events_data)(f'{server.url}/date_details.json')
+
+    assert record(metrics, 'dim_date_times')['network_in_bytes'] == len(json.dumps(server.bodies['/date_details.json']).encode())
+    assert DataExtractor.http_session.bytes_received == record(metrics, 'dim_date_times')['network_in_bytes']
+
+
+@pytest.fixture
+def products(monkeypatch, tmp_path):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setattr(DataExtractor, 'download_cache', DownloadCache(str(tmp_path / 'downloads')))
+    with moto.mock_aws():
+        s3_client = boto3.client('s3')
+        s3_client.create_bucket(Bucket=BUCKET_NAME)
+        content = pd.DataFrame({'product_name': [f'product {i}' for i in range(500)], 'weight': [f'{i}g' for i in range(500)]}).to_csv(index=False).encode()
+        s3_client.put_object(Bucket=BUCKET_NAME, Key='products.csv', Body=content)
+        yield content
+
+
+@pytest.mark.parametrize('stream, max_workers', [(False, 1), (True, 1), (True, 4)])
+def test_size_of_the_s3_object_is_counted(products, stream, max_workers):
+    metrics = StageMetrics()
+
+    extracted = metrics.measure('dim_products', 'extract', DataExtractor.extract_from_s3)(f's3://{BUCKET_NAME}/products.csv', stream=stream, max_workers=max_workers, part_size=1000)
+
+    measured = record(metrics, 'dim_products')
+    assert measured['network_in_bytes'] == len(products)
+    assert measured['memory_out_bytes'] == StageMetrics.frame_bytes(extracted)
+
+
+def test_unchanged_s3_object_read_from_the_download_cache_is_not_counted(products):
+    DataExtractor.extract_from_s3(f's3://{BUCKET_NAME}/products.csv')
+    metrics = StageMetrics()
+
+    metrics.measure('dim_products', 'extract', DataExtractor.extract_from_s3)(f's3://{BUCKET_NAME}/products.csv')
+
+    assert record(metrics, 'dim_products')['network_in_bytes'] == 0
+
+
+def test_chunks_streamed_from_s3_are_counted_for_the_extraction(products):
+    metrics = StageMetrics()
+    chunks = metrics.measure('dim_products', 'extract', DataExtractor.extract_from_s3)(f's3://{BUCKET_NAME}/products.csv', stream=True, chunksize=100, max_workers=4, part_size=1000)
+
+    metrics.measure('dim_products', 'clean', lambda chunks: [len(chunk) for chunk in chunks])(chunks)
+
+    measured = {record['stage']: record for record in metrics.to_list()}
+    assert measured['extract']['network_in_bytes'] == len(products)
+    assert measured['clean']['network_in_bytes'] == 0
+    assert measured['clean']['memory_in_bytes'] == measured['extract']['memory_out_bytes'] > 0
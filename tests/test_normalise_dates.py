@@ -0,0 +1,80 @@
+from data_cleaning import DataCleaning
+from string_transforms import STRING_DTYPE
+import numpy as np
+import pandas as pd
+import pytest
+
+# date strings of the sources and the dates custom_date_parser gives them
+DATE_CASES = [
+    ('2005-07-21', '2005-07-21'),
+    ('2005/07/21', '2005-07-21'),
+    ('2005/7/1', '2005-7-1'),
+    ('July 2005 21', '2005-07-21'),
+    ('2005 July 21', '2005-07-21'),
+    ('21 July 2005', '2005-07-21'),
+    ('March  2001  03', '2001-03-03'),
+    ('October 1999 05 extra', '1999-10-05'),
+    ('2005-07-21-extra', '2005-07-21-extra'),
+    ('July 2005', pd.NaT),
+    ('june 2001 03', pd.NaT),
+    ('2005-7-21', pd.NaT),
+    ('05-07-2005', pd.NaT),
+    ('garbage', pd.NaT),
+    ('NULL', pd.NaT),
+    ('1 2', pd.NaT),
+    ('', pd.NaT),
+]
+
+
+@pytest.mark.parametrize('date, expected', DATE_CASES)
+def test_date_is_normalised(date, expected):
+    normalised = DataCleaning.normalise_dates(pd.Series([date]))
+
+    if expected is pd.NaT:
+        assert normalised[0] is pd.NaT
+    else:
+        assert normalised[0] == expected
+
+
+@pytest.mark.parametrize('date, expected', DATE_CASES)
+def test_date_matches_custom_date_parser(date, expected):
+    parsed = DataCleaning.custom_date_parser(date)
+
+    # custom_date_parser returns None for the invalid dates with a '-' and pd.NaT for the other invalid dates
+    if expected is pd.NaT:
+        assert parsed is None or parsed is pd.NaT
+    else:
+        assert parsed == expected
+
+
+@pytest.mark.parametrize('dtype', [object, STRING_DTYPE])
+def test_mixed_formats_in_one_column(dtype):
+    dates = pd.Series([date for date, _ in DATE_CASES], index=range(100, 100 + len(DATE_CASES)), name='date_added', dtype=dtype)
+
+    normalised = DataCleaning.normalise_dates(dates)
+
+    pd.testing.assert_series_equal(normalised, pd.Series([expected for _, expected in DATE_CASES], index=dates.index, name='date_added', dtype=object))
+
+
+def test_column_matches_custom_date_parser():
+    dates = pd.Series([date for date, _ in DATE_CASES] * 3)
+    parsed_by_row = dates.apply(DataCleaning.custom_date_parser)
+
+    pd.testing.assert_series_equal(DataCleaning.normalise_dates(dates), parsed_by_row.where(parsed_by_row.notna(), pd.NaT))
+
+
+def test_missing_dates_are_nat():
+    normalised = DataCleaning.normalise_dates(pd.Series(['2005-07-21', None, np.nan]))
+
+    assert normalised.tolist()[0] == '2005-07-21'
+    assert normalised[1] is pd.NaT
+    assert normalised[2] is pd.NaT
+
+
+def test_index_is_kept():
+    dates = pd.Series(['July 2005 21', '2005/07/21', 'garbage'], index=[7, 3, 5])
+
+    normalised = DataCleaning.normalise_dates(dates)
+
+    assert normalised.index.tolist() == [7, 3, 5]
+    assert normalised.tolist()[:2] == ['2005-07-21', '2005-07-21']
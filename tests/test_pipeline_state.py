@@ -0,0 +1,70 @@
+from clean_cache import CleanedFrameCache
+from data_extraction import DataExtractor
+from download_cache import DownloadCache
+from pipeline import run_timed_task
+from stage_metrics import StageMetrics
+from staging import StagingArea
+import main
+import concurrent.futures
+import functools
+import multiprocessing
+import pickle
+import pytest
+
+
+def count_rows(rows: int) -> int:
+    return rows
+
+
+def check_pipeline_state(directory: str) -> None:
+    # runs in a worker process, which has imported main without running it as a script
+    assert main.clean_cache.directory == f'{directory}/cleaned'
+    assert main.staging_area.directory == f'{directory}/staging'
+    assert DataExtractor.download_cache.directory == f'{directory}/downloads'
+    main.measured('dim_products', 'extract', count_rows)(3)
+
+
+@pytest.fixture
+def state(tmp_path):
+    return {
+        'clean_cache': CleanedFrameCache(f'{tmp_path}/cleaned'),
+        'pipeline_metrics': StageMetrics(),
+        'staging_area': StagingArea(f'{tmp_path}/staging'),
+        'download_cache': DownloadCache(f'{tmp_path}/downloads'),
+    }
+
+
+@pytest.mark.parametrize('start_method', [method for method in ('spawn', 'forkserver') if method in multiprocessing.get_all_start_methods()])
+def test_tasks_run_with_the_pipeline_state_in_a_process_pool(state, tmp_path, start_method):
+    task = functools.partial(main.run_measured_task, check_pipeline_state, 'dim_products', state)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context(start_method)) as pool:
+        _, records = pool.submit(run_timed_task, task, {'directory': str(tmp_path)}).result()
+
+    assert [(record['table'], record['stage'], record['call'], record['calls']) for record in records] == [('dim_products', 'extract', 'count_rows', 1)]
+
+
+def test_build_pipeline_passes_the_state_to_every_task(state):
+    graph = main.build_pipeline(**state)
+
+    for name, (func, _, _) in graph.tasks.items():
+        assert func.args[2] == state, name
+
+
+def test_build_pipeline_uses_the_download_cache_of_the_extractor_by_default():
+    graph = main.build_pipeline()
+
+    _, (func, _, _) = next(iter(graph.tasks.items()))
+    assert func.args[2]['download_cache'] is DataExtractor.download_cache
+
+
+def test_caches_and_measurements_can_be_pickled(state):
+    state['pipeline_metrics'].measure('dim_products', 'extract', count_rows)(3)
+
+    copied = pickle.loads(pickle.dumps(state))
+
+    assert copied['clean_cache'].directory == state['clean_cache'].directory
+    assert copied['download_cache'].max_bytes == state['download_cache'].max_bytes
+    assert copied['pipeline_metrics'].to_list() == state['pipeline_metrics'].to_list()
+    copied['pipeline_metrics'].measure('dim_products', 'extract', count_rows)(3)
+    assert copied['pipeline_metrics'].to_list()[0]['calls'] == 2
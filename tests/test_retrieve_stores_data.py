@@ -0,0 +1,104 @@
+from data_extraction import DataExtractor
+from http_session import HttpSession
+from tests.stand_in_server import stand_in_server
+import pytest
+import requests
+
+NUM_OF_STORES = 12
+HEADERS = {'x-api-key': 'test-key'}
+
+
+@pytest.fixture
+def server():
+    with stand_in_server() as server:
+        for store_idx in range(NUM_OF_STORES):
+            server.bodies[f'/store_details/{store_idx}'] = {'index': store_idx, 'store_code': f'ST-{store_idx:03d}', 'staff_numbers': str(store_idx * 3)}
+        server.bodies['/number_stores'] = {'statusCode': 200, 'number_stores': NUM_OF_STORES}
+        yield server
+
+
+def use_session(monkeypatch, **kwargs) -> HttpSession:
+    session = HttpSession(backoff=0, **kwargs)
+    monkeypatch.setattr(DataExtractor, 'http_session', session)
+    return session
+
+
+def test_number_of_stores_is_read(server, monkeypatch):
+    use_session(monkeypatch)
+
+    assert DataExtractor.list_number_of_stores(f'{server.url}/number_stores', headers=HEADERS) == NUM_OF_STORES
+
+
+def test_rows_are_in_store_order_when_replies_arrive_out_of_order(server, monkeypatch):
+    use_session(monkeypatch)
+    # the first stores answer last
+    for store_idx in range(NUM_OF_STORES):
+        server.replies[f'/store_details/{store_idx}'] = [(200, 0.02 * (NUM_OF_STORES - store_idx))]
+
+    stores = DataExtractor.retrieve_stores_data(f'{server.url}/store_details', NUM_OF_STORES, headers=HEADERS, max_workers=NUM_OF_STORES, timeout=5)
+
+    assert server.replied != sorted(server.replied, key=lambda path: int(path.rsplit('/', 1)[1]))
+    assert stores['index'].tolist() == list(range(NUM_OF_STORES))
+    assert stores['store_code'].tolist() == [f'ST-{store_idx:03d}' for store_idx in range(NUM_OF_STORES)]
+    assert stores.columns.tolist() == ['index', 'store_code', 'staff_numbers']
+
+
+def test_headers_are_sent_with_every_request(server, monkeypatch):
+    use_session(monkeypatch)
+
+    DataExtractor.retrieve_stores_data(f'{server.url}/store_details', NUM_OF_STORES, headers=HEADERS, max_workers=4)
+
+    assert len(server.requests) == NUM_OF_STORES
+    assert all(headers['x-api-key'] == 'test-key' for _, headers, _, _ in server.requests)
+
+
+def test_429_and_500_replies_are_retried_by_the_session(server, monkeypatch):
+    use_session(monkeypatch, retries=3)
+    server.replies['/store_details/2'] = [(429, 0), (500, 0), (200, 0)]
+    server.replies['/store_details/7'] = [(503, 0), (200, 0)]
+
+    stores = DataExtractor.retrieve_stores_data(f'{server.url}/store_details', NUM_OF_STORES, headers=HEADERS, max_workers=4)
+
+    assert server.attempts['/store_details/2'] == 3
+    assert server.attempts['/store_details/7'] == 2
+    assert server.attempts['/store_details/0'] == 1
+    assert stores['index'].tolist() == list(range(NUM_OF_STORES))
+
+
+def test_failed_requests_are_retried_by_the_extractor(server, monkeypatch):
+    use_session(monkeypatch, retries=0)
+    server.replies['/store_details/5'] = [(500, 0), (429, 0), (200, 0)]
+
+    stores = DataExtractor.retrieve_stores_data(f'{server.url}/store_details', NUM_OF_STORES, headers=HEADERS, max_workers=4, retries=2, backoff=0)
+
+    assert server.attempts['/store_details/5'] == 3
+    assert stores['index'].tolist() == list(range(NUM_OF_STORES))
+
+
+def test_timed_out_requests_are_retried_by_the_extractor(server, monkeypatch):
+    use_session(monkeypatch, retries=0)
+    server.replies['/store_details/3'] = [(200, 1), (200, 0)]
+
+    stores = DataExtractor.retrieve_stores_data(f'{server.url}/store_details', NUM_OF_STORES, headers=HEADERS, max_workers=4, timeout=0.2, retries=1, backoff=0)
+
+    assert server.attempts['/store_details/3'] == 2
+    assert stores['index'].tolist() == list(range(NUM_OF_STORES))
+
+
+def test_error_is_raised_once_the_retries_are_used_up(server, monkeypatch):
+    use_session(monkeypatch, retries=1)
+    server.replies['/store_details/4'] = [(500, 0)]
+
+    with pytest.raises(requests.HTTPError):
+        DataExtractor.retrieve_stores_data(f'{server.url}/store_details', NUM_OF_STORES, headers=HEADERS, max_workers=4, retries=1, backoff=0)
+
+    # each of the 2 tries of the extractor is tried twice by the session
+    assert server.attempts['/store_details/4'] == 4
+
+
+def test_inconsistent_stores_raise_key_error(server, monkeypatch):
+    use_session(monkeypatch)
+    server.bodies['/store_details/6'] = {'index': 6}
+
+    with pytest.raises(KeyError):
+        DataExtractor.retrieve_stores_data(f'{server.url}/store_details', NUM_OF_STORES, headers=HEADERS, max_workers=4)
@@ -0,0 +1,130 @@
+from botocore.exceptions import ClientError
+from data_extraction import DataExtractor
+from download_cache import DownloadCache
+from s3_stream import S3RangeReader
+import boto3
+import io
+import pandas as pd
+import pytest
+import threading
+import time
+
+moto = pytest.importorskip('moto')
+
+BUCKET_NAME = 'data-handling-test'
+
+
+class RecordingClient:
+    """
+    This class wraps an s3 client, recording the ranges requested and delaying the replies of the first parts so they finish after the later ones.
+    """
+    def __init__(self, s3_client, delay: float = 0) -> None:
+        self.s3_client = s3_client
+        self.delay = delay
+        self.ranges = []
+        self.finished = []
+        self.lock = threading.Lock()
+
+    def head_object(self, **kwargs) -> dict:
+        return self.s3_client.head_object(**kwargs)
+
+    def get_object(self, **kwargs) -> dict:
+        first, last = map(int, kwargs['Range'].removeprefix('bytes=').split('-'))
+        with self.lock:
+            self.ranges.append((first, last))
+            part = len(self.ranges) - 1
+        time.sleep(self.delay / (part + 1))
+        response = self.s3_client.get_object(**kwargs)
+        with self.lock:
+            self.finished.append(first)
+        return response
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_aws():
+        s3_client = boto3.client('s3')
+        s3_client.create_bucket(Bucket=BUCKET_NAME)
+        yield s3_client
+
+
+def object_content(size: int) -> bytes:
+    # every 4 bytes hold their own offset, so a part read out of place changes the content
+    return b''.join(offset.to_bytes(4, 'big') for offset in range(0, size, 4))[:size]
+
+
+@pytest.mark.parametrize('size, part_size', [(1000, 64), (1024, 64), (63, 64), (65, 64), (1, 64)])
+def test_object_is_read_whole_and_in_order(s3, size, part_size):
+    content = object_content(size)
+    s3.put_object(Bucket=BUCKET_NAME, Key='products.csv', Body=content)
+    client = RecordingClient(s3, delay=0.05)
+
+    with S3RangeReader(client, BUCKET_NAME, 'products.csv', part_size=part_size, max_workers=4) as reader:
+        read = reader.read()
+
+    assert read == content
+    assert sorted(client.ranges) == [(first, min(first + part_size, size) - 1) for first in range(0, size, part_size)]
+
+
+def test_parts_finishing_out_of_order_are_read_in_order(s3):
+    content = object_content(640)
+    s3.put_object(Bucket=BUCKET_NAME, Key='products.csv', Body=content)
+    client = RecordingClient(s3, delay=0.1)
+
+    with io.BufferedReader(S3RangeReader(client, BUCKET_NAME, 'products.csv', part_size=64, max_workers=4), buffer_size=100) as reader:
+        read = b''.join(iter(lambda: reader.read(37), b''))
+
+    assert client.finished[:8] != sorted(client.finished[:8])
+    assert read == content
+
+
+def test_empty_object_is_read_without_requests(s3):
+    s3.put_object(Bucket=BUCKET_NAME, Key='empty.csv', Body=b'')
+    client = RecordingClient(s3)
+
+    with S3RangeReader(client, BUCKET_NAME, 'empty.csv', part_size=64, max_workers=4) as reader:
+        assert reader.size == 0
+        assert reader.read() == b''
+
+    assert client.ranges == []
+
+
+def test_object_changing_during_the_read_raises(s3):
+    s3.put_object(Bucket=BUCKET_NAME, Key='products.csv', Body=object_content(1024))
+
+    with S3RangeReader(s3, BUCKET_NAME, 'products.csv', part_size=64, max_workers=1) as reader:
+        first_part = reader.read(64)
+        s3.put_object(Bucket=BUCKET_NAME, Key='products.csv', Body=b'changed')
+
+        # the parts downloaded before the change are read, the first part requested after it fails
+        with pytest.raises(ClientError) as error:
+            reader.read()
+
+    assert first_part == object_content(64)
+    assert error.value.response['Error']['Code'] == 'PreconditionFailed'
+
+
+@pytest.fixture
+def products(s3, tmp_path, monkeypatch):
+    monkeypatch.setattr(DataExtractor, 'download_cache', DownloadCache(str(tmp_path / 'downloads')))
+    products = pd.DataFrame({'product_name': [f'product {i}' for i in range(500)], 'weight': [f'{i}g' for i in range(500)]})
+    s3.put_object(Bucket=BUCKET_NAME, Key='products.csv', Body=products.to_csv(index=False).encode())
+    return products
+
+
+@pytest.mark.parametrize('stream, max_workers', [(False, 1), (True, 1), (True, 4)])
+def test_extracted_products_match_the_object(products, stream, max_workers):
+    extracted = DataExtractor.extract_from_s3(f's3://{BUCKET_NAME}/products.csv', stream=stream, max_workers=max_workers, part_size=1000)
+
+    pd.testing.assert_frame_equal(extracted, products)
+
+
+@pytest.mark.parametrize('stream, max_workers', [(False, 1), (True, 1), (True, 4)])
+def test_extracted_chunks_match_the_object(products, stream, max_workers):
+    chunks = list(DataExtractor.extract_from_s3(f's3://{BUCKET_NAME}/products.csv', stream=stream, chunksize=128, max_workers=max_workers, part_size=1000))
+
+    assert [len(chunk) for chunk in chunks] == [128, 128, 128, 116]
+    pd.testing.assert_frame_equal(pd.concat(chunks), products)
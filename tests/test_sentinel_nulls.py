@@ -0,0 +1,140 @@
+from data_cleaning import DataCleaning
+import numpy as np
+import pandas as pd
+import pytest
+
+try:
+    import pyarrow as pa
+    ARROW_DTYPES = ['string[pyarrow]', pd.ArrowDtype(pa.string()), pd.ArrowDtype(pa.large_string())]
+except ImportError:
+    ARROW_DTYPES = []
+
+STRING_DTYPES = [object, 'category', 'string[python]'] + ARROW_DTYPES
+
+# values of a string column and whether each one is a sentinel
+SENTINEL_CASES = [
+    ('NULL', True),
+    ('NaN', True),
+    ('null', False),
+    ('nan', False),
+    (' NULL', False),
+    ('NULL ', False),
+    ('NaNa', False),
+    ('', False),
+    ('1234', False),
+    (None, False),
+]
+
+
+@pytest.mark.parametrize('dtype', STRING_DTYPES, ids=repr)
+def test_sentinel_strings_are_found_in_string_columns(dtype):
+    values = [value for value, _ in SENTINEL_CASES]
+    data = pd.DataFrame({'card_number': pd.Series(values, dtype=dtype)})
+
+    found = DataCleaning.find_sentinel_nulls(data)
+
+    np.testing.assert_array_equal(found, [is_sentinel for _, is_sentinel in SENTINEL_CASES])
+
+
+def test_nan_floats_are_not_sentinels():
+    data = pd.DataFrame({
+        'amount': [1.5, np.nan, float('nan')],
+        'mixed': pd.Series([np.nan, 'a', None], dtype=object),
+    })
+
+    found = DataCleaning.find_sentinel_nulls(data)
+
+    np.testing.assert_array_equal(found, [False, False, False])
+
+
+@pytest.mark.parametrize('dtype', STRING_DTYPES, ids=repr)
+def test_rows_with_a_sentinel_in_any_column_are_found(dtype):
+    data = pd.DataFrame({
+        'card_number': pd.Series(['1234', 'NULL', '5678', '9012', '3456'], dtype=dtype),
+        'card_provider': pd.Series(['VISA', 'VISA', 'NaN', 'Maestro', 'Maestro'], dtype=dtype),
+        'expiry_date': pd.Series(['01/25', '02/25', '03/25', '04/25', 'NULL'], dtype=object),
+        'amount': [1.0, 2.0, 3.0, np.nan, 5.0],
+        'count': [1, 2, 3, 4, 5],
+    })
+
+    found = DataCleaning.find_sentinel_nulls(data)
+
+    np.testing.assert_array_equal(found, [False, True, True, False, True])
+
+
+def test_rows_match_the_applymap_passes_it_replaced():
+    data = pd.DataFrame({
+        'card_number': ['1234', 'NULL', '5678', 'NaN', None, 'nan'],
+        'card_provider': pd.Series(['VISA', 'VISA', 'NaN', 'VISA', 'Maestro', 'Maestro'], dtype='category'),
+        'amount': [1.0, np.nan, 3.0, 4.0, 5.0, 6.0],
+    })
+
+    null_string_values = data.applymap(lambda x:x == 'NULL')
+    nan_string_values = data.applymap(lambda x:x == 'NaN')
+    expected = (null_string_values.any(axis=1) | nan_string_values.any(axis=1)).to_numpy()
+
+    np.testing.assert_array_equal(DataCleaning.find_sentinel_nulls(data), expected)
+
+
+def test_other_sentinels_can_be_given():
+    data = pd.DataFrame({'card_number': ['N/A', 'NULL', '1234']})
+
+    found = DataCleaning.find_sentinel_nulls(data, sentinels=['N/A'])
+
+    np.testing.assert_array_equal(found, [True, False, False])
+
+
+def test_empty_data_has_no_sentinels():
+    found = DataCleaning.find_sentinel_nulls(pd.DataFrame({'card_number': pd.Series([], dtype=object)}))
+
+    assert found.dtype == bool
+    assert len(found) == 0
+
+
+def cards() -> pd.DataFrame:
+    return pd.DataFrame({
+        'card_number': ['1234', 'NULL', '5678', '9012'],
+        'card_provider': ['VISA', 'VISA', 'NaN', 'Maestro'],
+        'amount': [1.0, 2.0, 3.0, 4.0],
+    }, index=[10, 11, 12, 13]).astype({'card_provider': 'category'})
+
+
+def test_rows_are_kept_in_place():
+    data = cards()
+    expected = data.iloc[[0, 3]].copy()
+
+    kept = DataCleaning.keep_rows(data, ~DataCleaning.find_sentinel_nulls(data))
+
+    assert kept is data
+    pd.testing.assert_frame_equal(kept, expected)
+
+
+def test_data_is_returned_when_every_row_is_kept():
+    data = cards()
+    expected = data.copy()
+
+    kept = DataCleaning.keep_rows(data, np.ones(len(data), dtype=bool))
+
+    assert kept is data
+    pd.testing.assert_frame_equal(kept, expected)
+
+
+def test_no_rows_can_be_kept():
+    data = cards()
+
+    kept = DataCleaning.keep_rows(data, np.zeros(len(data), dtype=bool))
+
+    assert len(kept) == 0
+    pd.testing.assert_series_equal(kept.dtypes, cards().dtypes)
+
+
+def test_rows_with_duplicate_labels_are_returned_as_a_new_dataframe():
+    data = cards()
+    data.index = [10, 10, 11, 11]
+    expected = data.iloc[[0, 3]].copy()
+
+    kept = DataCleaning.keep_rows(data, np.array([True, False, False, True]))
+
+    assert kept is not data
+    assert len(data) == 4
+    pd.testing.assert_frame_equal(kept, expected)
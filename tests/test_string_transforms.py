@@ -0,0 +1,78 @@
+from tests.reference_parsers import continent_by_row, email_by_row, price_by_row, staff_num_by_row, zero_pad_by_row
+from string_transforms import STRING_DTYPE, StringTransforms
+import numpy as np
+import pandas as pd
+import pytest
+
+# the row by row parsers the transforms replaced, with the values they were written for
+REFERENCE_CASES = [
+    (StringTransforms.keep_digits, staff_num_by_row, ['78', 'J78', 'J78e', 'e3e4', '', '  12 ']),
+    (StringTransforms.strip_before_uppercase, continent_by_row, ['Europe', 'eeEurope', 'eeAmerica', 'asia', '', 'eEe']),
+    (StringTransforms.fix_double_at, email_by_row, ['a@b.com', 'a@@b.com', '@@a.com', 'a@@b@@c.com', 'a@b@@c.com', 'a@@@b.com', 'no_at']),
+    (StringTransforms.extract_price, price_by_row, ['£39.99', '£0.5', '12', '£1,000.50', '£ 5.5', '$7', '£.5']),
+    (StringTransforms.zero_pad, zero_pad_by_row, ['7', '12', '0', '', '1']),
+]
+
+
+@pytest.mark.parametrize('transform, row_parser, values', REFERENCE_CASES, ids=lambda case: getattr(case, '__name__', None))
+@pytest.mark.parametrize('dtype', [object, 'category', STRING_DTYPE])
+def test_transform_matches_the_row_by_row_parser(transform, row_parser, values, dtype):
+    column = pd.Series(values, index=range(10, 10 + len(values)), name='column')
+    expected = pd.Series([row_parser(value) for value in values], index=column.index, name='column')
+
+    transformed = transform(column.astype(dtype))
+
+    # the transforms return strings in the column's own dtype
+    if transformed.dtype != float:
+        transformed = transformed.astype(object)
+    pd.testing.assert_series_equal(transformed, expected)
+
+
+@pytest.mark.parametrize('transform', [StringTransforms.keep_digits, StringTransforms.strip_before_uppercase,
+                                       StringTransforms.fix_double_at, StringTransforms.zero_pad])
+def test_missing_values_are_kept(transform):
+    column = pd.Series(['7', None, np.nan], dtype=object)
+
+    transformed = transform(column)
+
+    assert transformed[1] is None
+    assert transformed[2] is np.nan
+
+
+@pytest.mark.parametrize('transform', [StringTransforms.keep_digits, StringTransforms.strip_before_uppercase,
+                                       StringTransforms.fix_double_at, StringTransforms.zero_pad])
+def test_missing_values_are_kept_in_categories(transform):
+    column = pd.Series(['7', None], dtype='category')
+
+    transformed = transform(column)
+
+    assert isinstance(transformed.dtype, pd.CategoricalDtype)
+    assert transformed.isna().tolist() == [False, True]
+
+
+def test_missing_prices_are_nan():
+    prices = StringTransforms.extract_price(pd.Series(['£3.5', None, np.nan], dtype=object))
+
+    pd.testing.assert_series_equal(prices, pd.Series([3.5, np.nan, np.nan]))
+
+
+@pytest.mark.parametrize('price', ['£', '£abc', '£1.2.3'])
+def test_prices_without_a_number_raise(price):
+    with pytest.raises(ValueError):
+        StringTransforms.extract_price(pd.Series([price]))
+
+
+@pytest.mark.parametrize('email, expected', [
+    ('a@@b.com', 'a@b.com'),
+    # only the first '@' is removed, as the row by row parser did
+    ('a@@b@@c.com', 'a@b@@c.com'),
+    ('a@b@@c.com', 'ab@@c.com'),
+    ('a@@@b.com', 'a@@b.com'),
+    ('a@b.com', 'a@b.com'),
+])
+def test_fix_double_at_with_several_ats(email, expected):
+    assert StringTransforms.fix_double_at(pd.Series([email])).tolist() == [expected]
+
+
+def test_strip_before_uppercase_without_an_uppercase_character():
+    assert StringTransforms.strip_before_uppercase(pd.Series(['asia', ''])).tolist() == ['', '']
@@ -0,0 +1,40 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from watermarks import WatermarkStore
+import os
+
+
+def set_watermarks(filepath: str, table_name: str, count: int) -> None:
+    store = WatermarkStore(filepath)
+    for watermark in range(count):
+        store.set(table_name, watermark)
+
+
+def test_set_keeps_the_watermarks_set_by_other_threads(tmp_path):
+    filepath = str(tmp_path / "state" / "watermarks.json")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(set_watermarks, filepath, table_name, 200) for table_name in ('legacy_users', 'orders_table')]
+        for future in futures:
+            future.result()
+
+    assert WatermarkStore(filepath).read_all() == {'legacy_users': 199, 'orders_table': 199}
+    assert not [filename for filename in os.listdir(tmp_path / "state") if filename.endswith('.tmp')]
+
+
+def test_set_keeps_the_watermarks_set_by_other_processes(tmp_path):
+    filepath = str(tmp_path / "watermarks.json")
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(set_watermarks, filepath, table_name, 100) for table_name in ('legacy_users', 'orders_table')]
+        for future in futures:
+            future.result()
+
+    assert WatermarkStore(filepath).read_all() == {'legacy_users': 99, 'orders_table': 99}
+
+
+def test_reset_removes_only_its_table(tmp_path):
+    store = WatermarkStore(str(tmp_path / "watermarks.json"))
+    store.set('legacy_users', 10)
+    store.set('orders_table', 20)
+    store.reset('legacy_users')
+
+    assert store.read_all() == {'orders_table': 20}
+    assert store.get('legacy_users') is None
@@ -0,0 +1,132 @@
+from contextlib import contextmanager
+from typing import Iterator
+import json
+import os
+import uuid
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+class WatermarkStore:
+    """
+    This class stores the high-watermark of each incrementally extracted table in a json file.
+    The high-watermark is the largest value of the table's watermark column that has been loaded into the local database.
+    The tables of the pipeline are loaded at the same time, so the watermarks are changed while holding a lock on a lock file next to the json file,
+    which the threads and processes of the pipeline take in turn.
+
+    Attributes:
+        filepath (str): path to the json file holding the watermarks
+        lock_filepath (str): path to the lock file
+    """
+    def __init__(self, filepath: str = "state/watermarks.json") -> None:
+        """
+        Args:
+            filepath (str): path to the json file holding the watermarks
+        """
+        self.filepath = filepath
+        self.lock_filepath = filepath + ".lock"
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """
+        This method holds the lock of the watermarks until the with block ends, waiting for it if another thread or process holds it.
+        The operating system releases the lock if the process holding it dies.
+
+        Yields:
+            None: the lock is held while the with block runs
+        """
+        directory = os.path.dirname(self.lock_filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # every call opens the lock file again, so the threads of a process also wait for each other
+        with open(self.lock_filepath, "a+") as lock_file:
+            lock_file.seek(0)
+            if os.name == 'nt':
+                # LK_LOCK retries for 10 seconds before raising, so it is retried until the lock is taken
+                while True:
+                    try:
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+            else:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            try:
+                yield
+            finally:
+                if os.name == 'nt':
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read_all(self) -> dict:
+        """
+        This method reads all the stored watermarks.
+
+        Returns:
+            dict: table name to watermark key value pairs. empty if no watermark has been stored yet.
+        """
+        if not os.path.exists(self.filepath):
+            return {}
+
+        with open(self.filepath, "r") as file:
+            return json.load(file)
+
+    def get(self, table_name: str):
+        """
+        This method returns the stored watermark of a table.
+
+        Args:
+            table_name (str): the name of the source table
+
+        Returns:
+            the watermark of the table, None if the table has not been extracted yet
+        """
+        return self.read_all().get(table_name)
+
+    def write_all(self, watermarks: dict) -> None:
+        """
+        This method replaces all the stored watermarks. The file is replaced atomically, so a failed run never leaves a partially written file.
+        Timestamps are stored as strings. Changing some of the watermarks should go through set or reset, which hold the lock while the file is read and replaced.
+
+        Args:
+            watermarks (dict): table name to watermark key value pairs
+        """
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_filepath = self.filepath + f".{uuid.uuid4().hex}.tmp"
+        with open(temp_filepath, "w") as file:
+            json.dump(watermarks, file, indent=4, default=str)
+        os.replace(temp_filepath, self.filepath)
+
+    def set(self, table_name: str, watermark) -> None:
+        """
+        This method stores the watermark of a table, keeping the watermarks of the other tables stored at the same time.
+
+        Args:
+            table_name (str): the name of the source table
+            watermark: the new high-watermark of the table
+        """
+        with self.locked():
+            watermarks = self.read_all()
+            watermarks[table_name] = watermark
+            self.write_all(watermarks)
+
+    def reset(self, table_name: str) -> None:
+        """
+        This method removes the watermark of a table, so the next extraction reads the whole table again.
+
+        Args:
+            table_name (str): the name of the source table
+        """
+        with self.locked():
+            watermarks = self.read_all()
+            watermarks.pop(table_name, None)
+            self.write_all(watermarks)